@@ -0,0 +1,282 @@
+"""
+Rendering benchmark for the multi-track synthesizer.
+
+Times NoteUtils.generate_waveform, MelodyTrack.render, ChordTrack.render,
+Song.render and Song.save across song lengths, track counts, waveforms
+and sample rates, including the square/sawtooth/triangle oscillators
+naive, band-limited (PolyBLEP, the *_bl waveforms) and 4x oversampled.
+Each case records its best time, the time per second of rendered audio,
+its peak memory (tracemalloc) and the array allocations counted by
+profiler.alloc(). Results are written as JSON and can be compared with a
+stored baseline; a case is a regression when its best time, peak memory
+or allocation count grows by more than the threshold.
+
+Usage:
+    python bench/bench_render.py --save-baseline          # store bench/baseline.json
+    python bench/bench_render.py                          # compare with it
+    python bench/bench_render.py --quick --filter song --out results.json
+"""
+
+import contextlib
+import functools
+import importlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "snippets"))
+
+import numpy as np  # noqa: E402
+
+wave_sound = importlib.import_module("multi-track_wave_sound")
+profiler = wave_sound.profiler
+
+BASELINE = os.path.join(PROJECT_ROOT, "bench", "baseline.json")
+THRESHOLD = 1.25        # Allowed slowdown / memory growth factor
+
+MELODY = ['E5', 'D5', 'C5', 'D5', 'E5', 'E5', 'E5', 'rest',
+          'D5', 'D5', 'D5', 'E5', 'G5', 'G5', 'rest', 'C5']
+RHYTHM = [0.75, 0.25, 0.5, 0.5, 0.5, 0.5, 1, 0.5,
+          0.5, 0.5, 1, 0.5, 0.5, 1, 0.5, 1.5]
+CHORDS = ['C', 'Am', 'F', 'G7']
+HIGH_CHORD = ['C6', 'E6', 'G6']     # High notes, where naive oscillators alias
+OVERSAMPLE = 4
+
+
+def seconds(durations, tempo=120):
+    """Length in seconds of a list of beat durations."""
+    return sum(durations) * 60.0 / tempo
+
+
+def melody(bars):
+    """Melody covering a number of 4/4 bars (the 16-note phrase is 3 bars)."""
+    reps = -(-bars // 3)
+    return MELODY * reps, RHYTHM * reps
+
+
+def chords(bars):
+    """One chord per bar."""
+    return (CHORDS * (bars // len(CHORDS) + 1))[:bars], [4] * bars
+
+
+def song(bars, tracks, waveform='sine'):
+    """Song with alternating melody and chord tracks."""
+    s = wave_sound.Song(tempo=120)
+    for i in range(tracks):
+        if i % 2 == 0:
+            s.add_melody(*melody(bars), waveform=waveform)
+        else:
+            s.add_chords(*chords(bars), waveform=waveform)
+    return s
+
+
+@functools.lru_cache(maxsize=4)
+def decimation_filter(factor, taps_per_phase=16):
+    """Windowed-sinc low-pass at the decimated Nyquist."""
+    n = np.arange(factor * taps_per_phase) - (factor * taps_per_phase - 1) / 2
+    taps = np.sinc(n / factor) * np.blackman(len(n))
+    return (taps / taps.sum()).astype(np.float32)
+
+
+def oversampled(notes, duration, waveform, rate, factor=OVERSAMPLE):
+    """Naive waveform rendered at factor x rate, low-pass filtered and decimated."""
+    wave = wave_sound.NoteUtils.generate_waveform(notes, duration, waveform, rate * factor)
+    return np.convolve(wave, decimation_filter(factor), mode='same')[::factor]
+
+
+# ====================================================
+# Cases
+# ====================================================
+def build_cases(quick=False):
+    """
+    Benchmark cases.
+
+    Returns:
+        Dict of case name -> (zero-argument callable, seconds of audio rendered)
+    """
+    lengths = [8] if quick else [8, 32, 128]
+    rates = [44100] if quick else [22050, 44100, 48000]
+    waveforms = ['sine', 'square', 'sawtooth', 'triangle']
+    cases = {}
+
+    for waveform in waveforms:
+        for rate in rates:
+            cases[f"generate_waveform/chord/{waveform}/{rate}"] = (
+                lambda w=waveform, r=rate: wave_sound.NoteUtils.generate_waveform(
+                    ['C3', 'E4', 'G4', 'B4'], 2.0, w, r), 2.0)
+
+    for waveform in ['square', 'sawtooth', 'triangle']:
+        for rate in rates:
+            prefix = f"oscillator/{waveform}/{rate}"
+            cases[f"{prefix}/naive"] = (
+                lambda w=waveform, r=rate: wave_sound.NoteUtils.generate_waveform(
+                    HIGH_CHORD, 2.0, w, r), 2.0)
+            cases[f"{prefix}/polyblep"] = (
+                lambda w=waveform, r=rate: wave_sound.NoteUtils.generate_waveform(
+                    HIGH_CHORD, 2.0, w + '_bl', r), 2.0)
+            cases[f"{prefix}/oversampled{OVERSAMPLE}x"] = (
+                lambda w=waveform, r=rate: oversampled(HIGH_CHORD, 2.0, w, r), 2.0)
+
+    for bars in lengths:
+        notes, rhythm = melody(bars)
+        track = wave_sound.MelodyTrack(notes, rhythm)
+        cases[f"melody_track/{bars}bars"] = (lambda t=track: t.render(), seconds(rhythm))
+        progression, durations = chords(bars)
+        track = wave_sound.ChordTrack(progression, durations)
+        cases[f"chord_track/{bars}bars"] = (lambda t=track: t.render(), seconds(durations))
+
+    for bars in lengths:
+        for tracks in ([2] if quick else [1, 2, 4, 8]):
+            s = song(bars, tracks)
+            cases[f"song_render/{bars}bars/{tracks}tracks"] = (
+                lambda s=s: s.render(cache=False), seconds(melody(bars)[1]))
+    for rate in rates:
+        s = song(lengths[0], 2)
+        cases[f"song_render/{lengths[0]}bars/2tracks/{rate}"] = (
+            lambda s=s, r=rate: s.render(r, cache=False), seconds(melody(lengths[0])[1]))
+
+    try:
+        import scipy.io.wavfile  # noqa: F401
+    except ImportError:
+        print("scipy not installed: skipping song_save")
+    else:
+        path = os.path.join(tempfile.mkdtemp(), "bench.wav")
+        s = song(lengths[-1], 2)
+
+        def save(s=s):
+            with contextlib.redirect_stdout(io.StringIO()):
+                s.save(path, cache=False)
+        cases[f"song_save/{lengths[-1]}bars/2tracks"] = (save, seconds(melody(lengths[-1])[1]))
+
+    return cases
+
+
+# ====================================================
+# Measurement
+# ====================================================
+def measure(fn, repeat, audio_seconds):
+    """
+    Time a callable and measure its peak traced memory and allocations.
+
+    Returns:
+        Dict with best_ms, median_ms, ms_per_s, peak_kb, allocs and alloc_kb
+    """
+    fn()    # Warm up caches
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    profiler.enable()
+    fn()
+    profiler.disable()
+    allocs = [(s["allocs"], s["alloc_bytes"]) for s in profiler.stats().values()]
+    return {"best_ms": round(min(times), 3),
+            "median_ms": round(statistics.median(times), 3),
+            "ms_per_s": round(min(times) / audio_seconds, 3),
+            "peak_kb": round(peak / 1024, 1),
+            "allocs": sum(a for a, _ in allocs),
+            "alloc_kb": round(sum(b for _, b in allocs) / 1024, 1)}
+
+
+def run(cases, repeat, pattern=None):
+    """Measure all cases whose name contains pattern."""
+    results = {}
+    for name, (fn, audio_seconds) in cases.items():
+        if pattern and pattern not in name:
+            continue
+        results[name] = measure(fn, repeat, audio_seconds)
+        r = results[name]
+        print(f"{name:<45} {r['best_ms']:9.2f}ms {r['median_ms']:9.2f}ms {r['ms_per_s']:7.2f}ms "
+              f"{r['peak_kb']:9.0f}KB {r['allocs']:7d} {r['alloc_kb']:9.0f}KB")
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=THRESHOLD):
+    """
+    Compare results with a baseline.
+
+    Returns:
+        List of regression messages
+    """
+    regressions = []
+    for name, r in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        for key, label in (("best_ms", "time"), ("peak_kb", "memory"), ("allocs", "allocations")):
+            if base.get(key, 0) > 0 and r[key] > base[key] * threshold:
+                regressions.append(
+                    f"{name}: {label} {base[key]} -> {r[key]} ({r[key] / base[key]:.2f}x)")
+    return regressions
+
+
+def _option(args, name, default=None):
+    if name in args:
+        i = args.index(name)
+        value = args[i + 1]
+        del args[i:i + 2]
+        return value
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    baseline_path = _option(args, "--baseline", BASELINE)
+    out = _option(args, "--out")
+    pattern = _option(args, "--filter")
+    threshold = float(_option(args, "--threshold", THRESHOLD))
+    repeat = int(_option(args, "--repeat", 5))
+    quick = "--quick" in args
+
+    print(f"{'case':<45} {'best':>11} {'median':>11} {'per s':>9} "
+          f"{'peak':>11} {'allocs':>7} {'alloc':>11}")
+    current = run(build_cases(quick), repeat, pattern)
+
+    if out:
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+    if "--save-baseline" in args:
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"Baseline saved to {baseline_path}")
+        return
+    if not os.path.exists(baseline_path):
+        print(f"No baseline at {baseline_path} (run with --save-baseline)")
+        return
+
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(current, baseline, threshold)
+    print()
+    if regressions:
+        print(f"{len(regressions)} regressions (threshold {threshold}x):")
+        for line in regressions:
+            print(f"  {line}")
+        exit(1)
+    print(f"No regressions against {baseline_path} (threshold {threshold}x)")
+
+
+if __name__ == "__main__":
+    main()
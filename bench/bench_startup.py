@@ -0,0 +1,73 @@
+"""
+Startup-time benchmark for the main.py subcommands.
+
+Each command is run in a fresh interpreter several times; the best and
+median wall-clock times are compared with a bare `python -c pass`, and the
+heavy modules each command ended up importing are listed.
+
+Usage:
+    python bench/bench_startup.py [--runs 10]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(PROJECT_ROOT, "main.py")
+HEAVY = ("numpy", "pyaudio", "mido", "scipy")
+
+COMMANDS = {
+    "python (baseline)": [sys.executable, "-c", "pass"],
+    "main.py --help": [sys.executable, MAIN, "--help"],
+    "euclid 3 8": [sys.executable, MAIN, "euclid", "3", "8"],
+    "pattern 4": [sys.executable, MAIN, "pattern", "4"],
+    "progression": [sys.executable, MAIN, "progression"],
+    "euclidean_rhythm.py 3 8": [sys.executable, os.path.join(PROJECT_ROOT, "euclidean_rhythm.py"), "3", "8"],
+}
+
+
+def time_command(cmd, runs):
+    """Wall-clock times in ms of running cmd."""
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def heavy_imports(cmd):
+    """Heavy top-level packages actually executed by a command."""
+    result = subprocess.run([cmd[0], "-X", "importtime"] + cmd[1:],
+                            capture_output=True, text=True, check=False)
+    found = set()
+    for line in result.stderr.splitlines():
+        name = line.rsplit("|", 1)[-1].strip()
+        if name.split(".")[0] in HEAVY:
+            found.add(name.split(".")[0])
+    return sorted(found)
+
+
+def main():
+    args = sys.argv[1:]
+    runs = int(args[args.index("--runs") + 1]) if "--runs" in args else 10
+
+    print(f"{'command':<26} {'best':>8} {'median':>8}  heavy imports")
+    baseline = None
+    for label, cmd in COMMANDS.items():
+        times = time_command(cmd, runs)
+        best, median = min(times), statistics.median(times)
+        if baseline is None:
+            baseline = best
+            extra = ""
+        else:
+            extra = f" (+{best - baseline:.0f}ms)"
+        print(f"{label:<26} {best:7.1f}ms {median:7.1f}ms  "
+              f"{', '.join(heavy_imports(cmd)) or '-'}{extra}")
+
+
+if __name__ == "__main__":
+    main()
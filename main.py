@@ -1,5 +1,111 @@
-def main():
-    print("Hello from metronome!")
+"""
+Metronome practice tools - unified command line.
+
+Each subcommand imports only what it needs, so commands that do not
+play or render audio start without loading numpy or PyAudio.
+
+Usage:
+    python main.py metronome [bpm] [beats] [--silent]
+    python main.py euclid k n [--raw]
+    python main.py pattern [-t] [beats] [--from-log]
+    python main.py progression [--bars N] [--play] [--save FILE.mid]
+    python main.py batch manifest.json [--workers N]
+    python main.py quiz [tuning] [--questions N]
+"""
+
+import os
+import random
+import sys
+
+PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(PROJECT_ROOT, "snippets"))
+
+# Beat patterns (same tables as rhythm_pattern.sh)
+PATTERNS = [format(i, "04b") for i in range(16)]
+TRIPLETS = [format(i, "03b") for i in range(8)]
+
+
+def run_module(name, args):
+    """Run a snippet's main() with its own command-line arguments."""
+    module = __import__(name)
+    sys.argv = [module.__file__] + list(args)
+    module.main()
+
+
+def generate_pattern(beats=2, triplet=False):
+    """
+    Random rhythm pattern, one group per beat (see rhythm_pattern.sh).
+
+    The first beat starts on the beat (a 'head' pattern).
+    """
+    patterns = TRIPLETS if triplet else PATTERNS
+    n = len(patterns)
+    head = random.choice(patterns[n // 2:n // 2 + n // 4])
+    rest = random.choices(patterns, k=beats - 1)
+    return " ".join([head] + rest)
+
+
+# ====================================================
+# Subcommands
+# ====================================================
+def cmd_metronome(args):
+    run_module("metronome_server", args)
+
+
+def cmd_euclid(args):
+    import euclidean_rhythm
+    euclidean_rhythm.main(args)
+
+
+def cmd_pattern(args):
+    if "--from-log" in args:
+        from practice_log import PracticeLog
+        patterns = PracticeLog().suggest()
+        if patterns:
+            print(patterns[0])
+            return
+    triplet = "-t" in args
+    numbers = [a for a in args if a.isdigit()]
+    print(generate_pattern(int(numbers[0]) if numbers else 2, triplet))
+
+
+def cmd_progression(args):
+    import generate_chord_progression as gcp
+
+    bars = int(args[args.index("--bars") + 1]) if "--bars" in args else 4
+    generator = gcp.ChordProgressionGenerator(gcp.CONFIG)
+    progression = generator.generate(bars=bars)
+    print(generator.pretty_print(progression))
+    if "--play" in args:
+        gcp.play_wave_sound.play_chord(progression, [2] * len(progression))
+    if "--save" in args:
+        gcp.save_as_midi(progression, args[args.index("--save") + 1])
+
+
+def cmd_batch(args):
+    run_module("batch_render", args)
+
+
+def cmd_quiz(args):
+    run_module("fretboard", args)
+
+
+COMMANDS = {
+    "metronome": cmd_metronome,
+    "euclid": cmd_euclid,
+    "pattern": cmd_pattern,
+    "progression": cmd_progression,
+    "batch": cmd_batch,
+    "quiz": cmd_quiz,
+}
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in COMMANDS:
+        print(__doc__.split("Usage:")[1].rstrip())
+        exit(0 if not argv or argv[0] in ("-h", "--help") else 1)
+    COMMANDS[argv[0]](argv[1:])
 
 
 if __name__ == "__main__":
@@ -10,11 +10,15 @@ run() {
         m) bash "$PROJECT_ROOT/metronome.sh" "$@" ;;
         f) bash "$PROJECT_ROOT/fretboard_quiz.sh" ;;
         r) bash "$PROJECT_ROOT/rhythm_pattern.sh" "$@" ;;
-        e) python "$PROJECT_ROOT/euclidean_rhythm.py" "$@" ;;
+        e) python "$PROJECT_ROOT/main.py" euclid "$@" ;;
+        p) python "$PROJECT_ROOT/main.py" progression "$@" ;;
+        q) python "$PROJECT_ROOT/main.py" quiz "$@" ;;
+        py) python "$PROJECT_ROOT/main.py" "$@" ;;
         *)
             echo "usage:"
             echo "source run.sh"
-            echo "run [m|f|r|e]"
+            echo "run [m|f|r|e|p|q]"
+            echo "run py [metronome|euclid|pattern|progression|quiz] ..."
             ;;
     esac
 }
@@ -0,0 +1,307 @@
+"""
+Audio Device Manager
+--------------------
+One PyAudio instance and one running output stream per (rate, channels,
+format) for the whole process.
+
+Opening PyAudio and a stream costs hundreds of milliseconds (device
+probing, PipeWire/ALSA setup), and play_audio/play_chord/play_melody
+used to pay that on every call. Here the stream stays open in callback
+mode and mixes any number of inputs; callers get a MixerInput whose
+write() blocks like a PyAudio blocking write, so existing playback code
+keeps its timing:
+
+    out = audio_device.open_input(44100)
+    out.write(wave)         # float32 bytes or an ndarray
+    out.close()             # waits until the input has played out
+
+If the stream stops (device unplugged, server restarted) it is reopened
+on the next open_input(); stats() reports open and reopen counts.
+
+Usage:
+    python snippets/audio_device.py
+"""
+
+import atexit
+import threading
+import time
+
+import profiler
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+pyaudio = lazy_import("pyaudio")
+
+# ====================================================
+# Global Constants
+# ====================================================
+SAMPLE_RATE = 44100
+BLOCK = 512             # Frames per callback
+LATENCY_BLOCKS = 2      # Blocks an input may queue before write() blocks
+
+
+# ====================================================
+# Mixer Input
+# ====================================================
+class MixerInput:
+    """One caller's channel into a shared output stream."""
+
+    def __init__(self, mixer, latency):
+        self.mixer = mixer
+        self.latency = latency
+        # write() copies into this ring, so callers may reuse their buffers
+        self._ring = np.zeros((latency, mixer.channels), dtype=np.float32)
+        self._read = 0
+        self._queued = 0
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def write(self, data):
+        """
+        Copy audio into the input's ring, blocking while it is full.
+
+        Returns once at most `latency` frames are still pending, like a
+        PyAudio blocking write.
+
+        Args:
+            data: float32 bytes or memoryview (the PyAudio stream format),
+                  or an array of shape (frames,) or (frames, channels)
+        """
+        channels = self.mixer.channels
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            # Interleaved frames, as for a PyAudio stream
+            samples = np.frombuffer(data, dtype=np.float32).reshape(-1, channels)
+        else:
+            samples = np.asarray(data, dtype=np.float32)
+            if samples.ndim == 1:
+                samples = samples[:, None]
+            samples = np.broadcast_to(samples, (len(samples), channels))
+        ring, size = self._ring, len(self._ring)
+        pos = 0
+        with self._cond:
+            while pos < len(samples):
+                if not self._wait(size - 1):
+                    return      # Stream died; drop the rest
+                n = min(size - self._queued, len(samples) - pos)
+                w = (self._read + self._queued) % size
+                first = min(n, size - w)
+                ring[w:w + first] = samples[pos:pos + first]
+                ring[:n - first] = samples[pos + first:pos + n]
+                self._queued += n
+                pos += n
+
+    def drain(self):
+        """Block until everything written has been played."""
+        with self._cond:
+            self._wait(0)
+
+    def close(self):
+        """Drain, then detach from the mixer."""
+        if not self.closed:
+            self.drain()
+            self.closed = True
+            self.mixer.remove(self)
+
+    def _wait(self, frames):
+        """Wait until at most `frames` are queued; False if the stream died."""
+        while self._queued > frames:
+            # Assume the stream died if nothing is consumed for a second
+            if not self._cond.wait(timeout=1.0) and not self.mixer.active():
+                self._queued = 0
+                return False
+        return True
+
+    def _pull(self, out):
+        """Add up to len(out) queued frames into out (callback thread)."""
+        with self._cond:
+            ring, size = self._ring, len(self._ring)
+            n = min(len(out), self._queued)
+            first = min(n, size - self._read)
+            out[:first] += ring[self._read:self._read + first]
+            out[first:n] += ring[:n - first]
+            self._read = (self._read + n) % size
+            self._queued -= n
+            self._cond.notify_all()
+
+
+# ====================================================
+# Mixer (one running stream)
+# ====================================================
+class Mixer:
+    """Callback-mode output stream summing its inputs."""
+
+    def __init__(self, device, rate, channels, fmt):
+        self.rate = rate
+        self.channels = channels
+        self.format = fmt
+        self.inputs = []
+        self._lock = threading.Lock()
+        self._mix = np.zeros((BLOCK, channels), dtype=np.float32)
+        self.stream = device.pa.open(
+            format=fmt,
+            channels=channels,
+            rate=rate,
+            output=True,
+            frames_per_buffer=BLOCK,
+            stream_callback=self._callback,
+        )
+
+    def active(self):
+        try:
+            return self.stream.is_active()
+        except OSError:
+            return False
+
+    def add(self, latency):
+        inp = MixerInput(self, latency)
+        with self._lock:
+            self.inputs.append(inp)
+        return inp
+
+    def remove(self, inp):
+        with self._lock:
+            if inp in self.inputs:
+                self.inputs.remove(inp)
+
+    def close(self):
+        try:
+            self.stream.stop_stream()
+            self.stream.close()
+        except OSError:
+            pass
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        if status & pyaudio.paOutputUnderflow:
+            profiler.count("underruns")
+        if frame_count > len(self._mix):
+            self._mix = np.zeros((frame_count, self.channels), dtype=np.float32)
+        out = self._mix[:frame_count]
+        out.fill(0)
+        with self._lock:
+            inputs = list(self.inputs)
+        for inp in inputs:
+            inp._pull(out)
+        if self.format == pyaudio.paInt16:
+            data = (np.clip(out, -1, 1) * 32767).astype(np.int16).tobytes()
+        else:
+            data = out.tobytes()
+        return data, pyaudio.paContinue
+
+
+# ====================================================
+# Audio Device
+# ====================================================
+class AudioDevice:
+    """Process-wide owner of the PyAudio instance and its streams."""
+
+    def __init__(self):
+        self.pa = None
+        self.mixers = {}
+        self.counts = {"pyaudio_inits": 0, "opens": 0, "reopens": 0, "inputs": 0}
+        self._lock = threading.Lock()
+
+    def mixer(self, rate=SAMPLE_RATE, channels=1, fmt=None):
+        """
+        Running mixer for (rate, channels, format), opened on first use.
+
+        Args:
+            rate: Sample rate in Hz
+            channels: Output channels (mono input is copied to each)
+            fmt: PyAudio sample format (default paFloat32)
+        """
+        fmt = pyaudio.paFloat32 if fmt is None else fmt
+        key = (rate, channels, fmt)
+        with self._lock:
+            mixer = self.mixers.get(key)
+            if mixer is not None and mixer.active():
+                return mixer
+            if self.pa is None:
+                self.pa = pyaudio.PyAudio()
+                self.counts["pyaudio_inits"] += 1
+            if mixer is not None:
+                mixer.close()
+                self.counts["reopens"] += 1
+            with profiler.stage("device.open"):
+                mixer = self.mixers[key] = Mixer(self, rate, channels, fmt)
+            self.counts["opens"] += 1
+            return mixer
+
+    def open_input(self, rate=SAMPLE_RATE, channels=1, fmt=None,
+                   latency=LATENCY_BLOCKS * BLOCK):
+        """
+        New mixer input on the shared stream.
+
+        Args:
+            rate, channels, fmt: Stream parameters (see mixer())
+            latency: Frames an input may queue before write() blocks
+
+        Returns:
+            MixerInput
+        """
+        inp = self.mixer(rate, channels, fmt).add(latency)
+        self.counts["inputs"] += 1
+        return inp
+
+    def warm_up(self, rate=SAMPLE_RATE, channels=1, fmt=None):
+        """Open the stream ahead of the first playback."""
+        self.mixer(rate, channels, fmt)
+        return self
+
+    def stats(self):
+        """Open/reopen counts and currently open streams and inputs."""
+        stats = dict(self.counts)
+        stats["streams"] = len(self.mixers)
+        stats["active_inputs"] = sum(len(m.inputs) for m in self.mixers.values())
+        return stats
+
+    def terminate(self):
+        """Close every stream and release PyAudio."""
+        with self._lock:
+            for mixer in self.mixers.values():
+                mixer.close()
+            self.mixers.clear()
+            if self.pa is not None:
+                self.pa.terminate()
+                self.pa = None
+
+
+_device = None
+
+
+def get_device():
+    """The process-wide AudioDevice."""
+    global _device
+    if _device is None:
+        _device = AudioDevice()
+        atexit.register(_device.terminate)
+    return _device
+
+
+def open_input(rate=SAMPLE_RATE, channels=1, fmt=None, latency=LATENCY_BLOCKS * BLOCK):
+    """Mixer input on the shared device (see AudioDevice.open_input)."""
+    return get_device().open_input(rate, channels, fmt, latency)
+
+
+# ====================================================
+# Main
+# ====================================================
+def main():
+    import play_wave_sound
+
+    device = get_device()
+    start = time.perf_counter()
+    device.warm_up()
+    print(f"Stream opened in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    for i in range(3):
+        start = time.perf_counter()
+        out = device.open_input()
+        setup = (time.perf_counter() - start) * 1000
+        print(f"Playback {i + 1}: setup {setup:.2f}ms")
+        out.close()
+        play_wave_sound.play_chord(['C', 'G7', 'C'], [1, 1, 2], tempo=120)
+    print(device.stats())
+
+
+if __name__ == "__main__":
+    main()
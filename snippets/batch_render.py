@@ -0,0 +1,341 @@
+"""
+Batch Render
+------------
+Headless rendering of many backing tracks from a JSON manifest.
+
+Each job becomes a Song (a chord track plus an optional melody) and is
+written to WAV and/or MIDI. Jobs run on a process pool; each worker
+renders block by block (Track.render_block) straight into the WAV file,
+so its memory stays bounded by the block size rather than the song
+length. Workers are replaced after --max-tasks jobs and, where the
+platform allows, run under a --memory limit, so a runaway job fails on
+its own instead of taking the machine down.
+
+Manifest:
+
+    {
+      "defaults": {"tempo": 100, "waveform": "triangle_bl", "beats_per_chord": 4},
+      "jobs": [
+        {"output": "out/blues.wav",
+         "progression": ["C7", "F7", "C7", "G7"],
+         "melody": {"notes": ["E4", "G4", "rest", "C5"], "durations": [4, 4, 4, 4]}},
+        {"output": ["out/random_{i:02}.wav", "out/random_{i:02}.mid"],
+         "generate": {"bars": 8}, "seed": 1, "count": 10}
+      ]
+    }
+
+Job keys: output (path or list; .wav / .mid), progression (chord symbols
+or note lists) and durations (beats) or generate ({"bars": N}, a random
+progression from generate_chord_progression, reproducible with seed),
+melody ({notes, durations, waveform, volume, style}), tempo, waveform,
+style, volume, voice_leading, sample_rate. "count" repeats a job with {i} in the output
+paths and seed + i.
+
+Usage:
+    python snippets/batch_render.py manifest.json [--workers N] [--max-tasks N]
+                                    [--memory MB] [--report report.json]
+"""
+
+import importlib
+import json
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# ====================================================
+# Global Constants
+# ====================================================
+SAMPLE_RATE = 44100
+BLOCK = 8192            # Frames rendered and written at a time
+MAX_TASKS = 20          # Jobs per worker before it is replaced
+MEMORY_MB = 1024        # Per-worker memory limit (0 = none)
+TICKS_PER_BEAT = 480
+
+JOB_DEFAULTS = {
+    "tempo": 120,
+    "waveform": "sine",
+    "style": "normal",
+    "volume": 0.15,
+    "beats_per_chord": 4,
+    "voice_leading": False,
+    "sample_rate": SAMPLE_RATE,
+}
+
+
+# ====================================================
+# Manifest
+# ====================================================
+def load_manifest(filename):
+    """
+    Read a manifest and expand it into a flat list of jobs.
+
+    Returns:
+        List of job dicts with defaults applied and outputs as lists
+    """
+    with open(filename, encoding="utf-8") as f:
+        manifest = json.load(f)
+    base = os.path.dirname(os.path.abspath(filename))
+    return expand_jobs(manifest.get("jobs", []), manifest.get("defaults", {}), base)
+
+
+def expand_jobs(specs, defaults=None, base="."):
+    """
+    Apply defaults, repeat jobs with a count and resolve output paths.
+
+    Raises:
+        ValueError: A job has no output or no chords
+    """
+    jobs = []
+    for n, spec in enumerate(specs):
+        spec = {**JOB_DEFAULTS, **(defaults or {}), **spec}
+        outputs = spec.get("output")
+        if not outputs:
+            raise ValueError(f"Job {n}: no output")
+        if "progression" not in spec and "generate" not in spec:
+            raise ValueError(f"Job {n}: needs a progression or generate")
+        outputs = [outputs] if isinstance(outputs, str) else list(outputs)
+        for i in range(spec.get("count", 1)):
+            job = dict(spec, index=len(jobs))
+            job["output"] = [os.path.join(base, path.format(i=i)) for path in outputs]
+            if "seed" in spec:
+                job["seed"] = spec["seed"] + i
+            jobs.append(job)
+    return jobs
+
+
+def build_song(job):
+    """Song of a job: its chord track, then the melody if any."""
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    if "generate" in job:
+        import generate_chord_progression as gcp
+
+        random.seed(job.get("seed"))
+        generator = gcp.ChordProgressionGenerator(gcp.CONFIG)
+        progression = generator.generate(bars=job["generate"].get("bars", 4))
+    else:
+        progression = job["progression"]
+    durations = job.get("durations") or [job["beats_per_chord"]] * len(progression)
+
+    song = wave_sound.Song(tempo=job["tempo"])
+    song.add_chords(progression, durations, job["style"], job["volume"], job["waveform"],
+                    voice_leading=job["voice_leading"])
+    melody = job.get("melody")
+    if melody:
+        song.add_melody(melody["notes"], melody["durations"], melody.get("style", "normal"),
+                        melody.get("volume", 0.2), melody.get("waveform", job["waveform"]))
+    return song
+
+
+# ====================================================
+# Writers
+# ====================================================
+def write_wav(song, filename, sample_rate=SAMPLE_RATE, block=BLOCK):
+    """
+    Render a song block by block into a 16-bit mono WAV file.
+
+    The mix is scaled like Song.render() would scale it: unchanged unless
+    the track volumes could add up past full scale, then to a peak of 0.9
+    at most.
+
+    Returns:
+        Length in samples
+    """
+    import wave
+
+    length = song.length(sample_rate)
+    headroom = sum(track.volume for track in song.tracks)
+    gain = 0.9 / headroom if headroom > 1.0 else 1.0
+    mix = np.zeros(block, dtype=np.float32)
+    pcm = np.empty(block, dtype=np.int16)
+    with wave.open(filename, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        for start in range(0, length, block):
+            n = min(block, length - start)
+            out = mix[:n]
+            out.fill(0)
+            for track in song.tracks:
+                track.render_block(start, n, sample_rate, out=out)
+            if gain != 1.0:
+                out *= gain
+            np.clip(out, -1.0, 1.0, out=out)
+            np.multiply(out, 32767, out=pcm[:n], casting='unsafe')
+            f.writeframes(pcm[:n].data)
+    return length
+
+
+def note_number(note):
+    """MIDI note number of a note name or frequency."""
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    freq = wave_sound.NoteUtils.note_to_freq(note)
+    return int(round(69 + 12 * np.log2(freq / 440.0)))
+
+
+def write_midi(song, filename, ticks_per_beat=TICKS_PER_BEAT):
+    """
+    Save a song as a MIDI file, one MIDI track and channel per track.
+
+    The tracks' note schedules are computed at a "sample rate" of one
+    tick, so note lengths follow the same playing styles as the audio.
+    """
+    from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo
+
+    mid = MidiFile(ticks_per_beat=ticks_per_beat)
+    for channel, track in enumerate(song.tracks):
+        events = track.events(ticks_per_beat * track.tempo / 60.0)
+        velocity = max(1, min(127, int(round(track.volume * 400))))     # 0.2 -> 80
+        messages = []
+        for start, end, _, notes, _ in events:
+            for note in [notes] if isinstance(notes, (str, int, float)) else notes:
+                messages.append((start, 1, 'note_on', note_number(note), velocity))
+                messages.append((end, 0, 'note_off', note_number(note), 0))
+
+        midi_track = MidiTrack()
+        mid.tracks.append(midi_track)
+        midi_track.append(MetaMessage('set_tempo', tempo=bpm2tempo(track.tempo), time=0))
+        now = 0
+        for tick, _, kind, note, velocity in sorted(messages):
+            midi_track.append(Message(kind, channel=channel % 16, note=note,
+                                      velocity=velocity, time=tick - now))
+            now = tick
+    mid.save(filename)
+
+
+# ====================================================
+# Worker
+# ====================================================
+def init_worker(memory_mb):
+    """Single-threaded math and an optional address-space limit per worker."""
+    for var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+        os.environ[var] = "1"
+    if memory_mb:
+        try:
+            import resource
+        except ImportError:
+            return      # No rlimits on this platform
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def render_job(job):
+    """
+    Render one job to its outputs.
+
+    Returns:
+        Dict with index, output, seconds (of audio), wall, and error (None
+        on success)
+    """
+    start = time.perf_counter()
+    result = {"index": job["index"], "output": job["output"], "seconds": 0.0, "error": None}
+    try:
+        song = build_song(job)
+        sample_rate = job["sample_rate"]
+        for path in job["output"]:
+            ext = os.path.splitext(path)[1].lower()
+            if ext not in (".wav", ".mid", ".midi"):
+                raise ValueError(f"Unknown output type: {path}")
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            # Written under a temporary name, so a failed job leaves no partial file
+            part = f"{path}.part"
+            try:
+                if ext == ".wav":
+                    result["seconds"] = write_wav(song, part, sample_rate) / sample_rate
+                else:
+                    write_midi(song, part)
+                os.replace(part, path)
+            finally:
+                if os.path.exists(part):
+                    os.remove(part)
+    except MemoryError:
+        result["error"] = "MemoryError: job exceeded the worker memory limit"
+    except Exception as e:  # noqa: BLE001 - reported per job, the batch goes on
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["wall"] = time.perf_counter() - start
+    return result
+
+
+# ====================================================
+# Batch
+# ====================================================
+def run_batch(jobs, workers=None, max_tasks=MAX_TASKS, memory_mb=MEMORY_MB, progress=None):
+    """
+    Render jobs on a process pool.
+
+    Args:
+        jobs: Jobs from load_manifest() / expand_jobs()
+        workers: Worker processes (default: CPU count)
+        max_tasks: Jobs per worker before it is replaced
+        memory_mb: Per-worker memory limit in MB (0 = none)
+        progress: Optional callback(result) as jobs finish
+
+    Returns:
+        Report dict: jobs, failed, audio_seconds, wall_seconds, throughput
+        (audio seconds per wall second), results (in job order)
+    """
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    results = []
+    # Workers are started fresh ("spawn") so the rlimit and thread settings
+    # apply before numpy loads, and are replaced after max_tasks jobs
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(workers, initializer=init_worker, initargs=(memory_mb,),
+                      maxtasksperchild=max_tasks) as pool:
+        for result in pool.imap_unordered(render_job, jobs):
+            results.append(result)
+            if progress:
+                progress(result)
+
+    wall = time.perf_counter() - start
+    audio = sum(r["seconds"] for r in results)
+    return {
+        "jobs": len(results),
+        "failed": sum(1 for r in results if r["error"]),
+        "workers": workers,
+        "audio_seconds": audio,
+        "wall_seconds": wall,
+        "throughput": audio / wall if wall else 0.0,
+        "results": sorted(results, key=lambda r: r["index"]),
+    }
+
+
+# ====================================================
+# Main
+# ====================================================
+def _option(args, name, default, cast=int):
+    return cast(args[args.index(name) + 1]) if name in args else default
+
+
+def main():
+    args = sys.argv[1:]
+    if not args or args[0].startswith("-"):
+        print(__doc__.split("Usage:")[1].rstrip())
+        sys.exit(1)
+
+    jobs = load_manifest(args[0])
+    workers = _option(args, "--workers", None)
+
+    def progress(result):
+        status = "ok" if not result["error"] else f"FAILED ({result['error']})"
+        print(f"[{result['index'] + 1}/{len(jobs)}] {', '.join(result['output'])}: "
+              f"{result['seconds']:.1f}s audio in {result['wall']:.2f}s {status}")
+
+    report = run_batch(jobs, workers, _option(args, "--max-tasks", MAX_TASKS),
+                       _option(args, "--memory", MEMORY_MB), progress)
+    print(f"{report['jobs']} jobs, {report['failed']} failed, {report['workers']} workers: "
+          f"{report['audio_seconds']:.1f}s audio in {report['wall_seconds']:.2f}s "
+          f"({report['throughput']:.1f}x real time)")
+    if "--report" in args:
+        with open(args[args.index("--report") + 1], "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
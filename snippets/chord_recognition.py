@@ -0,0 +1,243 @@
+"""
+Chord Recognition
+-----------------
+Timed chord sequence of a WAV file.
+
+The recording is read in blocks and framed with sliding_window_view. For
+each block the STFT magnitudes are folded to 12 pitch classes with a
+precomputed bins x 12 chroma matrix, smoothed, and scored against every
+chord template in one matrix multiply.
+
+Overtones land on other pitch classes (the 3rd harmonic of the third is
+the major seventh), so a bright triad would otherwise score as a seventh
+chord. Each template therefore includes the first HARMONICS partials of
+its notes, weaker by HARMONIC_DECAY per partial, and every note beyond
+three costs EXTRA_NOTE_PENALTY so that triads win near-ties. The chroma
+starts at A2: below it a bin is wider than a semitone, and a bass note
+leaks into its neighbours.
+
+Templates cover 12 roots x the qualities of NoteUtils.parse_chord_symbol
+(multi-track_wave_sound.py). Qualities with the same pitch classes as an
+earlier template (C6 = Am7, the rotations of aug and dim7) are listed once.
+
+Usage:
+    python chord_recognition.py song.wav
+    python chord_recognition.py song.wav --chords     # chord names only
+"""
+
+import functools
+import importlib
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from onset_timing import read_blocks
+
+# ====================================================
+# Global Constants
+# ====================================================
+FRAME = 8192            # STFT frame length (~186ms at 44.1kHz)
+HOP = 4096
+FMIN = 110.0            # Chroma frequency range (A2 - C7)
+FMAX = 2100.0
+HARMONICS = 4           # Partials per note in the templates
+HARMONIC_DECAY = 0.8    # Weight of each partial relative to the one below
+EXTRA_NOTE_PENALTY = 0.01   # Score cost of each template note beyond three
+SMOOTH_FRAMES = 4       # Moving average over chroma frames
+MIN_DURATION = 0.3      # Shorter segments are merged into a neighbour
+MIN_ENERGY = 1e-3       # Quieter frames are 'N' (no chord)
+
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+QUALITIES = ['', 'm', '7', 'm7', 'M7', 'dim', 'aug', 'm7b5', 'dim7',
+             '6', 'm6', 'sus4', '7sus4', '9']
+NO_CHORD = 'N'
+
+
+# ====================================================
+# Templates and Chroma Matrix
+# ====================================================
+@functools.lru_cache(maxsize=None)
+def chord_templates():
+    """
+    Unit-length chord templates from NoteUtils.parse_chord_symbol.
+
+    Partial h of a note adds HARMONIC_DECAY ** (h - 1) to the pitch class
+    round(12 * log2(h)) semitones above it.
+
+    Returns:
+        Tuple of (chord symbols, templates array of shape (chords, 12),
+        penalties array of shape (chords,))
+    """
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    partials = [(round(12 * np.log2(h)), HARMONIC_DECAY ** (h - 1))
+                for h in range(1, HARMONICS + 1)]
+    symbols, rows, penalties, seen = [], [], [], set()
+    for quality in QUALITIES:
+        for root, name in enumerate(NOTE_NAMES):
+            _, intervals = wave_sound.NoteUtils.parse_chord_symbol(name + quality)
+            pcs = frozenset((root + i) % 12 for i in intervals)
+            if pcs in seen:
+                continue
+            seen.add(pcs)
+            row = np.zeros(12)
+            for pc in pcs:
+                for offset, weight in partials:
+                    row[(pc + offset) % 12] += weight
+            symbols.append(name + quality)
+            rows.append(row / np.linalg.norm(row))
+            penalties.append(EXTRA_NOTE_PENALTY * max(len(pcs) - 3, 0))
+    return symbols, np.array(rows), np.array(penalties)
+
+
+@functools.lru_cache(maxsize=None)
+def chroma_matrix(sample_rate, frame=FRAME, fmin=FMIN, fmax=FMAX):
+    """
+    Map rfft bins to pitch classes.
+
+    Each bin in the frequency range is shared between its two nearest
+    semitones in proportion to its distance (in cents) from each.
+
+    Returns:
+        Array of shape (frame // 2 + 1, 12)
+    """
+    freqs = np.fft.rfftfreq(frame, 1 / sample_rate)
+    matrix = np.zeros((len(freqs), 12))
+    valid = (freqs >= fmin) & (freqs <= fmax)
+    # Semitones above C0 (A4 = 440Hz)
+    semitones = 12 * np.log2(freqs[valid] / 440.0) + 57
+    lower = np.floor(semitones)
+    weight = semitones - lower
+    rows = np.flatnonzero(valid)
+    matrix[rows, lower.astype(int) % 12] += 1 - weight
+    matrix[rows, (lower.astype(int) + 1) % 12] += weight
+    return matrix
+
+
+# ====================================================
+# Recognition
+# ====================================================
+class ChordRecognizer:
+    """Streaming chroma extraction and template matching."""
+
+    def __init__(self, sample_rate, frame=FRAME, hop=HOP):
+        """
+        Initialize recognizer.
+
+        Args:
+            sample_rate: Audio sample rate
+            frame: STFT frame length
+            hop: Frame hop in samples
+        """
+        self.sample_rate = sample_rate
+        self.frame = frame
+        self.hop = hop
+        self.window = np.hanning(frame).astype(np.float32)
+        self.matrix = chroma_matrix(sample_rate, frame).astype(np.float32)
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.chroma = []
+
+    def feed(self, block):
+        """Compute chroma frames of one block of mono samples."""
+        buf = np.concatenate([self.carry, block])
+        if len(buf) < self.frame:
+            self.carry = buf
+            return
+        frames = sliding_window_view(buf, self.frame)[::self.hop]
+        mag = np.abs(np.fft.rfft(frames * self.window, axis=1)).astype(np.float32)
+        self.chroma.append(mag @ self.matrix)
+        self.carry = buf[len(frames) * self.hop:]
+
+    def labels(self):
+        """
+        Best chord per frame.
+
+        Returns:
+            Tuple of (frame times in seconds, list of chord symbols)
+        """
+        if not self.chroma:
+            return np.empty(0), []
+        chroma = np.concatenate(self.chroma).astype(np.float64)
+
+        # Moving average over neighbouring frames
+        k = SMOOTH_FRAMES
+        padded = np.pad(chroma, ((k // 2, k - 1 - k // 2), (0, 0)), mode="edge")
+        cumsum = np.concatenate([np.zeros((1, 12)), np.cumsum(padded, axis=0)])
+        chroma = (cumsum[k:] - cumsum[:-k]) / k
+
+        norms = np.linalg.norm(chroma, axis=1)
+        energy = norms / (norms.max() or 1.0)
+        chroma /= np.where(norms > 0, norms, 1)[:, None]
+
+        symbols, templates, penalties = chord_templates()
+        best = (chroma @ templates.T - penalties).argmax(axis=1)
+        labels = [NO_CHORD if e < MIN_ENERGY else symbols[b] for b, e in zip(best, energy)]
+        # Each frame stands for the hop around its center
+        times = (np.arange(len(labels)) * self.hop + (self.frame - self.hop) / 2) / self.sample_rate
+        return times, labels
+
+
+def segments(times, labels, hop_seconds, min_duration=MIN_DURATION):
+    """
+    Merge frame labels into timed chords.
+
+    Returns:
+        List of (start, end, chord symbol)
+    """
+    runs = []
+    for t, label in zip(times, labels):
+        if runs and runs[-1][2] == label:
+            runs[-1][1] = t + hop_seconds
+        else:
+            runs.append([t, t + hop_seconds, label])
+
+    # Absorb short runs into the previous chord
+    merged = []
+    for run in runs:
+        if merged and (run[1] - run[0] < min_duration or merged[-1][2] == run[2]):
+            merged[-1][1] = run[1]
+        else:
+            merged.append(run)
+    if len(merged) > 1 and merged[0][1] - merged[0][0] < min_duration:
+        merged[1][0] = merged[0][0]
+        merged.pop(0)
+    return [(float(s), float(e), label) for s, e, label in merged]
+
+
+def recognize_file(filename):
+    """
+    Recognize the chords of a WAV file.
+
+    Returns:
+        List of (start, end, chord symbol)
+    """
+    blocks = read_blocks(filename)
+    sample_rate = next(blocks)
+    recognizer = ChordRecognizer(sample_rate)
+    for block in blocks:
+        recognizer.feed(block)
+    times, labels = recognizer.labels()
+    return segments(times, labels, recognizer.hop / sample_rate)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: python chord_recognition.py FILE.wav [--chords]")
+        exit(1)
+
+    start = time.perf_counter()
+    chords = recognize_file(args[0])
+    elapsed = time.perf_counter() - start
+
+    if "--chords" in args:
+        print(" ".join(label for _, _, label in chords if label != NO_CHORD))
+        return
+    for s, e, label in chords:
+        print(f"  {s:7.2f}s - {e:7.2f}s  {label}")
+    duration = chords[-1][1] if chords else 0
+    print(f"{len(chords)} chords in {elapsed:.2f}s ({duration / max(elapsed, 1e-9):.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,342 @@
+"""
+Drum Pattern Engine
+-------------------
+Plays the multi-row drum grids sketched in notes.md and vim_piano_roll.md:
+
+    HH - 1010 1010 1010 1010          hi-hat |x.x.x.x.x.x.x.x.|
+    SD - 0000 1000 0000 1000          snare  |..x...x...x...x.|
+    BD - 1000 0000 1010 0000          kick   |x.......x.......|
+
+Each row becomes per-stroke bitmasks (normal, accent, flam, double). Every
+voice is synthesized once per sample rate, and a bar is rendered by adding
+all hits of a stroke type in one vectorized np.add.at call. Indices wrap
+around the bar, so flam grace notes and ringing tails land where they would
+when the bar is looped, and the bar can be repeated seamlessly.
+
+Grid symbols: 1/x hit, X/> accent, f flam, d double stroke, 0/./- rest.
+
+Usage:
+    python drum_engine.py [8beat|fill|FILE] [--bpm 100] [--bars 4] [--save out.wav]
+"""
+
+import functools
+import importlib
+import re
+import sys
+
+import numpy as np
+
+# ====================================================
+# Global Constants
+# ====================================================
+SAMPLE_RATE = 44100
+
+PATTERNS = {
+    '8beat': """
+        HH - 1010 1010 1010 1010
+        SD - 0000 1000 0000 1000
+        BD - 1000 0000 1010 0000
+    """,
+    'fill': """
+        SY - 1000 0010 0000 1000
+        SD - 0011 1100 1111 0000
+        BD - 1000 0010 1000 1000
+    """,
+}
+
+VOICE_ALIASES = {
+    'hh': 'HH', 'hi-hat': 'HH', 'hihat': 'HH',
+    'sd': 'SD', 'snare': 'SD',
+    'bd': 'BD', 'kick': 'BD',
+    'sy': 'SY', 'cymbal': 'SY', 'crash': 'SY',
+}
+
+STROKES = {'normal': 0.7, 'accent': 1.0, 'ghost': 0.3}
+FLAM_GRACE = 0.03       # Grace note lead time (seconds)
+FLAM_VELOCITY = 0.35
+BAR_CACHE_SIZE = 64     # Rendered bars kept (a few MB each at long loops)
+
+GRID_ROW = re.compile(r"^\s*([A-Za-z][\w-]*)\s*[-|:]\s*([01xX>fd.\-| ]+)$")
+STEP_SYMBOL = re.compile(r"[01xX>fd.]")
+
+
+# ====================================================
+# Grid Parsing
+# ====================================================
+def grid_voice(voice):
+    """Canonical voice name."""
+    return VOICE_ALIASES.get(voice.lower(), voice.upper())
+
+
+class DrumGrid:
+    """Per-voice stroke bitmasks for one bar (or a multi-bar loop)."""
+
+    def __init__(self, steps, beats=4):
+        """
+        Initialize grid.
+
+        Args:
+            steps: Number of steps in the loop
+            beats: Beats covered by the loop
+        """
+        self.steps = steps
+        self.beats = beats
+        # voice -> {'normal': mask, 'accent': mask, 'flam': mask, 'double': mask}
+        self.voices = {}
+
+    def set_row(self, voice, cells):
+        """
+        Set a voice from grid cells.
+
+        Args:
+            voice: Voice name (HH, SD, BD, SY or an alias)
+            cells: String of grid symbols, one per step
+        """
+        voice = grid_voice(voice)
+        masks = {'normal': 0, 'accent': 0, 'flam': 0, 'double': 0}
+        for i, c in enumerate(cells):
+            if c in '1x':
+                masks['normal'] |= 1 << i
+            elif c in 'X>':
+                masks['accent'] |= 1 << i
+            elif c == 'f':
+                masks['flam'] |= 1 << i
+            elif c == 'd':
+                masks['double'] |= 1 << i
+        self.voices[voice] = masks
+
+    def key(self):
+        """Hashable description used for render caching."""
+        return (self.steps, self.beats,
+                tuple(sorted((v, tuple(sorted(m.items()))) for v, m in self.voices.items())))
+
+
+def parse_grids(text, beats=4):
+    """
+    Parse grid rows; blocks separated by blank lines become separate grids.
+
+    Args:
+        text: Text containing grid rows
+        beats: Beats per bar
+
+    Returns:
+        List of DrumGrid
+    """
+    grids, rows = [], []
+    for line in text.splitlines() + [""]:
+        m = GRID_ROW.match(line)
+        if m and STEP_SYMBOL.search(m.group(2)):
+            rows.append((m.group(1), m.group(2)))
+        elif rows:
+            # Multi-bar rows ('|x.x.|x.x.|') loop over all their bars
+            bars = max(len([g for g in raw.split("|") if g.strip()]) for _, raw in rows)
+            cells = [(voice, re.sub(r"[\s|]", "", raw)) for voice, raw in rows]
+            steps = max(len(c) for _, c in cells)
+            grid = DrumGrid(steps, beats * bars)
+            for voice, c in cells:
+                grid.set_row(voice, c.ljust(steps, '0'))
+            grids.append(grid)
+            rows = []
+    return grids
+
+
+def practice_grid(pattern, stroke_type='single_stroke', voice='SD', beats=None):
+    """
+    Build a grid from a notes.md practice pattern.
+
+    Args:
+        pattern: Bit pattern such as '1101 0001 1010'
+        stroke_type: 'single_stroke', 'double_stroke', 'accent' or 'flam'
+        voice: Voice to play the pattern on
+        beats: Beats covered (default: one beat per 4-step group)
+
+    Returns:
+        DrumGrid
+    """
+    groups = pattern.split()
+    bits = "".join(groups)
+    on, off = {
+        'single_stroke': ('x', '.'),
+        'double_stroke': ('d', 'x'),
+        'accent': ('X', 'x'),
+        'flam': ('f', 'x'),
+    }[stroke_type]
+    grid = DrumGrid(len(bits), beats or len(groups))
+    grid.set_row(voice, "".join(on if b == '1' else off for b in bits))
+    if stroke_type == 'accent':
+        # Unaccented notes are played as ghost notes
+        masks = grid.voices[grid_voice(voice)]
+        masks['ghost'], masks['normal'] = masks['normal'], 0
+    return grid
+
+
+# ====================================================
+# Voice Synthesis
+# ====================================================
+@functools.lru_cache(maxsize=None)
+def voice_sample(voice, sample_rate=SAMPLE_RATE):
+    """
+    Synthesize one hit of a voice (cached per sample rate).
+
+    Returns:
+        Read-only float32 array
+    """
+    rng = np.random.default_rng(sum(map(ord, voice)))
+
+    def decay(seconds, length):
+        n = int(length * sample_rate)
+        return np.exp(-np.arange(n) / (seconds * sample_rate)), n
+
+    if voice == 'BD':
+        env, n = decay(0.12, 0.4)
+        t = np.arange(n) / sample_rate
+        # Pitch sweep 120Hz -> 45Hz
+        freq = 45 + 75 * np.exp(-t / 0.03)
+        phase = 2 * np.pi * np.cumsum(freq) / sample_rate
+        wave = np.sin(phase) * env
+    elif voice == 'SD':
+        env, n = decay(0.06, 0.25)
+        t = np.arange(n) / sample_rate
+        wave = (0.6 * rng.uniform(-1, 1, n) + 0.5 * np.sin(2 * np.pi * 185 * t)) * env
+    elif voice == 'HH':
+        env, n = decay(0.015, 0.08)
+        wave = np.diff(rng.uniform(-1, 1, n + 1)) * 0.5 * env
+    elif voice == 'SY':
+        env, n = decay(0.35, 1.5)
+        wave = np.diff(rng.uniform(-1, 1, n + 1)) * 0.4 * env
+    else:
+        # Unknown voice: short click
+        env, n = decay(0.01, 0.05)
+        wave = np.sin(2 * np.pi * 1000 * np.arange(n) / sample_rate) * env
+
+    wave = wave.astype(np.float32)
+    wave.flags.writeable = False
+    return wave
+
+
+# ====================================================
+# Bar Rendering
+# ====================================================
+def mask_steps(mask):
+    """Step indices of set bits."""
+    return np.array([i for i in range(mask.bit_length()) if mask >> i & 1], dtype=np.int64)
+
+
+def render_bar(grid, bpm=120, sample_rate=SAMPLE_RATE):
+    """
+    Render one loop of a grid.
+
+    Hits that ring past the end of the loop (or flam grace notes before
+    its start) wrap around, so repeating the returned buffer is seamless.
+
+    Args:
+        grid: DrumGrid
+        bpm: Tempo
+        sample_rate: Audio sample rate
+
+    Returns:
+        float32 array of exactly one loop
+    """
+    return _render(grid.key(), bpm, sample_rate)
+
+
+@functools.lru_cache(maxsize=BAR_CACHE_SIZE)
+def _render(key, bpm, sample_rate):
+    # Rendered from the key alone, so a cached bar can never go stale
+    steps, beats, voices = key
+    loop_samples = round(beats * 60.0 / bpm * sample_rate)
+    step_samples = loop_samples / steps
+    buf = np.zeros(loop_samples, dtype=np.float32)
+    grace = int(FLAM_GRACE * sample_rate)
+
+    for voice, masks in voices:
+        masks = dict(masks)
+        hit = voice_sample(voice, sample_rate)
+        ramp = np.arange(len(hit))
+
+        # (onsets, velocity) for every stroke variant of this voice
+        hits = []
+        for stroke, velocity in STROKES.items():
+            if masks.get(stroke):
+                hits.append((np.round(mask_steps(masks[stroke]) * step_samples), velocity))
+        if masks.get('flam'):
+            onsets = np.round(mask_steps(masks['flam']) * step_samples)
+            hits.append((onsets - grace, FLAM_VELOCITY))
+            hits.append((onsets, STROKES['accent']))
+        if masks.get('double'):
+            onsets = np.round(mask_steps(masks['double']) * step_samples)
+            hits.append((onsets, STROKES['normal']))
+            hits.append((onsets + np.round(step_samples / 2), STROKES['normal']))
+
+        for onsets, velocity in hits:
+            idx = (onsets.astype(np.int64)[:, None] + ramp) % loop_samples
+            np.add.at(buf, idx, np.broadcast_to(hit * velocity, idx.shape))
+
+    buf.flags.writeable = False
+    return buf
+
+
+def loop(grid, bpm=120, bars=4, sample_rate=SAMPLE_RATE):
+    """Render a grid repeated for a number of loops."""
+    return np.tile(render_bar(grid, bpm, sample_rate), bars)
+
+
+# ====================================================
+# Playback
+# ====================================================
+def play(grid, bpm=120, bars=4, volume=0.8, sample_rate=SAMPLE_RATE):
+    """
+    Play a grid looped for a number of bars.
+
+    The loop is written to the stream bar by bar, so a long practice
+    session never holds more than one bar in memory.
+    """
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    bar = render_bar(grid, bpm, sample_rate) * volume
+    data = np.clip(bar, -1.0, 1.0).astype(np.float32).tobytes()
+    with wave_sound.AudioPlayer(sample_rate) as player:
+        for _ in range(bars):
+            player.stream.write(data)
+
+
+def main():
+    args = sys.argv[1:]
+    bpm, bars, save = 100, 4, None
+    if "--bpm" in args:
+        i = args.index("--bpm")
+        bpm = int(args[i + 1])
+        del args[i:i + 2]
+    if "--bars" in args:
+        i = args.index("--bars")
+        bars = int(args[i + 1])
+        del args[i:i + 2]
+    if "--save" in args:
+        i = args.index("--save")
+        save = args[i + 1]
+        del args[i:i + 2]
+
+    source = args[0] if args else '8beat'
+    if source in PATTERNS:
+        text = PATTERNS[source]
+    else:
+        with open(source, encoding="utf-8") as f:
+            text = f.read()
+
+    grids = parse_grids(text)
+    if not grids:
+        print(f"No drum grid found in {source}")
+        exit(1)
+
+    for grid in grids:
+        print(f"{', '.join(grid.voices)}: {grid.steps} steps, BPM {bpm}")
+        if save:
+            from scipy.io import wavfile
+            wave = loop(grid, bpm, bars)
+            wavfile.write(save, SAMPLE_RATE, (np.clip(wave, -1, 1) * 32767).astype(np.int16))
+            print(f"✅ Saved to {save}")
+            break
+        play(grid, bpm, bars)
+
+
+if __name__ == "__main__":
+    main()
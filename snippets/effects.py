@@ -0,0 +1,450 @@
+"""
+Effects
+-------
+Block-based effects with constant per-block cost, for the Song output or
+a mixer bus:
+
+    ConvolutionReverb  uniformly partitioned FFT convolution with an
+                       impulse response (WAV file or generated room)
+    Delay              feedback delay on a ring buffer
+    LowPass/HighPass   biquads run as a state-space block filter (a few
+                       matrix products per block instead of a sample loop)
+    EffectsChain       effects in series
+
+Every effect processes blocks in place, mono (frames,) or (frames,
+channels) float32, and keeps its state between blocks:
+
+    chain = EffectsChain([HighPass(80), Delay(0.375, 0.3, 0.2),
+                          ConvolutionReverb(room_ir(2.5), mix=0.25)])
+    for block in blocks:
+        chain.process(block)
+    wave = chain.apply(song.render())     # whole song, block by block, plus tail
+
+The reverb costs the same per block however long the impulse response
+is spread over partitions (one FFT, one inverse FFT and a multiply-add
+per partition); its wet signal lags by one partition (BLOCK samples).
+
+Usage:
+    python snippets/effects.py [--ir hall.wav] [--save out.wav] [--bench]
+"""
+
+import functools
+import importlib
+import sys
+import time
+
+import profiler
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# ====================================================
+# Global Constants
+# ====================================================
+SAMPLE_RATE = 44100
+BLOCK = 512             # Partition size / filter block size
+DTYPE = 'float32'
+
+
+def _frames(block):
+    """(frames, channels) view of a mono or multichannel block."""
+    return block[:, None] if block.ndim == 1 else block
+
+
+# ====================================================
+# Impulse Responses
+# ====================================================
+def room_ir(seconds=2.0, rt60=None, sample_rate=SAMPLE_RATE, channels=2, seed=0):
+    """
+    Synthetic room impulse response: decorrelated noise per channel with
+    an exponential decay (-60 dB after rt60 seconds).
+
+    Returns:
+        (samples, channels) float32 array
+    """
+    rt60 = seconds if rt60 is None else rt60
+    n = int(seconds * sample_rate)
+    t = np.arange(n) / sample_rate
+    noise = np.random.default_rng(seed).standard_normal((n, channels))
+    ir = noise * np.exp(-6.91 * t / rt60)[:, None]
+    return ir.astype(DTYPE)
+
+
+def load_ir(filename, sample_rate=SAMPLE_RATE):
+    """
+    Read an impulse response WAV (resampled linearly if needed).
+
+    Returns:
+        (samples, channels) float32 array
+    """
+    from scipy.io import wavfile
+
+    rate, data = wavfile.read(filename)
+    if data.dtype.kind in 'iu':
+        data = data / float(np.iinfo(data.dtype).max)
+    data = _frames(np.asarray(data, dtype=np.float64))
+    if rate != sample_rate:
+        n = int(len(data) * sample_rate / rate)
+        x = np.arange(n) * rate / sample_rate
+        data = np.stack([np.interp(x, np.arange(len(data)), ch) for ch in data.T], axis=1)
+    return data.astype(DTYPE)
+
+
+# ====================================================
+# Convolution Reverb
+# ====================================================
+class ConvolutionReverb:
+    """Uniformly partitioned overlap-save convolution."""
+
+    def __init__(self, ir, mix=0.3, partition=BLOCK, sample_rate=SAMPLE_RATE):
+        """
+        Args:
+            ir: Impulse response, (samples,) or (samples, channels); mono
+                IRs are applied to every channel
+            mix: Wet level (0 = dry only, 1 = wet only, as on a send bus)
+            partition: Partition size in samples (the wet signal's latency)
+            sample_rate: Audio sample rate
+        """
+        ir = _frames(np.asarray(ir, dtype=np.float64))
+        ir = ir / max(np.sqrt(np.sum(ir ** 2) / ir.shape[1]), 1e-12)    # Unit energy
+        p = partition
+        k = max(1, -(-len(ir) // p))
+        padded = np.zeros((k * p, ir.shape[1]))
+        padded[:len(ir)] = ir
+        # Spectrum of each partition, zero-padded to 2P: (K, P + 1, channels),
+        # last partition first to line up with the delay line (oldest first)
+        spectra = np.fft.rfft(padded.reshape(k, p, -1), n=2 * p, axis=1)
+        self.spectra = np.ascontiguousarray(spectra[::-1], dtype=np.complex64)
+        self.partition = p
+        self.mix = mix
+        self.tail = len(ir) / sample_rate
+        self.reset()
+
+    def reset(self):
+        """Clear the delay line and any buffered input."""
+        self._channels = None
+        self._fill = 0
+
+    def _start(self, channels):
+        k, bins, ir_channels = self.spectra.shape
+        if ir_channels not in (1, channels):
+            self.spectra = np.ascontiguousarray(self.spectra[:, :, :channels])
+        p = self.partition
+        self._channels = channels
+        self._window = np.zeros((2 * p, channels))          # Last two partitions of input
+        self._pending = np.zeros((p, channels), dtype=DTYPE)
+        self._ready = np.zeros((p, channels), dtype=DTYPE)  # Wet output of the last partition
+        # Input spectra, stored twice so the last K are always one slice
+        self._fdl = np.zeros((2 * k, bins, channels), dtype=np.complex64)
+        self._terms = np.zeros((k, bins, channels), dtype=np.complex64)
+        self._head = 0
+
+    def process(self, block):
+        """Convolve a block in place."""
+        x = _frames(block)
+        if self._channels != x.shape[1]:
+            self._start(x.shape[1])
+        p = self.partition
+        i = 0
+        with profiler.stage("fx.reverb", len(x)):
+            while i < len(x):
+                n = min(len(x) - i, p - self._fill)
+                chunk = x[i:i + n]
+                self._pending[self._fill:self._fill + n] = chunk
+                wet = self._ready[self._fill:self._fill + n]
+                chunk *= 1 - self.mix
+                chunk += self.mix * wet
+                self._fill += n
+                i += n
+                if self._fill == p:
+                    self._convolve()
+                    self._fill = 0
+        return block
+
+    def _convolve(self):
+        """Output of one partition: sum over k of X[now - k] * H[k]."""
+        p = self.partition
+        window = self._window
+        window[:p] = window[p:]
+        window[p:] = self._pending
+        k = len(self.spectra)
+        h = self._head
+        self._fdl[h] = self._fdl[h + k] = np.fft.rfft(window, axis=0)
+        np.multiply(self._fdl[h + 1:h + k + 1], self.spectra, out=self._terms)
+        spectrum = self._terms.sum(axis=0)
+        self._ready[:] = np.fft.irfft(spectrum, n=2 * p, axis=0)[p:]
+        self._head = (self._head + 1) % k
+
+
+# ====================================================
+# Delay
+# ====================================================
+class Delay:
+    """Feedback delay."""
+
+    def __init__(self, time=0.3, feedback=0.35, mix=0.3, sample_rate=SAMPLE_RATE):
+        """
+        Args:
+            time: Delay time in seconds
+            feedback: Level fed back into the line (0-1)
+            mix: Wet level
+            sample_rate: Audio sample rate
+        """
+        self.samples = max(1, int(time * sample_rate))
+        self.feedback = feedback
+        self.mix = mix
+        # Until the echoes fall below -60 dB
+        repeats = np.log(1e-3) / np.log(feedback) if 0 < feedback < 1 else 1
+        self.tail = time * repeats
+        self.reset()
+
+    def reset(self):
+        """Clear the delay line."""
+        self._ring = None
+        self._pos = 0
+
+    def process(self, block):
+        """Delay a block in place."""
+        x = _frames(block)
+        if self._ring is None or self._ring.shape[1] != x.shape[1]:
+            self._ring = np.zeros((self.samples, x.shape[1]), dtype=DTYPE)
+            self._delayed = np.zeros((min(self.samples, BLOCK), x.shape[1]), dtype=DTYPE)
+            self._pos = 0
+        i = 0
+        with profiler.stage("fx.delay", len(x)):
+            while i < len(x):
+                # Contiguous stretch of the ring, at most one delay long
+                n = min(len(x) - i, self.samples - self._pos, len(self._delayed))
+                chunk = x[i:i + n]
+                slot = self._ring[self._pos:self._pos + n]
+                delayed = self._delayed[:n]
+                delayed[:] = slot
+                slot *= self.feedback
+                slot += chunk
+                chunk *= 1 - self.mix
+                delayed *= self.mix
+                chunk += delayed
+                self._pos = (self._pos + n) % self.samples
+                i += n
+        return block
+
+
+# ====================================================
+# Biquad Filters
+# ====================================================
+@functools.lru_cache(maxsize=64)
+def biquad_coefficients(kind, cutoff, q, sample_rate):
+    """
+    Low/high-pass coefficients (Audio EQ Cookbook).
+
+    Returns:
+        (b0, b1, b2, a1, a2), normalized so that a0 = 1
+    """
+    w = 2 * np.pi * cutoff / sample_rate
+    alpha = np.sin(w) / (2 * q)
+    cos = np.cos(w)
+    if kind == 'lowpass':
+        b = [(1 - cos) / 2, 1 - cos, (1 - cos) / 2]
+    elif kind == 'highpass':
+        b = [(1 + cos) / 2, -(1 + cos), (1 + cos) / 2]
+    else:
+        raise ValueError(f"Unknown filter type: {kind}")
+    a0 = 1 + alpha
+    return (b[0] / a0, b[1] / a0, b[2] / a0, -2 * cos / a0, (1 - alpha) / a0)
+
+
+@functools.lru_cache(maxsize=64)
+def block_matrices(coefficients, frames):
+    """
+    State-space form of a biquad over a block of `frames` samples.
+
+    With the transposed direct form II state s (2 values):
+        y = T @ x + O @ s       (T: impulse response Toeplitz, O: state response)
+        s = AN @ s + S @ x
+
+    Returns:
+        Read-only float64 (T, O, AN, S)
+    """
+    b0, b1, b2, a1, a2 = coefficients
+    a = np.array([[-a1, 1.0], [-a2, 0.0]])
+    b = np.array([b1 - a1 * b0, b2 - a2 * b0])
+
+    powers = np.empty((frames + 1, 2, 2))       # A^0 .. A^frames
+    powers[0] = np.eye(2)
+    for n in range(frames):
+        powers[n + 1] = a @ powers[n]
+    observe = powers[:frames, 0, :]             # c @ A^n = first row of A^n
+    h = np.concatenate([[b0], observe[:frames - 1] @ b])
+    index = np.arange(frames)[:, None] - np.arange(frames)[None, :]
+    toeplitz = np.where(index >= 0, h[np.clip(index, 0, None)], 0.0)
+    state = (powers[frames - 1::-1] @ b).T      # Columns A^(N-1-k) b
+    matrices = (toeplitz, np.ascontiguousarray(observe), powers[frames], np.ascontiguousarray(state))
+    for m in matrices:
+        m.flags.writeable = False
+    return matrices
+
+
+class Biquad:
+    """Second-order filter processed as a block state-space system."""
+
+    def __init__(self, kind='lowpass', cutoff=1000.0, q=0.7071, sample_rate=SAMPLE_RATE):
+        """
+        Args:
+            kind: 'lowpass' or 'highpass'
+            cutoff: Cutoff frequency in Hz
+            q: Resonance (0.7071 = Butterworth)
+            sample_rate: Audio sample rate
+        """
+        self.coefficients = biquad_coefficients(kind, float(cutoff), float(q), sample_rate)
+        self.kind = kind
+        self.tail = 0.0
+        self.reset()
+
+    def reset(self):
+        """Clear the filter state."""
+        self._state = None
+
+    def process(self, block):
+        """Filter a block in place."""
+        x = _frames(block)
+        if self._state is None or self._state.shape[1] != x.shape[1]:
+            self._state = np.zeros((2, x.shape[1]))
+        with profiler.stage(f"fx.{self.kind}", len(x)):
+            for i in range(0, len(x), BLOCK):
+                chunk = x[i:i + BLOCK]
+                toeplitz, observe, power, state = block_matrices(self.coefficients, len(chunk))
+                y = toeplitz @ chunk + observe @ self._state
+                self._state = power @ self._state + state @ chunk
+                chunk[:] = y
+        return block
+
+
+class LowPass(Biquad):
+    """Low-pass biquad."""
+
+    def __init__(self, cutoff=5000.0, q=0.7071, sample_rate=SAMPLE_RATE):
+        super().__init__('lowpass', cutoff, q, sample_rate)
+
+
+class HighPass(Biquad):
+    """High-pass biquad."""
+
+    def __init__(self, cutoff=80.0, q=0.7071, sample_rate=SAMPLE_RATE):
+        super().__init__('highpass', cutoff, q, sample_rate)
+
+
+# ====================================================
+# Effects Chain
+# ====================================================
+class EffectsChain:
+    """Effects applied in series."""
+
+    def __init__(self, effects=()):
+        self.effects = list(effects)
+
+    @classmethod
+    def coerce(cls, effects):
+        """Accept an EffectsChain, a single effect or a list of effects."""
+        if effects is None or isinstance(effects, cls):
+            return effects
+        if hasattr(effects, "process"):
+            return cls([effects])
+        return cls(effects)
+
+    def add(self, effect):
+        """Append an effect (chainable)."""
+        self.effects.append(effect)
+        return self
+
+    @property
+    def tail(self):
+        """Seconds the chain keeps sounding after the input stops."""
+        return sum(getattr(fx, "tail", 0.0) for fx in self.effects)
+
+    def reset(self):
+        for fx in self.effects:
+            fx.reset()
+
+    def process(self, block):
+        """Run a block through every effect, in place."""
+        for fx in self.effects:
+            fx.process(block)
+        return block
+
+    def stream(self, wave, block=BLOCK, sample_rate=SAMPLE_RATE):
+        """
+        Process a wave block by block, followed by the effects' tail.
+
+        Yields:
+            Processed blocks (reused buffers, valid until the next one)
+        """
+        self.reset()
+        total = len(wave) + int(self.tail * sample_rate)
+        buf = np.zeros((block,) + wave.shape[1:], dtype=DTYPE)
+        for pos in range(0, total, block):
+            n = min(block, total - pos)
+            part = buf[:n]
+            part.fill(0)
+            src = wave[pos:pos + n]
+            part[:len(src)] = src
+            yield self.process(part)
+
+    def apply(self, wave, block=BLOCK, sample_rate=SAMPLE_RATE):
+        """
+        Process a whole wave block by block (see stream()).
+
+        Returns:
+            New float32 array including the tail
+        """
+        total = len(wave) + int(self.tail * sample_rate)
+        out = np.empty((total,) + wave.shape[1:], dtype=DTYPE)
+        pos = 0
+        for part in self.stream(wave, block, sample_rate):
+            out[pos:pos + len(part)] = part
+            pos += len(part)
+        return out
+
+
+# ====================================================
+# Main
+# ====================================================
+def bench(sample_rate=SAMPLE_RATE):
+    """Per-block cost of the reverb for growing impulse responses."""
+    budget = BLOCK / sample_rate
+    block = np.zeros((BLOCK, 2), dtype=DTYPE)
+    effects = [("delay", Delay()), ("lowpass", LowPass()), ("highpass", HighPass())]
+    effects += [(f"reverb {s}s", ConvolutionReverb(room_ir(s), 0.3)) for s in (0.5, 1, 2, 4, 8)]
+    for name, fx in effects:
+        fx.process(block)
+        times = []
+        for _ in range(200):
+            block[:] = np.random.default_rng(len(times)).standard_normal(block.shape)
+            start = time.perf_counter()
+            fx.process(block)
+            times.append(time.perf_counter() - start)
+        mean = np.mean(times)
+        print(f"{name:<12} {mean * 1000:7.3f}ms/block ({mean / budget:5.1%} of real time)")
+
+
+def main():
+    args = sys.argv[1:]
+    if "--bench" in args:
+        bench()
+        return
+
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    ir = load_ir(args[args.index("--ir") + 1]) if "--ir" in args else room_ir(2.5)
+    chain = EffectsChain([HighPass(80), Delay(0.375, 0.3, 0.15),
+                          ConvolutionReverb(ir, mix=0.25)])
+    song = wave_sound.Song(tempo=120)\
+        .add_melody(['E5', 'D5', 'C5', 'D5', 'E5', 'E5', 'E5', 'rest'] * 2,
+                    [0.75, 0.25, 0.5, 0.5, 0.5, 0.5, 1, 0.5] * 2)\
+        .add_chords(['C', 'Am', 'F', 'G7'], [2] * 4)
+    if "--save" in args:
+        song.save(args[args.index("--save") + 1], effects=chain)
+    else:
+        song.play(effects=chain)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,286 @@
+"""
+Envelope Engine
+---------------
+ADSR envelopes applied in place, block by block.
+
+Segment curves (attack, decay, release) are computed once per
+(parameters, sample rate) and cached as read-only arrays. A Voice keeps
+the stage and position of one sounding note, so a note of any length is
+processed in fixed-size blocks without building a full-length envelope:
+
+    env = Envelope(attack=0.01, decay=0.1, sustain=0.7, release=0.2)
+    voice = env.voice()
+    for block in blocks:
+        voice.process(block)        # block *= envelope, in place
+    voice.note_off()
+
+Curves are 'linear' or 'exp' (exponential approach, as in analog synths).
+"""
+
+import functools
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# ====================================================
+# Global Constants
+# ====================================================
+SAMPLE_RATE = 44100
+EXP_SHAPE = 5.0         # Steepness of exponential segments
+
+ATTACK, DECAY, SUSTAIN, RELEASE, DONE = range(5)
+
+
+# ====================================================
+# Segment Curves
+# ====================================================
+@functools.lru_cache(maxsize=256)
+def fade_curve(samples, rising=True, curve='linear', dtype='float64'):
+    """
+    Unit fade from 0 to 1 (rising) or 1 to 0 (falling).
+
+    The linear curves equal np.linspace(0, 1, samples) and
+    np.linspace(1, 0, samples), the ramps apply_envelope used to build.
+
+    Returns:
+        Read-only array of the given dtype
+    """
+    if curve == 'exp':
+        x = np.linspace(0, 1, samples)
+        fade = (1 - np.exp(-EXP_SHAPE * x)) / (1 - np.exp(-EXP_SHAPE))
+        if not rising:
+            fade = 1 - fade
+    else:
+        fade = np.linspace(0, 1, samples) if rising else np.linspace(1, 0, samples)
+    fade = fade.astype(dtype, copy=False)
+    fade.flags.writeable = False
+    return fade
+
+
+@functools.lru_cache(maxsize=256)
+def segment_curves(attack, decay, sustain, release, curve, sample_rate):
+    """
+    Attack, decay and release curves for one set of parameters.
+
+    Returns:
+        Tuple of read-only arrays (attack 0->1, decay 1->sustain,
+        release 1->0; release is scaled by the level at note-off)
+    """
+    a = int(attack * sample_rate)
+    d = int(decay * sample_rate)
+    r = int(release * sample_rate)
+    decay_curve = sustain + (1 - sustain) * fade_curve(d, False, curve)
+    decay_curve.flags.writeable = False
+    return fade_curve(a, True, curve), decay_curve, fade_curve(r, False, curve)
+
+
+def fade_in_out(wave, attack=0.003, release=0.003, sample_rate=SAMPLE_RATE):
+    """
+    Linear fade in and out, in place.
+
+    Args:
+        wave: Waveform array (modified), mono or (frames, channels)
+        attack: Fade-in time in seconds
+        release: Fade-out time in seconds
+        sample_rate: Audio sample rate
+
+    Returns:
+        The same array
+    """
+    shape = (-1,) + (1,) * (wave.ndim - 1)
+    attack_samples = min(int(attack * sample_rate), len(wave))
+    if attack_samples > 0:
+        wave[:attack_samples] *= fade_curve(attack_samples, dtype=wave.dtype.name).reshape(shape)
+    release_samples = min(int(release * sample_rate), len(wave))
+    if release_samples > 0:
+        wave[-release_samples:] *= fade_curve(release_samples, False,
+                                              dtype=wave.dtype.name).reshape(shape)
+    return wave
+
+
+# ====================================================
+# Envelope
+# ====================================================
+class Envelope:
+    """ADSR envelope parameters."""
+
+    def __init__(self, attack=0.005, decay=0.0, sustain=1.0, release=0.005,
+                 curve='linear'):
+        """
+        Initialize envelope.
+
+        Args:
+            attack: Attack time in seconds
+            decay: Decay time in seconds
+            sustain: Sustain level (0.0-1.0)
+            release: Release time in seconds
+            curve: 'linear' or 'exp'
+        """
+        self.attack = attack
+        self.decay = decay
+        self.sustain = sustain
+        self.release = release
+        self.curve = curve
+
+    @classmethod
+    def coerce(cls, envelope):
+        """Accept an Envelope or an (attack, decay, sustain, release) tuple."""
+        if envelope is None or isinstance(envelope, cls):
+            return envelope
+        return cls(*envelope)
+
+    def curves(self, sample_rate=SAMPLE_RATE):
+        """Cached segment curves (see segment_curves)."""
+        return segment_curves(self.attack, self.decay, self.sustain,
+                              self.release, self.curve, sample_rate)
+
+    def voice(self, sample_rate=SAMPLE_RATE):
+        """Envelope state for one new note."""
+        return Voice(self, sample_rate)
+
+    def note_off(self, length, sample_rate=SAMPLE_RATE):
+        """
+        Note-off position and release curve of a note of a given length.
+
+        The release ends with the note. A note shorter than attack +
+        release keeps its attack (or the first half of the note, if even
+        the attack does not fit) and gets a release shortened to the rest,
+        so it still sounds and still fades out to zero.
+
+        Returns:
+            Tuple of (note-off position in samples, release curve)
+        """
+        attack, _, release = self.curves(sample_rate)
+        off = max(length - len(release), min(len(attack), length // 2))
+        if length - off != len(release):
+            release = fade_curve(length - off, False, self.curve)
+        return off, release
+
+    def apply(self, wave, sample_rate=SAMPLE_RATE):
+        """
+        Apply the envelope to a complete note in place.
+
+        The release starts so that it ends with the note (see note_off).
+
+        Returns:
+            The same array
+        """
+        return self.apply_window(wave, 0, len(wave), sample_rate)
+
+    def apply_window(self, block, pos, length, sample_rate=SAMPLE_RATE):
+        """
+        Apply the envelope of a note to one window of it, in place.
+
+        Gives the same result as apply() on the whole note restricted to
+        samples pos .. pos + len(block), without any per-note state, so a
+        note can be rendered block by block in any order.
+
+        Args:
+            block: Samples pos .. pos + len(block) of the note (modified)
+            pos: Position of the block in the note
+            length: Note length in samples (the release ends with the note)
+
+        Returns:
+            The same array
+        """
+        attack, decay, _ = self.curves(sample_rate)
+        a, d = len(attack), len(decay)
+        off, release = self.note_off(length, sample_rate)
+        segments = (
+            (0, min(a, off), attack),
+            (a, min(a + d, off), decay),
+            (a + d, off, None),                         # Sustain
+            (off, length, release),
+        )
+        end = pos + len(block)
+        for first, last, curve in segments:
+            lo, hi = max(first, pos), min(last, end)
+            if lo >= hi:
+                continue
+            if curve is None:
+                block[lo - pos:hi - pos] *= self.sustain
+            elif curve is release:
+                block[lo - pos:hi - pos] *= curve[lo - first:hi - first]
+                block[lo - pos:hi - pos] *= self._level_at(off, attack, decay)
+            else:
+                block[lo - pos:hi - pos] *= curve[lo - first:hi - first]
+        return block
+
+    def _level_at(self, pos, attack, decay):
+        """Envelope level after pos samples of a held note (the note-off level)."""
+        a, d = len(attack), len(decay)
+        if pos == 0:
+            return 0.0
+        if pos <= a:
+            return attack[pos - 1]
+        if pos <= a + d:
+            return decay[pos - a - 1]
+        return self.sustain
+
+
+class Voice:
+    """Envelope position of one sounding note."""
+
+    def __init__(self, envelope, sample_rate=SAMPLE_RATE):
+        self.envelope = envelope
+        self.attack, self.decay, self.release = envelope.curves(sample_rate)
+        self.stage = ATTACK
+        self.pos = 0
+        self.level = 0.0
+        self.release_level = 0.0
+
+    @property
+    def active(self):
+        """False once the release has finished."""
+        return self.stage != DONE
+
+    def note_off(self):
+        """Start the release from the current level."""
+        if self.stage != DONE:
+            self.release_level = self.level
+            self.stage = RELEASE
+            self.pos = 0
+
+    def process(self, block):
+        """
+        Multiply a block by the envelope in place and advance.
+
+        Returns:
+            The same block
+        """
+        i, n = 0, len(block)
+        while i < n:
+            if self.stage == ATTACK:
+                i = self._segment(block, i, self.attack, DECAY)
+            elif self.stage == DECAY:
+                i = self._segment(block, i, self.decay, SUSTAIN)
+            elif self.stage == SUSTAIN:
+                self.level = self.envelope.sustain
+                block[i:] *= self.level
+                i = n
+            elif self.stage == RELEASE:
+                start = i
+                i = self._segment(block, i, self.release, DONE)
+                block[start:i] *= self.release_level
+                if self.stage == DONE:
+                    self.level = 0.0
+                else:
+                    self.level = self.release_level * self.release[self.pos - 1]
+            else:
+                block[i:] = 0
+                i = n
+        return block
+
+    def _segment(self, block, i, curve, next_stage):
+        count = min(len(block) - i, len(curve) - self.pos)
+        if count > 0:
+            block[i:i + count] *= curve[self.pos:self.pos + count]
+            self.pos += count
+            self.level = curve[self.pos - 1]
+        if self.pos >= len(curve):
+            if not len(curve) and next_stage == DECAY:
+                self.level = 1.0
+            self.stage = next_stage
+            self.pos = 0
+        return i + count
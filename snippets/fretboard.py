@@ -0,0 +1,446 @@
+"""
+Fretboard Quiz Engine
+---------------------
+Python counterpart of fretboard_quiz.sh.
+
+Every (string, fret) position of a tuning is computed once into lookup
+tables, so answers are checked with a single index, and questions are
+picked by a spaced-repetition scheduler: positions the player misses come
+back sooner, positions answered correctly are pushed further out. The
+scheduler keeps its positions in heaps, so choosing the next question is
+O(log n).
+
+String numbering follows the shell quiz: string 1 is the highest string.
+Answers are saved with quiz_store.py unless --no-save is given.
+
+Usage:
+    python fretboard.py [tuning] [--questions N] [--frets N] [--no-save]
+    python fretboard.py guitar
+    python fretboard.py "D2 A2 D3 G3 B3 E4"
+"""
+
+import heapq
+import random
+import sys
+import time
+
+# ====================================================
+# Global Constants
+# ====================================================
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+# Flat spellings accepted as answers
+FLAT_TO_SHARP = {
+    'Cb': 'B', 'Db': 'C#', 'Eb': 'D#', 'Fb': 'E', 'Gb': 'F#',
+    'Ab': 'G#', 'Bb': 'A#', 'E#': 'F', 'B#': 'C',
+}
+NOTE_ALIASES = {'C#': 'Db', 'D#': 'Eb', 'F#': 'Gb', 'G#': 'Ab', 'A#': 'Bb'}
+
+# Open strings from lowest to highest
+TUNINGS = {
+    'bass': ['E1', 'A1', 'D2', 'G2'],
+    'bass5': ['B0', 'E1', 'A1', 'D2', 'G2'],
+    'guitar': ['E2', 'A2', 'D3', 'G3', 'B3', 'E4'],
+    'drop-d': ['D2', 'A2', 'D3', 'G3', 'B3', 'E4'],
+    'dadgad': ['D2', 'A2', 'D3', 'G3', 'A3', 'D4'],
+    'open-g': ['D2', 'G2', 'D3', 'G3', 'B3', 'D4'],
+    'ukulele': ['G4', 'C4', 'E4', 'A4'],  # Re-entrant high G
+}
+
+MAX_FRETS = 20
+LEVELS = [5, 12]        # Fret ranges unlocked before the full neck
+UNLOCK_WINDOW = 10      # Answers considered when unlocking the next level
+UNLOCK_ACCURACY = 0.8
+MISS_INTERVAL = 1       # Questions until a missed position comes back
+MISS_WEIGHT = 2         # Questions a fully-missed position may jump ahead
+
+# Terminal colors
+RED = '\033[0;31m'
+GREEN = '\033[0;32m'
+NC = '\033[0m'
+
+
+# ====================================================
+# Note Helpers
+# ====================================================
+def normalize_note_name(name):
+    """Capitalize and convert flats to sharps ('bb' -> 'A#')."""
+    name = name.strip()
+    if not name:
+        return name
+    name = name[0].upper() + name[1:]
+    return FLAT_TO_SHARP.get(name, name)
+
+
+def note_to_midi(note, default_octave=None):
+    """
+    Convert note name to MIDI number.
+
+    Args:
+        note: Note name with octave (e.g., 'E2', 'F#3', 'Bb1')
+        default_octave: Octave used when the name has none
+
+    Returns:
+        MIDI note number (C4 = 60)
+    """
+    if len(note) > 1 and note[1] in '#b':
+        name, octave = note[:2], note[2:]
+    else:
+        name, octave = note[:1], note[1:]
+    if not octave:
+        if default_octave is None:
+            raise ValueError(f"Missing octave: {note}")
+        octave = default_octave
+    return NOTE_NAMES.index(normalize_note_name(name)) + (int(octave) + 1) * 12
+
+
+def parse_tuning(spec):
+    """
+    Parse a tuning name or note list.
+
+    Notes without an octave are placed ascending from octave 2, so
+    'DADGAD' style lists like 'D A D G A D' work as expected.
+
+    Args:
+        spec: Tuning name from TUNINGS, or notes low to high separated by
+              spaces or commas (e.g., 'D2 A2 D3 G3 B3 E4')
+
+    Returns:
+        Tuple of (name, list of open-string MIDI numbers low to high)
+    """
+    if spec in TUNINGS:
+        return spec, [note_to_midi(n) for n in TUNINGS[spec]]
+
+    notes = spec.replace(',', ' ').split()
+    if not notes:
+        raise ValueError(f"Unknown tuning: {spec!r}")
+
+    midi = []
+    for note in notes:
+        if note[-1].isdigit():
+            midi.append(note_to_midi(note))
+        else:
+            value = note_to_midi(note, default_octave=2)
+            # Keep strings ascending when octaves are omitted
+            while midi and value <= midi[-1]:
+                value += 12
+            midi.append(value)
+    return " ".join(notes), midi
+
+
+# ====================================================
+# Fretboard Index
+# ====================================================
+class Fretboard:
+    """Precomputed note/MIDI lookup for every position of a tuning."""
+
+    def __init__(self, tuning='bass', frets=MAX_FRETS):
+        """
+        Initialize fretboard.
+
+        Args:
+            tuning: Tuning name or note list (see parse_tuning)
+            frets: Number of frets
+        """
+        self.name, self.open_midi = parse_tuning(tuning)
+        self.frets = frets
+        self.strings = len(self.open_midi)
+
+        # midi[s][f] / notes[s][f]; index 0 is string 1 (highest)
+        self.midi = [
+            [open_midi + f for f in range(frets + 1)]
+            for open_midi in reversed(self.open_midi)
+        ]
+        self.notes = [[NOTE_NAMES[m % 12] for m in row] for row in self.midi]
+
+        # Pitch class -> all positions, for reverse lookups
+        self.positions = {pc: [] for pc in range(12)}
+        for s, row in enumerate(self.midi, start=1):
+            for f, m in enumerate(row):
+                self.positions[m % 12].append((s, f))
+
+    def note(self, string, fret):
+        """Note name at a position (string 1 = highest)."""
+        return self.notes[string - 1][fret]
+
+    def midi_at(self, string, fret):
+        """MIDI number at a position (string 1 = highest)."""
+        return self.midi[string - 1][fret]
+
+    def open_note(self, string):
+        """Open-string note name."""
+        return self.notes[string - 1][0]
+
+    def same_notes(self, note, max_fret=12):
+        """All positions of a note name within max_fret."""
+        pc = NOTE_NAMES.index(normalize_note_name(note))
+        return [(s, f) for s, f in self.positions[pc] if f <= max_fret]
+
+    def check_answer(self, answer, string, fret):
+        """True if answer names the note at the position."""
+        return normalize_note_name(answer) == self.note(string, fret)
+
+
+# ====================================================
+# Spaced-Repetition Scheduler
+# ====================================================
+class QuizScheduler:
+    """
+    Picks the next position to ask.
+
+    Each position has an interval counted in questions asked so far; a
+    correct answer doubles it (at least 2). Positions sit in a heap keyed
+    by due time minus a bonus for their miss rate, so often-missed
+    positions are asked early while positions that have waited long
+    enough still get their turn. A miss also puts the position in a retry
+    heap that is served before the main one, so it returns after one
+    other question even when many positions are overdue. Updates push new
+    heap entries and stale ones are skipped.
+    """
+
+    def __init__(self, fretboard, strings=None, seed=None):
+        """
+        Initialize scheduler.
+
+        Args:
+            fretboard: Fretboard instance
+            strings: Strings to practice (default: all)
+            seed: Random seed for tie-breaking
+        """
+        self.fretboard = fretboard
+        self.strings = strings or list(range(1, fretboard.strings + 1))
+        self.random = random.Random(seed)
+        self.levels = [f for f in LEVELS if f < fretboard.frets] + [fretboard.frets]
+        self.level = 0
+        self.clock = 0
+        self.heap = []      # (priority, tiebreak, version, pos)
+        self.retry = []     # (due, tiebreak, version, pos) of missed positions
+        self.items = {}     # (string, fret) -> [interval, attempts, misses, version]
+        self.history = {}   # (string, fret) -> (attempts, correct) from past sessions
+        self.recent = []
+        self.last = None
+        self._unlock(0, self.levels[0])
+
+    def _unlock(self, low, high):
+        new = [(s, f) for s in self.strings for f in range(low, high + 1)
+               if (s, f) not in self.items]
+        self.random.shuffle(new)
+        # Introduce new positions one per question so reviews of missed
+        # positions are interleaved instead of waiting behind all of them
+        for i, pos in enumerate(new):
+            attempts, correct = self.history.get(pos, (0, 0))
+            self.items[pos] = [1, attempts, attempts - correct, 0]
+            self._push(pos, self.clock + i)
+
+    def _push(self, pos, due):
+        _, attempts, misses, version = self.items[pos]
+        miss_rate = (misses + 1) / (attempts + 2)
+        priority = due - MISS_WEIGHT * miss_rate
+        heapq.heappush(self.heap, (priority, self.random.random(), version, pos))
+
+    def seed_stats(self, stats):
+        """
+        Pre-weight positions from past results.
+
+        Args:
+            stats: Dict of (string, fret) -> (attempts, correct)
+        """
+        self.history.update(stats)
+        for pos, (attempts, correct) in stats.items():
+            if pos in self.items:
+                item = self.items[pos]
+                item[1], item[2] = attempts, attempts - correct
+                item[3] += 1
+                self._push(pos, self.clock)
+
+    def next(self):
+        """
+        Return the next (string, fret) to ask; answer it with record().
+
+        The position stays in the heap until record() reschedules it, so
+        calling next() again without an answer loses nothing.
+        """
+        retry = self._front(self.retry)
+        if retry and retry[0] <= self.clock:
+            entry = retry
+        else:
+            entry = self._front(self.heap) or retry
+        pos = entry[3] if entry else self.last      # Only the last position is left
+        self.last = pos
+        return pos
+
+    def _front(self, heap):
+        """First current entry of a heap other than the last position asked."""
+        skipped = entry = None
+        while heap:
+            pos = heap[0][3]
+            if heap[0][2] != self.items[pos][3]:
+                heapq.heappop(heap)     # Stale entry
+            elif pos == self.last and skipped is None:
+                # Avoid asking the same position twice in a row
+                skipped = heapq.heappop(heap)
+            else:
+                entry = heap[0]
+                break
+        if skipped:
+            heapq.heappush(heap, skipped)
+        return entry
+
+    def record(self, pos, correct):
+        """
+        Record an answer and reschedule the position.
+
+        Args:
+            pos: (string, fret) that was asked
+            correct: Whether the answer was correct
+        """
+        self.clock += 1
+        item = self.items[pos]
+        item[1] += 1
+        item[3] += 1
+        if correct:
+            item[0] = max(2, item[0] * 2)
+        else:
+            item[0] = MISS_INTERVAL
+            item[2] += 1
+            heapq.heappush(self.retry, (self.clock + item[0], self.random.random(), item[3], pos))
+        self._push(pos, self.clock + item[0])
+
+        # Unlock more frets once the current range is under control
+        self.recent = (self.recent + [correct])[-UNLOCK_WINDOW:]
+        if (len(self.recent) == UNLOCK_WINDOW
+                and sum(self.recent) / UNLOCK_WINDOW >= UNLOCK_ACCURACY
+                and self.level < len(self.levels) - 1):
+            self.level += 1
+            self.recent = []
+            self._unlock(self.levels[self.level - 1] + 1, self.levels[self.level])
+
+    @property
+    def max_fret(self):
+        """Highest fret currently in rotation."""
+        return self.levels[self.level]
+
+
+# ====================================================
+# Interactive Quiz
+# ====================================================
+def run_quiz(fretboard, num_questions=10, scheduler=None, on_answer=None):
+    """
+    Run the interactive quiz.
+
+    Args:
+        fretboard: Fretboard instance
+        num_questions: Number of questions
+        scheduler: QuizScheduler (default: new one over all strings)
+        on_answer: Optional callback(string, fret, note, correct, response_ms)
+
+    Returns:
+        Tuple of (score, total)
+    """
+    scheduler = scheduler or QuizScheduler(fretboard)
+    score, total = 0, 0
+
+    print("========================================")
+    print(f"NOTE QUIZ ({fretboard.name})")
+    print("========================================")
+    print("Answer the note for given string and fret")
+    print("Commands: 'q'=quit, 'h'=hint, 's'=show score")
+    print("========================================")
+
+    for i in range(1, num_questions + 1):
+        string, fret = scheduler.next()
+        correct_note = fretboard.note(string, fret)
+        print(f"\nQUESTION {i}/{num_questions} (frets 0-{scheduler.max_fret})")
+        print(f"String: {string}, Fret: {fret}")
+
+        start = time.monotonic()
+        while True:
+            answer = input("Note?: ").strip()
+            if answer in ('q', 'quit', 'exit'):
+                show_score(score, total)
+                return score, total
+            if answer in ('h', 'hint'):
+                print(f"Hint: String {string} open note is '{fretboard.open_note(string)}'")
+                continue
+            if answer in ('s', 'score'):
+                show_score(score, total)
+                continue
+            if not answer:
+                print("Please enter a note name.")
+                continue
+            break
+
+        response_ms = (time.monotonic() - start) * 1000
+        correct = fretboard.check_answer(answer, string, fret)
+        if correct:
+            print(f"{GREEN}CORRECT!{NC}")
+            score += 1
+        else:
+            alias = NOTE_ALIASES.get(correct_note)
+            shown = f"{correct_note}/{alias}" if alias else correct_note
+            print(f"{RED}WRONG.{NC} Correct answer: '{shown}'")
+        total += 1
+
+        scheduler.record((string, fret), correct)
+        if on_answer:
+            on_answer(string, fret, correct_note, correct, response_ms)
+
+    show_score(score, total)
+    return score, total
+
+
+def show_score(score, total):
+    """Print score and accuracy."""
+    print("========================================")
+    print(f"SCORE: {score}/{total}")
+    if total > 0:
+        print(f"ACCURACY: {score * 100 / total:.1f}%")
+    print("========================================")
+
+
+def main():
+    args = sys.argv[1:]
+    num_questions = 10
+    frets = MAX_FRETS
+    if "--questions" in args:
+        i = args.index("--questions")
+        num_questions = int(args[i + 1])
+        del args[i:i + 2]
+    if "--frets" in args:
+        i = args.index("--frets")
+        frets = int(args[i + 1])
+        del args[i:i + 2]
+    save = "--no-save" not in args
+    args = [arg for arg in args if arg != "--no-save"]
+
+    tuning = " ".join(args) or 'bass'
+    try:
+        fretboard = Fretboard(tuning, frets)
+    except ValueError as e:
+        print(f"Error: {e}")
+        print(f"Tunings: {', '.join(TUNINGS)}")
+        exit(1)
+
+    scheduler = QuizScheduler(fretboard)
+    store = None
+    on_answer = None
+    if save:
+        # Past results decide which positions come first
+        from quiz_store import QuizStore
+        store = QuizStore()
+        scheduler.seed_stats(store.heatmap(fretboard.name))
+
+        def on_answer(string, fret, note, correct, response_ms):
+            store.record(fretboard.name, string, fret, note, correct, response_ms)
+
+    try:
+        run_quiz(fretboard, num_questions, scheduler, on_answer)
+    except (EOFError, KeyboardInterrupt):
+        print()
+    finally:
+        if store:
+            store.close()
+
+
+if __name__ == "__main__":
+    main()
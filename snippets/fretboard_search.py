@@ -0,0 +1,260 @@
+"""
+Fretboard Search
+----------------
+Reverse lookup on a Fretboard: every position of a note, and playable
+voicings of an interval set or chord symbol.
+
+For each string and fret window a pitch-class bitmask is precomputed, so a
+window can be rejected with a few integer ORs before any voicing is
+enumerated. Note positions come from the Fretboard's own pitch-class table
+and voicing results are cached per tuning.
+
+Chord symbols use the same vocabulary as NoteUtils.parse_chord_symbol in
+multi-track_wave_sound.py.
+
+Usage:
+    python fretboard_search.py guitar --chord Am7
+    python fretboard_search.py ukulele --chord C
+    python fretboard_search.py bass --note E
+    python fretboard_search.py guitar --intervals A 0 3 7
+"""
+
+import functools
+import importlib
+import sys
+
+from fretboard import NOTE_NAMES, TUNINGS, Fretboard, normalize_note_name
+
+# ====================================================
+# Global Constants
+# ====================================================
+SPAN = 4            # Frets covered by one hand position
+MAX_FINGERS = 4
+MIN_STRINGS = 3     # Fewest sounding strings in a voicing
+
+
+def pitch_class_mask(pcs):
+    """Bitmask with bit pc set for each pitch class."""
+    mask = 0
+    for pc in pcs:
+        mask |= 1 << (pc % 12)
+    return mask
+
+
+def parse_chord(chord_symbol):
+    """
+    Parse a chord symbol with NoteUtils.parse_chord_symbol.
+
+    Returns:
+        Tuple of (root pitch class, list of intervals)
+    """
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    root, intervals = wave_sound.NoteUtils.parse_chord_symbol(chord_symbol)
+    return NOTE_NAMES.index(normalize_note_name(root)), intervals
+
+
+# ====================================================
+# Per-Tuning Tables
+# ====================================================
+@functools.lru_cache(maxsize=None)
+def window_masks(open_midi, frets, span=SPAN):
+    """
+    Pitch classes reachable on each string in each fret window.
+
+    Args:
+        open_midi: Tuple of open-string MIDI numbers (low to high)
+        frets: Number of frets
+        span: Window width in frets
+
+    Returns:
+        List indexed [string][window start] of bitmasks; the open string is
+        included in every window
+    """
+    span = min(span, frets)     # Short necks are one window
+    masks = []
+    for open_note in open_midi:
+        row = []
+        for start in range(1, frets - span + 2):
+            pcs = [open_note] + [open_note + f for f in range(start, start + span)]
+            row.append(pitch_class_mask(pcs))
+        masks.append(row)
+    return masks
+
+
+# ====================================================
+# Voicing Search
+# ====================================================
+@functools.lru_cache(maxsize=4096)
+def find_voicings(open_midi, frets, root_pc, intervals, root_bass=True,
+                  omit_fifth=True, span=SPAN):
+    """
+    Find playable voicings of an interval set.
+
+    Args:
+        open_midi: Tuple of open-string MIDI numbers (low to high)
+        frets: Number of frets
+        root_pc: Root pitch class (0 = C)
+        intervals: Tuple of intervals in semitones from the root
+        root_bass: Require the root as the lowest sounding note
+        omit_fifth: Allow leaving out the fifth when the chord has more
+                    tones than can be covered
+        span: Maximum fretted stretch
+
+    Returns:
+        Tuple of voicings, each a tuple of frets low string to high string
+        (None = muted), sorted by position on the neck
+    """
+    chord_pcs = sorted({(root_pc + i) % 12 for i in intervals})
+    chord_mask = pitch_class_mask(chord_pcs)
+    required = chord_mask
+    fifth_mask = pitch_class_mask([root_pc + 7])
+    if omit_fifth and chord_mask & fifth_mask and len(chord_pcs) >= 4:
+        required &= ~fifth_mask
+    strings = len(open_midi)
+    min_strings = min(MIN_STRINGS, strings, len(chord_pcs))
+
+    masks = window_masks(open_midi, frets, span)
+    found = set()
+    for start in range(len(masks[0])):
+        # Cheap rejection: the window must reach every required pitch class
+        union = 0
+        for s in range(strings):
+            union |= masks[s][start]
+        if union & required != required:
+            continue
+
+        # Fret options per string inside this window
+        options = []
+        for open_note in open_midi:
+            opts = [None]
+            for f in [0] + list(range(start + 1, min(start + span, frets) + 1)):
+                if chord_mask >> ((open_note + f) % 12) & 1:
+                    opts.append(f)
+            options.append(opts)
+
+        _search(open_midi, options, 0, [], required, root_pc, root_bass,
+                min_strings, found)
+
+    return tuple(sorted(found, key=_voicing_sort_key))
+
+
+def _search(open_midi, options, s, chosen, required, root_pc, root_bass,
+            min_strings, found):
+    if s == len(open_midi):
+        _accept(open_midi, tuple(chosen), required, root_pc if root_bass else None,
+                min_strings, found)
+        return
+
+    started = any(c is not None for c in chosen)
+    for f in options[s]:
+        if f is not None and started and chosen[-1] is None:
+            continue  # No muted strings between sounding ones
+        chosen.append(f)
+        _search(open_midi, options, s + 1, chosen, required, root_pc,
+                root_bass, min_strings, found)
+        chosen.pop()
+
+
+def _accept(open_midi, voicing, required, bass_pc, min_strings, found):
+    sounding = [i for i, f in enumerate(voicing) if f is not None]
+    if len(sounding) < min_strings:
+        return
+    # The lowest pitch, not the first string: re-entrant tunings and high
+    # frets on a lower string can put it anywhere
+    if bass_pc is not None and min(open_midi[i] + voicing[i] for i in sounding) % 12 != bass_pc:
+        return
+
+    mask = 0
+    for i in sounding:
+        mask |= 1 << ((open_midi[i] + voicing[i]) % 12)
+    if mask & required != required:
+        return
+
+    fretted = [voicing[i] for i in sounding if voicing[i] > 0]
+    if fretted:
+        # A barre at the lowest fret counts as one finger
+        lowest = min(fretted)
+        fingers = len(fretted) - max(0, fretted.count(lowest) - 1)
+        if fingers > MAX_FINGERS:
+            return
+    found.add(voicing)
+
+
+def _voicing_sort_key(voicing):
+    fretted = [f for f in voicing if f]
+    return (min(fretted) if fretted else 0,
+            max(fretted) - min(fretted) if fretted else 0,
+            voicing.count(None),
+            [-1 if f is None else f for f in voicing])
+
+
+# ====================================================
+# Search Front End
+# ====================================================
+class FretboardSearch:
+    """Reverse lookups for one tuning."""
+
+    def __init__(self, tuning='guitar', frets=12):
+        """
+        Initialize search.
+
+        Args:
+            tuning: Tuning name or note list (see fretboard.parse_tuning)
+            frets: Number of frets to search
+        """
+        self.fretboard = Fretboard(tuning, frets)
+        self.open_midi = tuple(self.fretboard.open_midi)
+        self.frets = frets
+
+    def note(self, note):
+        """All (string, fret) positions of a note (string 1 = highest)."""
+        return self.fretboard.same_notes(note, self.frets)
+
+    def intervals(self, root, intervals, **options):
+        """Voicings of an interval set over a root note name."""
+        root_pc = NOTE_NAMES.index(normalize_note_name(root))
+        return find_voicings(self.open_midi, self.frets, root_pc,
+                             tuple(intervals), **options)
+
+    def chord(self, chord_symbol, **options):
+        """Voicings of a chord symbol (e.g., 'Am7', 'F#m7b5')."""
+        root_pc, intervals = parse_chord(chord_symbol)
+        return find_voicings(self.open_midi, self.frets, root_pc,
+                             tuple(intervals), **options)
+
+
+def format_voicing(voicing):
+    """Chord-chart style string, low string first (e.g., 'x 0 2 2 1 0')."""
+    return " ".join("x" if f is None else str(f) for f in voicing)
+
+
+def main():
+    args = sys.argv[1:]
+    if len(args) < 3:
+        print("Usage: python fretboard_search.py TUNING (--chord SYMBOL | --note NOTE | "
+              "--intervals ROOT I...)")
+        print(f"Tunings: {', '.join(TUNINGS)}")
+        exit(1)
+
+    search = FretboardSearch(args[0])
+    mode, values = args[1], args[2:]
+    if mode == "--note":
+        for string, fret in search.note(values[0]):
+            print(f"  String {string}, Fret {fret}")
+        return
+
+    if mode == "--chord":
+        voicings = search.chord(values[0])
+    elif mode == "--intervals":
+        voicings = search.intervals(values[0], [int(i) for i in values[1:]])
+    else:
+        print(f"Unknown option: {mode}")
+        exit(1)
+
+    for voicing in voicings:
+        print(format_voicing(voicing))
+    print(f"{len(voicings)} voicings")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,3 @@
-import numpy as np
-from mido import MidiFile, MidiTrack, Message
 import json
 import random
 import play_wave_sound
@@ -97,6 +95,8 @@ BPM = 120
 BEAT_LENGTH = 60 / BPM
 
 def save_as_midi(progression, filename="progression.mid", beats_per_chord=4):
+    from mido import MidiFile, MidiTrack, Message
+
     mid = MidiFile()
     track = MidiTrack()
     mid.tracks.append(track)
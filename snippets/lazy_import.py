@@ -0,0 +1,49 @@
+"""
+Lazy Import
+-----------
+Deferred imports for heavy optional dependencies (numpy, pyaudio, mido).
+
+    np = lazy_import("numpy")
+
+returns a module object whose code runs on first attribute access, so
+importing a module that only needs numpy for audio rendering does not
+slow down commands that never render. A missing package raises
+ModuleNotFoundError at first use instead of at import time, so chord
+parsing and MIDI export keep working on machines without PyAudio.
+"""
+
+import importlib.util
+import sys
+
+
+class MissingModule:
+    """Placeholder for a package that is not installed."""
+
+    def __init__(self, name):
+        self.__name = name
+
+    def __getattr__(self, attr):
+        raise ModuleNotFoundError(f"No module named '{self.__name}'", name=self.__name)
+
+
+def lazy_import(name):
+    """
+    Import a module on first attribute access.
+
+    Args:
+        name: Module name
+
+    Returns:
+        The module (loaded lazily), or a MissingModule placeholder
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        return MissingModule(name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
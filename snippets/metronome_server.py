@@ -0,0 +1,360 @@
+"""
+Metronome Control Server
+------------------------
+Runs the metronome clock inside an asyncio loop and exposes it on a local
+Unix domain socket, so other programs (practice dashboard, recorders, the
+terminal view) can change tempo and follow the click.
+
+Protocol: one request per line, either plain text or JSON.
+
+    set-bpm 140              {"cmd": "set-bpm", "bpm": 140}
+    set-meter 3              {"cmd": "set-meter", "beats": 3}
+    start / stop / toggle    {"cmd": "start"}
+    status                   {"cmd": "status"}
+    subscribe / unsubscribe  {"cmd": "subscribe"}
+
+Every request is answered with one JSON line ({"ok": true, ...state} or
+{"ok": false, "error": ...}); a line over 64 KiB gets an error reply and
+the connection is closed. Subscribed clients additionally receive
+{"event": "beat", ...} lines; "time" is the scheduled wall-clock time of the
+beat, so clients can compensate for their own delivery latency.
+
+Usage:
+    python metronome_server.py [bpm] [beats] [--socket PATH] [--silent]
+    python metronome_server.py --send "set-bpm 140"
+"""
+
+import asyncio
+import errno
+import json
+import os
+import shutil
+import socket
+import stat
+import sys
+import time
+
+# ====================================================
+# Global Constants
+# ====================================================
+SOCKET_PATH = "/tmp/metronome.sock"
+FREQ = 880          # Click frequency (Hz), same as metronome.sh
+LEN = 60            # Click length (ms)
+MIN_BPM = 1
+MAX_BPM = 400
+QUEUE_SIZE = 64     # Pending beat events per subscriber before dropping
+
+
+# ====================================================
+# Metronome Clock
+# ====================================================
+class Metronome:
+    """Beat clock scheduled against the event loop's monotonic time."""
+
+    def __init__(self, bpm=120, beats=4, click=True):
+        """
+        Initialize metronome.
+
+        Args:
+            bpm: Beats per minute
+            beats: Beats per bar
+            click: Play a click with `beep` on every beat
+        """
+        self.bpm = bpm
+        self.beats = beats
+        self.bar = 1
+        self.beat = 1
+        self.running = False
+        self.listeners = []
+        self.beep = shutil.which("beep") if click else None
+        self._task = None
+
+    def state(self):
+        """Return current state as a dict."""
+        return {
+            "bpm": self.bpm,
+            "beats": self.beats,
+            "bar": self.bar,
+            "beat": self.beat,
+            "running": self.running,
+        }
+
+    def set_bpm(self, bpm):
+        """Change tempo; takes effect from the next beat."""
+        self.bpm = max(MIN_BPM, min(MAX_BPM, bpm))
+
+    def set_meter(self, beats):
+        """Change beats per bar; takes effect from the next bar."""
+        if beats < 1:
+            raise ValueError(f"invalid meter: {beats}")
+        self.beats = beats
+
+    def start(self):
+        """Start the clock from bar 1, beat 1."""
+        if not self.running:
+            self.running = True
+            self.bar, self.beat = 1, 1
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop the clock."""
+        self.running = False
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        # Offset to convert loop time to wall-clock time for clients
+        wall_offset = time.time() - loop.time()
+        next_beat_time = loop.time()
+
+        while self.running:
+            # Sleep until the beat is due (absolute deadline, no drift)
+            delay = next_beat_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self._click()
+            event = {
+                "event": "beat",
+                "bar": self.bar,
+                "beat": self.beat,
+                "beats": self.beats,
+                "bpm": self.bpm,
+                "time": next_beat_time + wall_offset,
+            }
+            for listener in self.listeners:
+                listener(event)
+
+            # Advance position
+            self.beat += 1
+            if self.beat > self.beats:
+                self.beat = 1
+                self.bar += 1
+
+            next_beat_time += 60.0 / self.bpm
+            # If we fell far behind (e.g. suspended), resync instead of bursting
+            if loop.time() - next_beat_time > 60.0 / self.bpm:
+                next_beat_time = loop.time()
+
+    def _click(self):
+        """Fire-and-forget click so the clock never waits on the sound."""
+        if self.beep:
+            asyncio.get_running_loop().create_task(self._beep())
+
+    async def _beep(self):
+        proc = await asyncio.create_subprocess_exec(
+            self.beep, "-f", str(FREQ), "-l", str(LEN),
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await proc.wait()
+
+
+# ====================================================
+# Control Server
+# ====================================================
+def parse_request(line):
+    """
+    Parse a request line (plain text or JSON).
+
+    Args:
+        line: Request line without trailing newline
+
+    Returns:
+        Tuple of (command, argument) where argument may be None
+    """
+    line = line.strip()
+    if line.startswith("{"):
+        request = json.loads(line)
+        cmd = request.get("cmd", "")
+        arg = request.get("bpm", request.get("beats"))
+        return cmd, arg
+
+    parts = line.split()
+    if not parts:
+        return "", None
+    cmd = parts[0].lower()
+    arg = parts[1] if len(parts) > 1 else None
+    return cmd, arg
+
+
+class MetronomeServer:
+    """Unix domain socket front end for a Metronome."""
+
+    def __init__(self, metronome, path=SOCKET_PATH):
+        """
+        Initialize server.
+
+        Args:
+            metronome: Metronome instance to control
+            path: Unix socket path
+        """
+        self.metronome = metronome
+        self.path = path
+        self.subscribers = set()
+        metronome.listeners.append(self._broadcast)
+
+    async def serve(self):
+        """
+        Serve until cancelled.
+
+        Raises:
+            OSError: Another server is listening on the path, or the path
+                     exists and is not a socket
+        """
+        if os.path.exists(self.path):
+            self._remove_stale()
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def _remove_stale(self):
+        """Remove a socket file left behind by a server that has exited."""
+        if not stat.S_ISSOCK(os.stat(self.path).st_mode):
+            raise FileExistsError(errno.EEXIST, "not a socket", self.path)
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            try:
+                sock.connect(self.path)
+            except ConnectionRefusedError:
+                os.unlink(self.path)    # Nobody listening: stale
+                return
+        raise OSError(errno.EADDRINUSE, "a metronome server is already running", self.path)
+
+    def _broadcast(self, event):
+        line = (json.dumps(event) + "\n").encode()
+        for queue in self.subscribers:
+            self._enqueue(queue, line)
+
+    @staticmethod
+    def _enqueue(queue, line):
+        # Slow clients lose their oldest lines instead of stalling the clock
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(line)
+
+    async def _handle(self, reader, writer):
+        queue = asyncio.Queue(QUEUE_SIZE)
+        sender = asyncio.get_running_loop().create_task(self._send(queue, writer))
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ValueError, asyncio.LimitOverrunError) as e:
+                    # Line over the stream limit: the rest cannot be framed reliably
+                    await self._reply(writer, {"ok": False, "error": f"bad request: {e}"})
+                    break
+                if not line:
+                    break
+                await self._reply(writer, self._dispatch(line.decode(errors="replace"), queue))
+        except ConnectionError:
+            pass
+        finally:
+            self.subscribers.discard(queue)
+            sender.cancel()
+            writer.close()
+
+    @staticmethod
+    async def _reply(writer, reply):
+        # Written directly rather than queued, so a reply is never dropped
+        # or held back behind beat events
+        writer.write((json.dumps(reply) + "\n").encode())
+        await writer.drain()
+
+    async def _send(self, queue, writer):
+        try:
+            while True:
+                writer.write(await queue.get())
+                await writer.drain()
+        except ConnectionError:
+            pass
+
+    def _dispatch(self, line, queue):
+        m = self.metronome
+        try:
+            cmd, arg = parse_request(line)
+            if cmd in ("set-bpm", "bpm"):
+                m.set_bpm(int(arg))
+            elif cmd in ("set-meter", "meter"):
+                m.set_meter(int(arg))
+            elif cmd == "start":
+                m.start()
+            elif cmd == "stop":
+                m.stop()
+            elif cmd == "toggle":
+                if m.running:
+                    m.stop()
+                else:
+                    m.start()
+            elif cmd == "subscribe":
+                self.subscribers.add(queue)
+            elif cmd == "unsubscribe":
+                self.subscribers.discard(queue)
+            elif cmd != "status":
+                return {"ok": False, "error": f"unknown command: {cmd}"}
+        except (TypeError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": True, **m.state()}
+
+
+# ====================================================
+# Client Helper
+# ====================================================
+def send(request, path=SOCKET_PATH):
+    """
+    Send one request to a running server and return its reply.
+
+    Args:
+        request: Request line (plain text or JSON)
+        path: Unix socket path
+
+    Returns:
+        Reply as a dict
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(request.encode() + b"\n")
+        return json.loads(sock.makefile().readline())
+
+
+def main():
+    args = sys.argv[1:]
+
+    path = SOCKET_PATH
+    if "--socket" in args:
+        i = args.index("--socket")
+        path = args[i + 1]
+        del args[i:i + 2]
+
+    if "--send" in args:
+        i = args.index("--send")
+        print(json.dumps(send(args[i + 1], path)))
+        return
+
+    click = "--silent" not in args
+    args = [arg for arg in args if arg != "--silent"]
+    bpm = int(args[0]) if len(args) > 0 else 120
+    beats = int(args[1]) if len(args) > 1 else 4
+
+    async def run():
+        metronome = Metronome(bpm, beats, click)
+        metronome.start()
+        await MetronomeServer(metronome, path).serve()
+
+    print(f"Listening on {path} (BPM: {bpm}, Beats: {beats})")
+    try:
+        asyncio.run(run())
+    except OSError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        print("\nStopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Metronome Terminal View
+-----------------------
+Draws the pendulum, bar/beat counters and BPM at a fixed frame rate.
+
+The view only reads the latest beat state, which the clock side publishes
+with a single tuple assignment, so drawing can never delay a click. Frames
+are diffed cell by cell against the previous one and only changed runs are
+written, in a single write per frame.
+
+Usage:
+    python metronome_server.py 120 4 &
+    python metronome_view.py [--fps 30] [--socket PATH]
+"""
+
+import json
+import math
+import socket
+import sys
+import threading
+import time
+
+from metronome_server import SOCKET_PATH
+
+# ====================================================
+# Global Constants
+# ====================================================
+FPS = 30
+BOX_WIDTH = 20      # Inner width of the pendulum box
+BALL = "●"
+
+
+# ====================================================
+# Beat State
+# ====================================================
+class BeatState:
+    """Latest beat shared between the clock and the view."""
+
+    def __init__(self, bpm=120, beats=4):
+        # (bar, beat, beats, bpm, beat_time); replaced atomically, never mutated
+        self.latest = (0, 0, beats, bpm, None)
+
+    def update(self, event):
+        """Record a beat event (usable as a Metronome listener)."""
+        self.latest = (event["bar"], event["beat"], event["beats"],
+                       event["bpm"], event["time"])
+
+    def follow(self, sock):
+        """Update from the beats of a subscribed metronome server socket."""
+        for line in sock.makefile():
+            message = json.loads(line)
+            if message.get("event") == "beat":
+                self.update(message)
+            elif "bpm" in message:
+                bar, beat, _, _, beat_time = self.latest
+                self.latest = (bar, beat, message["beats"], message["bpm"], beat_time)
+
+
+# ====================================================
+# Diff Renderer
+# ====================================================
+class TerminalRenderer:
+    """Keeps the last frame and writes only cells that changed."""
+
+    def __init__(self, out=sys.stdout):
+        self.out = out
+        self.previous = []
+        self.cells_written = 0
+
+    def render(self, lines):
+        """
+        Draw a frame.
+
+        Args:
+            lines: List of strings, one per screen row
+        """
+        chunks = []
+        for row, line in enumerate(lines):
+            old = self.previous[row] if row < len(self.previous) else ""
+            if line == old:
+                continue
+            # Pad the shorter line so stale cells get blanked
+            width = max(len(line), len(old))
+            line_p, old_p = line.ljust(width), old.ljust(width)
+
+            col = 0
+            while col < width:
+                if line_p[col] == old_p[col]:
+                    col += 1
+                    continue
+                start = col
+                while col < width and line_p[col] != old_p[col]:
+                    col += 1
+                chunks.append(f"\x1b[{row + 1};{start + 1}H{line_p[start:col]}")
+                self.cells_written += col - start
+
+        self.previous = list(lines)
+        if chunks:
+            self.out.write("".join(chunks))
+            self.out.flush()
+
+    def clear(self):
+        """Clear screen and forget the previous frame."""
+        self.out.write("\x1b[2J\x1b[?25l")
+        self.out.flush()
+        self.previous = []
+
+    def restore(self):
+        """Show cursor and move below the drawing."""
+        self.out.write(f"\x1b[{len(self.previous) + 1};1H\x1b[?25h\n")
+        self.out.flush()
+
+
+# ====================================================
+# Frame Composition
+# ====================================================
+def pendulum_position(state, now):
+    """
+    Ball position in 0.0 (left) .. 1.0 (right).
+
+    The ball reaches an edge on every click and swings across in one beat.
+    """
+    bar, beat, beats, bpm, beat_time = state
+    if beat_time is None:
+        return 0.5
+    interval = 60.0 / bpm
+    phase = min(max((now - beat_time) / interval, 0.0), 1.0)
+    x = (1 - math.cos(math.pi * phase)) / 2
+    # Alternate direction on every beat
+    count = (bar - 1) * beats + beat
+    return x if count % 2 else 1 - x
+
+
+def compose_frame(state, now):
+    """Build the screen rows for the current state."""
+    bar, beat, beats, bpm, _ = state
+    pos = round(pendulum_position(state, now) * (BOX_WIDTH - 1))
+    box = " " * pos + BALL + " " * (BOX_WIDTH - 1 - pos)
+    marks = " ".join("●" if i == beat else "○" for i in range(1, beats + 1))
+    return [
+        "        Metronome",
+        "",
+        f"                  BPM  {bpm:<3}",
+        "     ┌" + "─" * BOX_WIDTH + "┐",
+        "     │" + box + "│",
+        "     └" + "─" * BOX_WIDTH + "┘",
+        f"            Beat: {marks}",
+        f"            Bar:  {bar:<4}",
+    ]
+
+
+# ====================================================
+# Frame Loop
+# ====================================================
+class FrameStats:
+    """Frame-time metrics."""
+
+    def __init__(self):
+        self.frame_times = []
+        self.late_frames = 0
+
+    def add(self, frame_time, late):
+        self.frame_times.append(frame_time)
+        if late:
+            self.late_frames += 1
+
+    def report(self, cells_written):
+        """Return a one-line summary."""
+        if not self.frame_times:
+            return "No frames drawn"
+        times = sorted(self.frame_times)
+        n = len(times)
+        mean = sum(times) / n * 1000
+        p99 = times[min(n - 1, int(n * 0.99))] * 1000
+        return (f"Frames: {n}  mean {mean:.3f}ms  p99 {p99:.3f}ms  "
+                f"max {times[-1] * 1000:.3f}ms  late {self.late_frames}  "
+                f"cells/frame {cells_written / n:.1f}")
+
+
+def run(state, fps=FPS, renderer=None, duration=None):
+    """
+    Draw frames at a fixed rate until interrupted.
+
+    Args:
+        state: BeatState to draw
+        fps: Frames per second
+        renderer: TerminalRenderer (default: stdout)
+        duration: Optional run time in seconds
+
+    Returns:
+        FrameStats
+    """
+    renderer = renderer or TerminalRenderer()
+    stats = FrameStats()
+    frame_interval = 1.0 / fps
+    renderer.clear()
+
+    start = time.monotonic()
+    next_frame = start
+    try:
+        while duration is None or next_frame - start < duration:
+            t0 = time.monotonic()
+            renderer.render(compose_frame(state.latest, time.time()))
+            t1 = time.monotonic()
+
+            next_frame += frame_interval
+            late = t1 > next_frame
+            stats.add(t1 - t0, late)
+            if late:
+                # Skip missed frames rather than trying to catch up
+                next_frame = t1
+            else:
+                time.sleep(next_frame - t1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        renderer.restore()
+    return stats
+
+
+def main():
+    args = sys.argv[1:]
+    fps = FPS
+    path = SOCKET_PATH
+    if "--fps" in args:
+        fps = int(args[args.index("--fps") + 1])
+    if "--socket" in args:
+        path = args[args.index("--socket") + 1]
+
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(path)
+    except OSError as e:
+        print(f"Cannot connect to {path}: {e}")
+        exit(1)
+    sock.sendall(b"subscribe\n")
+
+    state = BeatState()
+    threading.Thread(target=state.follow, args=(sock,), daemon=True).start()
+
+    renderer = TerminalRenderer()
+    stats = run(state, fps, renderer)
+    print(stats.report(renderer.cells_written))
+
+
+if __name__ == "__main__":
+    main()
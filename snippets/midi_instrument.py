@@ -0,0 +1,264 @@
+"""
+MIDI Instrument
+---------------
+Plays incoming MIDI through the synth voice pool (keyboards) and the drum
+engine samples (e-drums on channel 10).
+
+The mido input callback (python-rtmidi backend) runs on the MIDI thread;
+it only stamps each message with time.perf_counter() and puts it on a
+SimpleQueue. The audio loop drains the queue before every block, so a
+message waits at most one block before it is rendered. Blocks go to the
+shared output stream of audio_device. The time from the callback to the
+end of the write, plus the stream's reported output latency and the one
+block the input may queue, is recorded per note as input-to-output latency.
+
+Handled messages: note on/off, CC 7 (volume), CC 64 (sustain),
+CC 120/123 (all sound / notes off).
+
+Usage:
+    python midi_instrument.py --list
+    python midi_instrument.py [--port NAME] [--waveform sawtooth]
+    python midi_instrument.py --virtual     # opens 'metronome-synth' for other apps
+    python midi_instrument.py --demo        # virtual port fed by a test sequence
+"""
+
+import collections
+import queue
+import sys
+import threading
+import time
+
+import audio_device
+import mido
+import numpy as np
+from drum_engine import voice_sample
+from synth_voices import BLOCK, SAMPLE_RATE, VoicePool
+
+# ====================================================
+# Global Constants
+# ====================================================
+VIRTUAL_PORT = "metronome-synth"
+DRUM_CHANNEL = 9            # MIDI channel 10
+DRUM_NOTES = {              # General MIDI drum map -> drum_engine voices
+    35: 'BD', 36: 'BD',
+    37: 'SD', 38: 'SD', 40: 'SD',
+    42: 'HH', 44: 'HH', 46: 'HH',
+    49: 'SY', 51: 'SY', 52: 'SY', 55: 'SY', 57: 'SY',
+}
+DRUM_GAIN = 0.6
+LATENCY_WINDOW = 1000       # Notes kept for latency statistics
+
+
+# ====================================================
+# Drum Voices
+# ====================================================
+class DrumVoices:
+    """One-shot drum samples mixed block by block."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.playing = []       # [sample, position, gain]
+
+    def trigger(self, note, velocity):
+        """Start the drum voice mapped to a GM note."""
+        voice = DRUM_NOTES.get(note)
+        if voice:
+            self.playing.append([voice_sample(voice, self.sample_rate), 0,
+                                 DRUM_GAIN * velocity / 127])
+
+    def process(self, out):
+        """Add the next block of every sounding hit to out."""
+        frames = len(out)
+        for hit in self.playing:
+            sample, pos, gain = hit
+            chunk = sample[pos:pos + frames]
+            out[:len(chunk)] += chunk * gain
+            hit[1] = pos + frames
+        self.playing = [h for h in self.playing if h[1] < len(h[0])]
+        return out
+
+
+# ====================================================
+# Instrument
+# ====================================================
+class MidiInstrument:
+    """Routes timestamped MIDI messages into the synth engines."""
+
+    def __init__(self, pool=None, drums=None):
+        """
+        Initialize instrument.
+
+        Args:
+            pool: VoicePool for pitched notes
+            drums: DrumVoices for channel 10
+        """
+        self.pool = pool or VoicePool()
+        self.drums = drums or DrumVoices(self.pool.sample_rate)
+        self.events = queue.SimpleQueue()
+        self.latencies = collections.deque(maxlen=LATENCY_WINDOW)
+        self.volume = 1.0
+        self.port = None
+
+    # ---- MIDI thread -------------------------------------------------
+    def callback(self, message):
+        """mido input callback: timestamp and queue, nothing else."""
+        self.events.put((time.perf_counter(), message))
+
+    def open(self, name=None, virtual=False):
+        """
+        Open a MIDI input port.
+
+        Args:
+            name: Port name (default: first available port)
+            virtual: Create a virtual port that other programs can connect to
+        """
+        if virtual:
+            name = name or VIRTUAL_PORT
+        self.port = mido.open_input(name, virtual=virtual, callback=self.callback)
+        return self.port
+
+    def close(self):
+        """Close the MIDI port."""
+        if self.port:
+            self.port.close()
+            self.port = None
+
+    # ---- audio thread ------------------------------------------------
+    def dispatch(self):
+        """
+        Apply all queued messages.
+
+        Returns:
+            List of callback timestamps of the note-on messages applied
+        """
+        stamps = []
+        while True:
+            try:
+                stamp, msg = self.events.get_nowait()
+            except queue.Empty:
+                return stamps
+            if msg.type == 'note_on' and msg.velocity > 0:
+                if msg.channel == DRUM_CHANNEL:
+                    self.drums.trigger(msg.note, msg.velocity)
+                else:
+                    self.pool.note_on(msg.note, msg.velocity)
+                stamps.append(stamp)
+            elif msg.type in ('note_on', 'note_off'):
+                if msg.channel != DRUM_CHANNEL:
+                    self.pool.note_off(msg.note)
+            elif msg.type == 'control_change':
+                if msg.control == 7:
+                    self.volume = msg.value / 127
+                elif msg.control == 64:
+                    self.pool.sustain(msg.value >= 64)
+                elif msg.control in (120, 123):
+                    self.pool.all_notes_off()
+
+    def render(self, frames=BLOCK):
+        """Render one block from both engines."""
+        out = self.pool.process(frames)
+        self.drums.process(out)
+        out *= self.volume
+        np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    def run(self, stream, output_latency=0.0, duration=None):
+        """
+        Audio loop: dispatch, render and write blocks until Ctrl+C.
+
+        Args:
+            stream: Output stream with a blocking write()
+            output_latency: Stream buffer latency in seconds
+            duration: Stop after this many seconds (None = forever)
+        """
+        end = None if duration is None else time.perf_counter() + duration
+        try:
+            while end is None or time.perf_counter() < end:
+                stamps = self.dispatch()
+                stream.write(self.render(BLOCK).tobytes())
+                if stamps:
+                    now = time.perf_counter()
+                    self.latencies.extend((now - s + output_latency) * 1000 for s in stamps)
+        except KeyboardInterrupt:
+            pass
+
+    def latency_stats(self):
+        """
+        Input-to-output latency of recent notes.
+
+        Returns:
+            Dict with count, mean, p50, p95 and max in ms (None if no notes)
+        """
+        if not self.latencies:
+            return None
+        values = np.array(self.latencies)
+        p50, p95 = np.percentile(values, [50, 95])
+        return {"count": len(values), "mean": values.mean(), "p50": p50,
+                "p95": p95, "max": values.max()}
+
+
+def print_latency(stats):
+    """Print latency statistics."""
+    if stats is None:
+        print("No notes received")
+        return
+    print(f"Latency over {stats['count']} notes: mean {stats['mean']:.1f}ms  "
+          f"p50 {stats['p50']:.1f}ms  p95 {stats['p95']:.1f}ms  max {stats['max']:.1f}ms")
+
+
+def send_demo(port_name=VIRTUAL_PORT, bpm=100, bars=4):
+    """Play an arpeggio with kick and snare into a MIDI port."""
+    step = 60 / bpm / 2
+    with mido.open_output(port_name) as out:
+        for i in range(bars * 8):
+            note = [60, 64, 67, 72][i % 4]
+            out.send(mido.Message('note_on', note=note, velocity=90))
+            drum = 36 if i % 4 == 0 else 38 if i % 4 == 2 else 42
+            out.send(mido.Message('note_on', channel=DRUM_CHANNEL, note=drum, velocity=100))
+            time.sleep(step)
+            out.send(mido.Message('note_off', note=note))
+
+
+def _option(args, name, default=None):
+    if name in args:
+        i = args.index(name)
+        value = args[i + 1]
+        del args[i:i + 2]
+        return value
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    if "--list" in args:
+        for name in mido.get_input_names():
+            print(name)
+        return
+
+    port = _option(args, "--port")
+    waveform = _option(args, "--waveform", "sawtooth")
+    demo = "--demo" in args
+    instrument = MidiInstrument(VoicePool(waveform=waveform))
+    try:
+        instrument.open(port, virtual="--virtual" in args or demo)
+    except OSError as e:
+        print(f"MIDI input error: {e}")
+        exit(1)
+    print(f"Listening on {instrument.port.name} (Ctrl+C to stop)")
+    if demo:
+        threading.Thread(target=send_demo, args=(instrument.port.name,), daemon=True).start()
+
+    # One block of queueing on top of the shared stream's own buffer
+    out = audio_device.open_input(SAMPLE_RATE, latency=BLOCK)
+    latency = out.mixer.stream.get_output_latency() + out.latency / SAMPLE_RATE
+    try:
+        instrument.run(out, latency)
+    finally:
+        instrument.close()
+        out.close()
+    print()
+    print_latency(instrument.latency_stats())
+
+
+if __name__ == "__main__":
+    main()
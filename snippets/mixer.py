@@ -0,0 +1,342 @@
+"""
+Mixer
+-----
+Stereo mixing of tracks, block by block.
+
+Every track gets a channel strip (gain, pan, mute, solo, sends). Per
+block, the mono track blocks are stacked into a (strips, frames) matrix
+and mixed to stereo with one matrix product against the (strips, 2) gain
+matrix, whose pan gains come from a constant-power table. Each send bus
+sums its own stereo mix the same way and runs it through its effects
+before joining the master. Only the notes sounding in a block are
+synthesized (Track.render_block), so an arrangement plays in real time
+without rendering the whole song first:
+
+    mixer = song.mixer()                        # or Mixer() + add_track()
+    lead, pad = mixer.strips
+    lead.pan = -0.4
+    pad.sends['reverb'] = 0.3
+    mixer.add_bus('reverb', effects=[...])      # objects with process(block)
+    block = mixer.process()                     # next (BLOCK, 2) float32 block
+    pad.mute = True                             # from the next block on
+
+Gain and pan changes are ramped over one block to avoid zipper noise.
+
+Usage:
+    python snippets/mixer.py [--play] [--bench TRACKS]
+"""
+
+import functools
+import importlib
+import sys
+import time
+
+import profiler
+from envelope import fade_curve
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# ====================================================
+# Global Constants
+# ====================================================
+SAMPLE_RATE = 44100
+BLOCK = 512             # Frames per block
+PAN_STEPS = 1025        # Pan table resolution (-1 .. 1)
+DTYPE = 'float32'
+
+
+@functools.lru_cache(maxsize=4)
+def pan_table(steps=PAN_STEPS):
+    """
+    Constant-power pan law: (left, right) = (cos, sin) of 0 .. pi/2.
+
+    Returns:
+        Read-only (steps, 2) float32 array; row 0 is hard left, the middle
+        row is center (-3 dB on each side)
+    """
+    angle = np.linspace(0, np.pi / 2, steps)
+    table = np.stack([np.cos(angle), np.sin(angle)], axis=1).astype(DTYPE)
+    table.flags.writeable = False
+    return table
+
+
+def pan_gains(pan):
+    """(left, right) gains of a pan position in -1 .. 1."""
+    table = pan_table()
+    pan = min(max(pan, -1.0), 1.0)
+    return table[int(round((pan + 1) / 2 * (len(table) - 1)))]
+
+
+# ====================================================
+# Strips and Buses
+# ====================================================
+class Strip:
+    """Channel strip of one track."""
+
+    def __init__(self, track, name, gain=1.0, pan=0.0, sends=None):
+        """
+        Args:
+            track: Track with render_block() (see multi-track_wave_sound)
+            name: Strip name
+            gain: Fader gain
+            pan: -1 (left) .. 1 (right)
+            sends: Dict of bus name -> send level (post-fader)
+        """
+        self.track = track
+        self.name = name
+        self.gain = gain
+        self.pan = pan
+        self.mute = False
+        self.solo = False
+        self.sends = dict(sends or {})
+
+
+class Bus:
+    """Stereo send bus with an effect chain."""
+
+    def __init__(self, name, effects=None, gain=1.0):
+        """
+        Args:
+            name: Bus name (the key used in Strip.sends)
+            effects: Objects with process(block), applied in place to
+                     (frames, 2) float32 blocks
+            gain: Return level
+        """
+        self.name = name
+        self.effects = list(effects or [])
+        self.gain = gain
+        self.mute = False
+
+
+# ====================================================
+# Mixer
+# ====================================================
+class Mixer:
+    """Block-based stereo mixer."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, block=BLOCK, gain=1.0):
+        """
+        Args:
+            sample_rate: Audio sample rate
+            block: Default frames per process() call
+            gain: Master gain
+        """
+        self.sample_rate = sample_rate
+        self.block = block
+        self.gain = gain
+        self.strips = []
+        self.buses = {}
+        self.effects = []       # Master effects
+        self.pos = 0
+        self._gains = None      # Gain matrix of the previous block (for ramps)
+        self._buffers = {}
+
+    def add_track(self, track, gain=1.0, pan=0.0, sends=None, name=None):
+        """
+        Add a track on a new strip.
+
+        Returns:
+            The Strip
+        """
+        strip = Strip(track, name or f"{track.NAME}{len(self.strips) + 1}", gain, pan, sends)
+        self.strips.append(strip)
+        self._gains = None
+        return strip
+
+    def add_bus(self, name, effects=None, gain=1.0):
+        """
+        Add a send bus.
+
+        Returns:
+            The Bus
+        """
+        bus = self.buses[name] = Bus(name, effects, gain)
+        return bus
+
+    def strip(self, name):
+        """Strip by name."""
+        for strip in self.strips:
+            if strip.name == name:
+                return strip
+        raise KeyError(name)
+
+    @property
+    def length(self):
+        """Length of the arrangement in samples (the longest track)."""
+        duration = max((sum(d * (60.0 / s.track.tempo) for d in s.track.durations)
+                        for s in self.strips), default=0)
+        return int(self.sample_rate * duration)
+
+    def gain_matrix(self):
+        """
+        Current (strips, 2) stereo gains: pan law x fader, zero when muted
+        or when another strip is soloed.
+        """
+        soloed = any(s.solo for s in self.strips)
+        gains = np.zeros((len(self.strips), 2), dtype=DTYPE)
+        for i, s in enumerate(self.strips):
+            if not s.mute and (s.solo or not soloed):
+                gains[i] = pan_gains(s.pan) * s.gain
+        return gains
+
+    def seek(self, pos):
+        """Continue from sample pos (resets effect tails)."""
+        self.pos = pos
+        for fx in self.effects + [fx for bus in self.buses.values() for fx in bus.effects]:
+            if hasattr(fx, "reset"):
+                fx.reset()
+
+    def process(self, frames=None):
+        """
+        Mix the next block and advance.
+
+        Returns:
+            (frames, 2) float32 block, valid until the next call
+        """
+        frames = frames or self.block
+        block = self.mix(self.pos, frames)
+        self.pos += frames
+        return block
+
+    def mix(self, start, frames):
+        """
+        Mix samples start .. start + frames.
+
+        Effects keep state between calls, so blocks should be consecutive
+        (see process()).
+
+        Returns:
+            (frames, 2) float32 block, valid until the next call
+        """
+        with profiler.stage("mixer.block", frames):
+            gains = self.gain_matrix()
+            prev = self._gains if self._gains is not None else gains
+            blocks = self._track_blocks(start, frames, (gains != 0).any(1) | (prev != 0).any(1))
+
+            # Dry mix: one (frames, strips) x (strips, 2) product, ramped
+            # from the previous gains for strips whose gain or pan changed
+            out = self._buffer("out", (frames, 2))
+            np.matmul(blocks.T, prev, out=out)
+            changed = np.flatnonzero((prev != gains).any(1))
+            if len(changed):
+                ramp = fade_curve(frames, dtype=DTYPE)
+                for i in changed:
+                    out += np.outer(ramp * blocks[i], gains[i] - prev[i])
+            self._gains = gains
+
+            # Send buses (post-fader)
+            for bus in self.buses.values():
+                levels = np.array([s.sends.get(bus.name, 0.0) for s in self.strips], dtype=DTYPE)
+                if bus.mute or not (levels.any() or bus.effects):
+                    continue
+                with profiler.stage(f"bus.{bus.name}", frames):
+                    send = self._buffer(f"bus.{bus.name}", (frames, 2))
+                    np.matmul(blocks.T, gains * levels[:, None], out=send)
+                    for fx in bus.effects:
+                        fx.process(send)
+                    send *= bus.gain
+                    out += send
+
+            for fx in self.effects:
+                fx.process(out)
+            out *= self.gain
+            np.clip(out, -1.0, 1.0, out=out)
+        return out
+
+    def render(self):
+        """
+        Mix the whole arrangement block by block.
+
+        Returns:
+            (length, 2) float32 array
+        """
+        self.seek(0)
+        length = self.length
+        wave = np.empty((length, 2), dtype=DTYPE)
+        profiler.alloc(wave.nbytes)
+        while self.pos < length:
+            pos = self.pos
+            wave[pos:pos + self.block] = self.process(min(self.block, length - pos))
+        return wave
+
+    def play(self):
+        """Stream the arrangement through a stereo AudioPlayer."""
+        wave_sound = importlib.import_module("multi-track_wave_sound")
+        length = self.length
+        with wave_sound.AudioPlayer(self.sample_rate, channels=2) as player:
+            while self.pos < length:
+                block = self.process(min(self.block, length - self.pos))
+                player.play_wave(block, volume=1.0, envelope=(0, 0))
+        return self
+
+    def _track_blocks(self, start, frames, audible):
+        """(strips, frames) matrix of the tracks' mono blocks."""
+        blocks = self._buffer("tracks", (len(self.strips), frames))
+        blocks.fill(0)
+        for i, s in enumerate(self.strips):
+            if audible[i]:
+                s.track.render_block(start, frames, self.sample_rate, out=blocks[i])
+        return blocks
+
+    def _buffer(self, name, shape):
+        """Reusable work buffer (contents undefined)."""
+        buf = self._buffers.get(name)
+        if buf is None or buf.shape != shape:
+            buf = self._buffers[name] = np.empty(shape, dtype=DTYPE)
+            profiler.alloc(buf.nbytes)
+        return buf
+
+
+# ====================================================
+# Main
+# ====================================================
+def demo_song(wave_sound, tracks=2, bars=8):
+    """Melody and chord tracks alternating, `bars` bars long."""
+    melody = ['E5', 'D5', 'C5', 'D5', 'E5', 'E5', 'E5', 'rest'] * (bars // 2)
+    rhythm = [0.75, 0.25, 0.5, 0.5, 0.5, 0.5, 1, 0.5] * (bars // 2)
+    chords = (['C', 'Am', 'F', 'G7'] * bars)[:bars]
+    song = wave_sound.Song(tempo=120)
+    for i in range(tracks):
+        if i % 2 == 0:
+            song.add_melody(melody, rhythm, waveform=['sine', 'triangle'][i // 2 % 2])
+        else:
+            song.add_chords(chords, [4] * bars, waveform=['sine', 'sawtooth'][i // 2 % 2])
+    return song
+
+
+def main():
+    args = sys.argv[1:]
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+
+    if "--bench" in args:
+        tracks = int(args[args.index("--bench") + 1])
+        mixer = demo_song(wave_sound, tracks).mixer()
+        for i, strip in enumerate(mixer.strips):
+            strip.pan = -0.8 + 1.6 * i / max(len(mixer.strips) - 1, 1)
+        mixer.process()             # Warm up (imports, caches)
+        mixer.seek(0)
+        times = []
+        while mixer.pos < mixer.length:
+            start = time.perf_counter()
+            mixer.process()
+            times.append(time.perf_counter() - start)
+        budget = BLOCK / SAMPLE_RATE
+        print(f"{tracks} tracks, {len(times)} blocks of {BLOCK}: "
+              f"mean {np.mean(times) * 1000:.3f}ms, max {np.max(times) * 1000:.3f}ms "
+              f"({np.mean(times) / budget:.1%} of real time)")
+        return
+
+    mixer = demo_song(wave_sound).mixer()
+    lead, pad = mixer.strips
+    lead.pan, pad.pan, pad.gain = -0.5, 0.5, 0.8
+    if "--play" in args:
+        mixer.play()
+    else:
+        wave = mixer.render()
+        print(f"{len(wave) / SAMPLE_RATE:.1f}s stereo, peak L {np.abs(wave[:, 0]).max():.2f} "
+              f"R {np.abs(wave[:, 1]).max():.2f}")
+
+
+if __name__ == "__main__":
+    main()
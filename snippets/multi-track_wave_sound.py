@@ -5,17 +5,79 @@ A Python module for generating and playing multi-track audio with support for me
 chords, and various waveforms. Includes audio playback and WAV file export functionality.
 """
 
-import numpy as np
-import pyaudio
+import bisect
 import time
 
+import audio_device
+import profiler
+import render_cache
+from envelope import Envelope, fade_in_out
+from lazy_import import lazy_import
+
+# Loaded on first use, so note/chord utilities start without numpy
+np = lazy_import("numpy")
+
 # ====================================================
 # Global Constants
 # ====================================================
 SAMPLE_RATE = 44100  # CD quality sample rate (Hz)
+DTYPE = 'float32'    # Sample format from synthesis to the output stream
+PHASE_SEGMENT = 4096  # Samples per phase advance table (see phase_advance)
 NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
 
 
+# ====================================================
+# Buffers
+# ====================================================
+_advances = {}  # (freq, sample_rate) -> read-only phase advance table
+_zeros = None   # Read-only silence
+_scratch = {}   # name -> work buffer reused between notes
+
+
+def _grow(length, needed):
+    return max(needed, 2 * length)
+
+
+def phase_advance(freq, sample_rate=SAMPLE_RATE):
+    """
+    Phase advance (n * freq / sample_rate) % 1 for n < PHASE_SEGMENT.
+    
+    Reduced to one cycle in float64, then stored as a read-only float32
+    table shared by all notes at the same pitch.
+    """
+    key = (freq, sample_rate)
+    table = _advances.get(key)
+    if table is None:
+        if len(_advances) >= 512:
+            _advances.clear()       # Arbitrary frequencies, not just notes
+        cycles = np.arange(PHASE_SEGMENT) * (freq / sample_rate)
+        table = (cycles - np.floor(cycles)).astype(DTYPE)
+        table.flags.writeable = False
+        _advances[key] = table
+        profiler.alloc(table.nbytes)
+    return table
+
+
+def silence(samples):
+    """Read-only block of zeros."""
+    global _zeros
+    if _zeros is None or len(_zeros) < samples:
+        _zeros = np.zeros(_grow(0 if _zeros is None else len(_zeros), samples), dtype=DTYPE)
+        _zeros.flags.writeable = False
+        profiler.alloc(_zeros.nbytes)
+    return _zeros[:samples]
+
+
+def scratch(name, samples):
+    """Reusable work buffer of the given length (contents undefined)."""
+    buf = _scratch.get(name)
+    if buf is None or len(buf) < samples:
+        buf = _scratch[name] = np.empty(_grow(0 if buf is None else len(buf), samples),
+                                        dtype=DTYPE)
+        profiler.alloc(buf.nbytes)
+    return buf[:samples]
+
+
 # ====================================================
 # Note Utilities Class
 # ====================================================
@@ -66,22 +128,10 @@ class NoteUtils:
             sample_rate: Audio sample rate
         
         Returns:
-            Waveform with envelope applied
+            Waveform with envelope applied (a new array)
         """
-        envelope = np.ones_like(wave)
-        samples = len(wave)
-        
-        # Attack phase (fade in)
-        attack_samples = int(attack * sample_rate)
-        if attack_samples > 0:
-            envelope[:attack_samples] = np.linspace(0, 1, attack_samples)
-        
-        # Release phase (fade out)
-        release_samples = int(release * sample_rate)
-        if release_samples > 0:
-            envelope[-release_samples:] = np.linspace(1, 0, release_samples)
-        
-        return wave * envelope
+        # Fade a copy in place with cached ramps instead of a full-length envelope
+        return fade_in_out(np.array(wave, dtype=DTYPE), attack, release, sample_rate)
     
     @staticmethod
     def generate_waveform(notes, duration, waveform='sine', sample_rate=SAMPLE_RATE):
@@ -91,41 +141,200 @@ class NoteUtils:
         Args:
             notes: Single note string or list of note strings
             duration: Duration in seconds
-            waveform: Waveform type ('sine', 'square', 'sawtooth', 'triangle')
+            waveform: Waveform type ('sine', 'square', 'sawtooth', 'triangle',
+                      or the band-limited 'square_bl', 'sawtooth_bl', 'triangle_bl')
             sample_rate: Audio sample rate
         
         Returns:
-            Generated waveform array
+            Generated float32 waveform array
         """
-        # Create time array
-        t = np.linspace(0, duration, int(sample_rate * duration), False)
+        wave = np.empty(int(sample_rate * duration), dtype=DTYPE)
+        return NoteUtils.render_notes(wave, notes, waveform, sample_rate)
+    
+    @staticmethod
+    def render_notes(out, notes, waveform='sine', sample_rate=SAMPLE_RATE, offset=0):
+        """
+        Generate a single note or chord into a preallocated buffer.
         
+        Args:
+            out: float32 array to overwrite; its length sets the duration
+            notes: Single note string or list of note strings
+            waveform: Waveform type
+            sample_rate: Audio sample rate
+            offset: Sample of the note where out starts (for block rendering)
+        
+        Returns:
+            out
+        """
         # Single note case
         if isinstance(notes, str):
             freq = NoteUtils.note_to_freq(notes)
-            return NoteUtils._generate_single_note(t, freq, waveform)
+            phase = NoteUtils._note_phase(offset, len(out), freq, sample_rate)
+            return NoteUtils._oscillator(phase, freq, waveform, out, sample_rate)
         
         # Multiple notes (chord) case
-        else:
-            wave = np.zeros_like(t)
-            for note in notes:
-                freq = NoteUtils.note_to_freq(note)
-                wave += NoteUtils._generate_single_note(t, freq, waveform)
-            return wave
+        out.fill(0)
+        partial = scratch("partial", len(out))
+        for note in notes:
+            freq = NoteUtils.note_to_freq(note)
+            phase = NoteUtils._note_phase(offset, len(out), freq, sample_rate)
+            out += NoteUtils._oscillator(phase, freq, waveform, partial, sample_rate)
+        return out
+    
+    @staticmethod
+    def _note_phase(offset, samples, freq, sample_rate=SAMPLE_RATE):
+        """
+        Phase in cycles (0-2) of samples offset .. offset + samples of a note.
+        
+        n * freq / sample_rate in float32 loses the fraction as the cycle
+        count grows (a whole sawtooth edge out of place after 30 seconds at
+        1.76 kHz), and float64 throughout costs several times the float32
+        oscillator. So the phase of each sample is the phase at the start
+        of its segment of PHASE_SEGMENT samples plus the advance within the
+        segment (phase_advance), both reduced to one cycle in float64; only
+        their sum is float32, so the error stays at float32 rounding
+        however long the note.
+        
+        Returns:
+            float32 work buffer (valid until the next call)
+        """
+        step = freq / sample_rate
+        advance = phase_advance(freq, sample_rate)
+        if samples <= PHASE_SEGMENT:
+            phase = scratch("phase", samples)
+            return np.add(advance[:samples], (offset * step) % 1, out=phase)
+        segments = -(-samples // PHASE_SEGMENT)
+        starts = (offset + PHASE_SEGMENT * np.arange(segments)) * step
+        starts -= np.floor(starts)
+        grid = scratch("phase", segments * PHASE_SEGMENT).reshape(segments, PHASE_SEGMENT)
+        np.add(starts.astype(DTYPE)[:, None], advance, out=grid)
+        return grid.ravel()[:samples]
     
     @staticmethod
-    def _generate_single_note(t, freq, waveform):
-        """Generate single frequency waveform."""
-        if waveform == 'sine':
-            return np.sin(2 * np.pi * freq * t)
+    def _generate_single_note(t, freq, waveform, out=None, sample_rate=SAMPLE_RATE):
+        """
+        Generate single frequency waveform at times t (in place into out if given).
+        
+        The phase is reduced to one cycle in float64 before the waveform
+        is computed, so t may be far from zero.
+        """
+        if out is None:
+            out = np.empty(np.broadcast(t, freq).shape, dtype=np.result_type(t, np.float32))
+        phase = NoteUtils._fraction(np.multiply(t, freq, dtype=np.float64))
+        return NoteUtils._oscillator(phase, freq, waveform, out, sample_rate)
+    
+    @staticmethod
+    def _oscillator(phase, freq, waveform, out, sample_rate=SAMPLE_RATE):
+        """
+        Waveform from the phase in cycles (0-2) of every sample, into out.
+        
+        The phase is reduced to 0-1 in place where the waveform needs it.
+        """
+        if waveform not in ('sine', 'square'):
+            NoteUtils._fraction(phase)
+        if waveform.endswith('_bl'):
+            NoteUtils._band_limited(phase, freq, waveform, out, sample_rate)
         elif waveform == 'square':
-            return np.sign(np.sin(2 * np.pi * freq * t))
+            np.multiply(phase, 2 * np.pi, out=out)
+            np.sin(out, out=out)
+            np.sign(out, out=out)
         elif waveform == 'sawtooth':
-            return 2 * (t * freq % 1) - 1
+            # 2 * phase - 1
+            np.multiply(phase, 2, out=out)
+            out -= 1
         elif waveform == 'triangle':
-            return 2 * np.abs(2 * (t * freq - np.floor(t * freq + 0.5))) - 1
+            # 4 * |x - round(x)| - 1 = 1 - 4 * |phase - 0.5|
+            np.subtract(phase, 0.5, out=out)
+            np.abs(out, out=out)
+            out *= -4
+            out += 1
+        else:
+            np.multiply(phase, 2 * np.pi, out=out)  # Sine (also the default)
+            np.sin(out, out=out)
+        return out
+    
+    @staticmethod
+    def _band_limited(phase, freq, waveform, out, sample_rate):
+        """
+        Square/sawtooth with PolyBLEP and triangle with PolyBLAMP corrections.
+        
+        The naive waveform is computed from the phase, then only the two
+        samples around each jump (square, sawtooth) or corner (triangle)
+        get a polynomial residual that band-limits it, so the cost stays
+        close to the naive waveform instead of an oversampled one.
+        """
+        if out.ndim > 1:
+            # One oscillator per row (e.g. a (voices, frames) grid)
+            phase, freq = np.broadcast_arrays(phase, freq)
+            for i in np.ndindex(out.shape[:-1]):
+                NoteUtils._band_limited(phase[i], float(freq[i][0]), waveform, out[i], sample_rate)
+            return out
+        
+        dt = min(freq / sample_rate, 0.5)      # Phase step per sample
+        start = float(phase[0]) if len(phase) else 0.0
+        
+        if waveform == 'sawtooth_bl':
+            np.multiply(phase, 2, out=out)
+            out -= 1
+            NoteUtils._poly_residual(out, phase, start, dt, 0.0, -2.0)
+        elif waveform == 'square_bl':
+            np.subtract(0.5, phase, out=out)
+            np.sign(out, out=out)
+            NoteUtils._poly_residual(out, phase, start, dt, 0.0, 2.0)
+            NoteUtils._poly_residual(out, phase, start, dt, 0.5, -2.0)
+        elif waveform == 'triangle_bl':
+            # 1 - 4 * |phase - 0.5|: slope +4 then -4 per cycle
+            np.subtract(phase, 0.5, out=out)
+            np.abs(out, out=out)
+            out *= -4
+            out += 1
+            NoteUtils._poly_residual(out, phase, start, dt, 0.0, 8.0, ramp=True)
+            NoteUtils._poly_residual(out, phase, start, dt, 0.5, -8.0, ramp=True)
+        else:
+            raise ValueError(f"Unknown waveform: {waveform}")
+        return out
+    
+    @staticmethod
+    def _poly_residual(out, phase, start, dt, at, height, ramp=False):
+        """
+        Add the two-sample polynomial residual of a discontinuity at phase `at`.
+        
+        Args:
+            out: Waveform to correct in place
+            phase: Phase (0-1) of every sample
+            start: Phase of the first sample (only its fraction matters)
+            dt: Phase step per sample
+            at: Phase of the discontinuity within each cycle
+            height: Size of the jump (PolyBLEP), or with ramp=True the
+                    change of slope per cycle (PolyBLAMP)
+        """
+        # The samples on either side of every discontinuity (the only ones
+        # within one step of it)
+        first = np.floor(start - at)
+        cycles = np.arange(first, first + len(out) * dt + 2)
+        before = np.floor((cycles + at - start) / dt).astype(np.int64)
+        idx = np.stack([before, before + 1], axis=1).ravel()
+        idx = idx[(idx >= 0) & (idx < len(out))]
+        
+        # Signed phase distance to the nearest discontinuity, in steps
+        d = (phase[idx] - at + 0.5) % 1.0 - 0.5
+        keep = np.abs(d) < dt
+        idx, d = idx[keep], d[keep] / dt
+        u = 1 - np.abs(d)
+        if ramp:
+            residual = u * u * u * (height * dt / 6)
         else:
-            return np.sin(2 * np.pi * freq * t)  # Default to sine
+            residual = u * u * np.where(d < 0, height / 2, -height / 2)
+        out[idx] += residual.astype(out.dtype, copy=False)
+    
+    @staticmethod
+    def _fraction(x):
+        """x % 1 in place, as x - floor(x) (np.remainder is slow for float32)."""
+        if x.ndim == 1 and x.dtype == DTYPE:
+            whole = np.floor(x, out=scratch("whole", len(x)))
+        else:
+            whole = np.floor(x)
+        return np.subtract(x, whole, out=x)
     
     @classmethod
     def parse_chord_symbol(cls, chord_symbol):
@@ -238,18 +447,20 @@ class NoteUtils:
 # Audio Player Class
 # ====================================================
 class AudioPlayer:
-    """Audio playback handler using PyAudio."""
+    """Audio playback handler on the shared PyAudio device."""
     
-    def __init__(self, sample_rate=SAMPLE_RATE):
+    def __init__(self, sample_rate=SAMPLE_RATE, channels=1):
         """
         Initialize audio player.
         
         Args:
             sample_rate: Audio sample rate in Hz
+            channels: 1 (mono) or 2 (stereo; mono waves play on both sides)
         """
         self.sample_rate = sample_rate
-        self.p = None
+        self.channels = channels
         self.stream = None
+        self._buffer = None     # float32 output buffer reused between calls
     
     def __enter__(self):
         """Context manager entry."""
@@ -261,52 +472,59 @@ class AudioPlayer:
         self.close()
     
     def open(self):
-        """Open audio stream."""
-        self.p = pyaudio.PyAudio()
-        self.stream = self.p.open(
-            format=pyaudio.paFloat32,
-            channels=1,  # Mono
-            rate=self.sample_rate,
-            output=True
-        )
+        """Attach to the shared output stream (see audio_device)."""
+        self.stream = audio_device.open_input(self.sample_rate, self.channels)
         return self
     
     def close(self):
-        """Close audio stream and release resources."""
+        """Wait for playback to finish and detach from the shared stream."""
         if self.stream:
             self.stream.close()
             self.stream = None
-        if self.p:
-            self.p.terminate()
-            self.p = None
     
     def play_wave(self, wave, volume=0.3, envelope=(0.003, 0.003)):
         """
         Play waveform through audio output.
         
         Args:
-            wave: Waveform array
+            wave: Waveform array, mono or (frames, channels)
             volume: Volume scaling factor (0.0-1.0)
             envelope: Tuple of (attack, release) times in seconds
         """
-        # Apply attack/release envelope
-        attack, release = envelope
-        wave = NoteUtils.apply_envelope(wave, attack, release, self.sample_rate)
-        
-        # Apply volume
-        wave = wave * volume
+        # Apply volume into the float32 output buffer, then the envelope in place
+        with profiler.stage("player.envelope", len(wave)):
+            attack, release = envelope
+            if wave.ndim == 1 and self.channels > 1:
+                wave = wave[:, None]        # Broadcast to every channel
+            if self._buffer is None or len(self._buffer) < len(wave):
+                self._buffer = np.empty((len(wave), self.channels), dtype=DTYPE)
+                profiler.alloc(self._buffer.nbytes)
+            out = self._buffer[:len(wave)]
+            if self.channels == 1:
+                out = out[:, 0]
+            wave = np.multiply(wave, volume, out=out)
+            fade_in_out(wave, attack, release, self.sample_rate)
         
         # Prevent clipping
-        max_amp = np.max(np.abs(wave))
-        if max_amp > 1.0:
-            wave = wave / max_amp * 0.9
+        with profiler.stage("player.normalize", len(wave)):
+            max_amp = max(wave.max(), -wave.min()) if len(wave) else 0.0
+            if max_amp > 1.0:
+                wave *= 0.9 / max_amp
         
         # Play audio
         if self.stream is None:
-            self.open()
-        self.stream.write(wave.astype(np.float32).tobytes())
+            with profiler.stage("player.open"):
+                self.open()
+        self._write(wave)
         return self
     
+    def _write(self, wave):
+        """Hand a float32 buffer to the stream without converting or copying."""
+        frames = wave.size // self.channels
+        with profiler.stage("player.write", frames):
+            self.stream.write(wave.data)    # The mixer input copies it into its ring
+        profiler.stream_write(id(self.stream), frames, self.sample_rate)
+    
     def play_silence(self, duration):
         """
         Play silence (pause) for specified duration.
@@ -316,8 +534,7 @@ class AudioPlayer:
         """
         if duration > 0.0001:  # Skip negligible durations
             samples = int(self.sample_rate * duration)
-            silence = np.zeros(samples)
-            self.stream.write(silence.astype(np.float32).tobytes())
+            self._write(silence(samples * self.channels))
         return self
 
 
@@ -327,7 +544,11 @@ class AudioPlayer:
 class Track:
     """Abstract base class for audio tracks."""
     
-    def __init__(self, tempo=120, style='normal', volume=0.2):
+    NAME = 'track'      # Profiler stage prefix
+    # Attributes events() depends on; the cached schedule is rebuilt when any changes
+    SCHEDULE_INPUTS = ('style', 'volume', 'beat_duration', 'durations')
+    
+    def __init__(self, tempo=120, style='normal', volume=0.2, envelope=None):
         """
         Initialize track.
         
@@ -335,11 +556,15 @@ class Track:
             tempo: Beats per minute
             style: Playing style ('legato', 'normal', 'staccato')
             volume: Volume level (0.0-1.0)
+            envelope: Optional per-note Envelope or (attack, decay, sustain, release)
         """
         self.tempo = tempo
         self.style = style
         self.volume = volume
+        self.envelope = Envelope.coerce(envelope)
         self.beat_duration = 60.0 / tempo  # Duration of one beat in seconds
+        self._schedule_key = None
+        self._schedule_cache = None
     
     def render(self, total_duration, sample_rate=SAMPLE_RATE):
         """
@@ -354,6 +579,119 @@ class Track:
         """
         raise NotImplementedError("Subclasses must implement render()")
     
+    def events(self, sample_rate=SAMPLE_RATE):
+        """
+        Note schedule of the track.
+        
+        Args:
+            sample_rate: Audio sample rate
+        
+        Returns:
+            List of (start, end, generated, notes, gain) sorted by start, in
+            samples; the note is silent after `generated` samples (its slot
+            is rounded up to whole samples)
+        """
+        raise NotImplementedError("Subclasses must implement events()")
+    
+    def mix_into(self, wave, sample_rate=SAMPLE_RATE):
+        """
+        Add the track into a mix buffer.
+        
+        Tracks that only implement render() are rendered and added.
+        
+        Args:
+            wave: float32 mix buffer (modified)
+            sample_rate: Audio sample rate
+        
+        Returns:
+            wave
+        """
+        if type(self).events is Track.events:
+            part = self.render(len(wave) / sample_rate, sample_rate)
+            n = min(len(part), len(wave))
+            wave[:n] += part[:n]
+            return wave
+        self.invalidate()       # Whole renders pick up edits made in place
+        with profiler.stage(f"{self.NAME}.render", len(wave)):
+            return self.render_block(0, len(wave), sample_rate, out=wave)
+    
+    def render_block(self, start, frames, sample_rate=SAMPLE_RATE, out=None):
+        """
+        Render samples start .. start + frames of the track.
+        
+        Only the notes sounding in the block are generated (into a reused
+        work buffer), so a track can be played block by block without
+        rendering it whole.
+        
+        Args:
+            start: First sample
+            frames: Block length in samples
+            sample_rate: Audio sample rate
+            out: Optional float32 buffer to add into (default: new zeros)
+        
+        Returns:
+            The block
+        """
+        if out is None:
+            out = np.zeros(frames, dtype=DTYPE)
+            profiler.alloc(out.nbytes)
+        events, ends = self._schedule(sample_rate)
+        stop = start + frames
+        for i in range(bisect.bisect_right(ends, start), len(events)):
+            first, last, generated, notes, gain = events[i]
+            if first >= stop:
+                break
+            lo, hi = max(first, start), min(last, stop)
+            offset = lo - first
+            
+            # Generated samples of the note, then zeros up to the end of its slot
+            with profiler.stage(f"{self.NAME}.generate", hi - lo):
+                buf = scratch("voice", hi - lo)
+                n = max(0, min(hi, first + generated) - lo)
+                NoteUtils.render_notes(buf[:n], notes, self.waveform, sample_rate, offset)
+                buf[n:] = 0
+            
+            if self.envelope:
+                with profiler.stage(f"{self.NAME}.envelope", hi - lo):
+                    self.envelope.apply_window(buf, offset, last - first, sample_rate)
+            
+            # Add to the block with volume scaling
+            with profiler.stage(f"{self.NAME}.mix", hi - lo):
+                buf *= gain
+                out[lo - start:hi - start] += buf
+        return out
+    
+    def invalidate(self):
+        """
+        Drop the cached note schedule.
+        
+        Needed after editing notes, chords or durations in place (e.g.
+        track.chords[1] = 'G7') while rendering block by block; assigning
+        a new list or value is picked up without it.
+        """
+        self._schedule_key = None
+    
+    def _schedule(self, sample_rate):
+        """
+        events() and their end positions, cached until SCHEDULE_INPUTS change.
+        
+        Checked on every block, so lists are compared by identity and length
+        only, at a cost independent of the song length.
+        """
+        key = [sample_rate]
+        for name in self.SCHEDULE_INPUTS:
+            value = getattr(self, name, None)
+            if isinstance(value, str) or not hasattr(value, '__len__'):
+                key.append(value)
+            else:
+                # Holding the value keeps its id from being reused
+                key.append((id(value), len(value), value))
+        if self._schedule_key != key:
+            events = self.events(sample_rate)
+            self._schedule_cache = (events, [event[1] for event in events])
+            self._schedule_key = key
+        return self._schedule_cache
+    
     def _get_note_length(self, style_dict):
         """
         Get note length factor based on style.
@@ -373,6 +711,9 @@ class Track:
 class MelodyTrack(Track):
     """Track for melody (single notes) playback."""
     
+    NAME = 'melody'
+    SCHEDULE_INPUTS = Track.SCHEDULE_INPUTS + ('notes',)
+    
     # Note length factors for different playing styles
     NOTE_LENGTHS = {
         'legato': 0.98,    # Almost full duration, connected notes
@@ -381,7 +722,7 @@ class MelodyTrack(Track):
     }
     
     def __init__(self, notes, durations, tempo=120, style='normal', 
-                 volume=0.2, waveform='sine'):
+                 volume=0.2, waveform='sine', envelope=None):
         """
         Initialize melody track.
         
@@ -392,8 +733,9 @@ class MelodyTrack(Track):
             style: Playing style
             volume: Volume level
             waveform: Waveform type
+            envelope: Optional per-note envelope
         """
-        super().__init__(tempo, style, volume)
+        super().__init__(tempo, style, volume, envelope)
         self.notes = notes
         self.durations = durations
         self.waveform = waveform
@@ -407,7 +749,7 @@ class MelodyTrack(Track):
             sample_rate: Audio sample rate
         
         Returns:
-            Rendered waveform array
+            Rendered float32 waveform array
         """
         # Calculate total track duration
         track_duration = sum(d * self.beat_duration for d in self.durations)
@@ -415,14 +757,17 @@ class MelodyTrack(Track):
             total_duration = track_duration
         
         # Initialize waveform array
-        t = np.linspace(0, total_duration, int(sample_rate * total_duration), False)
-        wave = np.zeros_like(t)
-        
+        wave = np.zeros(int(sample_rate * total_duration), dtype=DTYPE)
+        profiler.alloc(wave.nbytes)
+        return self.mix_into(wave, sample_rate)
+    
+    def events(self, sample_rate=SAMPLE_RATE):
+        """Note schedule (see Track.events); rests are left out."""
         # Get note length factor based on style
         note_length = self._get_note_length(self.NOTE_LENGTHS)
         current_time = 0
+        events = []
         
-        # Generate each note
         for note, duration in zip(self.notes, self.durations):
             note_duration = duration * self.beat_duration
             
@@ -432,30 +777,14 @@ class MelodyTrack(Track):
                 # Calculate sample indices
                 start_idx = int(round(current_time * sample_rate))
                 end_idx = int(round((current_time + play_duration) * sample_rate))
-                
-                # Generate note waveform if within bounds
-                if start_idx < len(wave) and end_idx > start_idx:
-                    wave_note = NoteUtils.generate_waveform(
-                        note, 
-                        play_duration, 
-                        self.waveform, 
-                        sample_rate
-                    )
-                    
-                    # Adjust length to fit exactly
-                    target_len = end_idx - start_idx
-                    if len(wave_note) > target_len:
-                        wave_note = wave_note[:target_len]
-                    elif len(wave_note) < target_len:
-                        wave_note = np.pad(wave_note, (0, target_len - len(wave_note)), 'constant')
-                    
-                    # Add to waveform with volume scaling
-                    wave[start_idx:end_idx] += wave_note * self.volume
+                if end_idx > start_idx:
+                    events.append((start_idx, end_idx, int(sample_rate * play_duration),
+                                   note, self.volume))
             # Rest: no sound generated
             
             current_time += note_duration
         
-        return wave
+        return events
 
 
 # ====================================================
@@ -464,6 +793,9 @@ class MelodyTrack(Track):
 class ChordTrack(Track):
     """Track for chord progression playback."""
     
+    NAME = 'chord'
+    SCHEDULE_INPUTS = Track.SCHEDULE_INPUTS + ('chords', 'voice_leading')
+    
     # Note length factors for different playing styles
     NOTE_LENGTHS = {
         'legato': 0.98,    # Connected chords
@@ -472,7 +804,7 @@ class ChordTrack(Track):
     }
     
     def __init__(self, chords, durations, tempo=120, style='normal', 
-                 volume=0.15, waveform='sine'):
+                 volume=0.15, waveform='sine', envelope=None, voice_leading=False):
         """
         Initialize chord track.
         
@@ -483,11 +815,18 @@ class ChordTrack(Track):
             style: Playing style
             volume: Volume level
             waveform: Waveform type
+            envelope: Optional per-chord envelope
+            voice_leading: Voice the progression as a whole with minimal
+                           voice movement (see voice_leading.py) instead of
+                           building every chord from the same octave
         """
-        super().__init__(tempo, style, volume)
+        super().__init__(tempo, style, volume, envelope)
         self.chords = chords
         self.durations = durations
         self.waveform = waveform
+        self.voice_leading = voice_leading
+        self._voicings_key = None
+        self._voicings = None
     
     def render(self, total_duration=None, sample_rate=SAMPLE_RATE):
         """
@@ -498,7 +837,7 @@ class ChordTrack(Track):
             sample_rate: Audio sample rate
         
         Returns:
-            Rendered waveform array
+            Rendered float32 waveform array
         """
         # Calculate total track duration
         track_duration = sum(d * self.beat_duration for d in self.durations)
@@ -506,15 +845,22 @@ class ChordTrack(Track):
             total_duration = track_duration
         
         # Initialize waveform array
-        t = np.linspace(0, total_duration, int(sample_rate * total_duration), False)
-        wave = np.zeros_like(t)
-        
+        wave = np.zeros(int(sample_rate * total_duration), dtype=DTYPE)
+        profiler.alloc(wave.nbytes)
+        return self.mix_into(wave, sample_rate)
+    
+    def events(self, sample_rate=SAMPLE_RATE):
+        """
+        Chord schedule (see Track.events); the gain divides the volume by
+        the number of notes to prevent clipping.
+        """
         # Get note length factor based on style
         note_length = self._get_note_length(self.NOTE_LENGTHS)
+        voicings = self.voicings() if self.voice_leading else None
         current_time = 0
+        events = []
         
-        # Generate each chord
-        for chord, duration in zip(self.chords, self.durations):
+        for i, (chord, duration) in enumerate(zip(self.chords, self.durations)):
             chord_duration = duration * self.beat_duration
             play_duration = chord_duration * note_length
             
@@ -522,38 +868,30 @@ class ChordTrack(Track):
             start_idx = int(round(current_time * sample_rate))
             end_idx = int(round((current_time + play_duration) * sample_rate))
             
-            # Generate chord waveform if within bounds
-            if start_idx < len(wave) and end_idx > start_idx:
+            if end_idx > start_idx:
                 # Convert chord symbol to note list if necessary
-                if isinstance(chord, str):
+                if voicings:
+                    notes = voicings[i]
+                elif isinstance(chord, str):
                     notes = NoteUtils.build_chord(chord)
                 else:
                     notes = chord
-                
-                # Generate chord waveform
-                wave_chord = NoteUtils.generate_waveform(
-                    notes,
-                    play_duration,
-                    self.waveform,
-                    sample_rate
-                )
-                
-                # Normalize by number of notes to prevent clipping
-                wave_chord = wave_chord / len(notes)
-                
-                # Adjust length to fit exactly
-                target_len = end_idx - start_idx
-                if len(wave_chord) > target_len:
-                    wave_chord = wave_chord[:target_len]
-                elif len(wave_chord) < target_len:
-                    wave_chord = np.pad(wave_chord, (0, target_len - len(wave_chord)), 'constant')
-                
-                # Add to waveform with volume scaling
-                wave[start_idx:end_idx] += wave_chord * self.volume
+                events.append((start_idx, end_idx, int(sample_rate * play_duration),
+                               notes, self.volume / len(notes)))
             
             current_time += chord_duration
         
-        return wave
+        return events
+    
+    def voicings(self):
+        """Voice-led note lists of the progression, cached until the chords change."""
+        key = repr(self.chords)
+        if self._voicings_key != key:
+            from voice_leading import voice_progression
+            
+            self._voicings = voice_progression(self.chords)
+            self._voicings_key = key
+        return self._voicings
 
 
 # ====================================================
@@ -585,7 +923,8 @@ class Song:
         self.tracks.append(track)
         return self
     
-    def add_melody(self, notes, durations, style='normal', volume=0.2, waveform='sine'):
+    def add_melody(self, notes, durations, style='normal', volume=0.2, waveform='sine',
+                   envelope=None):
         """
         Add melody track to song.
         
@@ -595,15 +934,17 @@ class Song:
             style: Playing style
             volume: Volume level
             waveform: Waveform type
+            envelope: Optional envelope (see envelope.Envelope)
         
         Returns:
             Self for method chaining
         """
-        track = MelodyTrack(notes, durations, self.tempo, style, volume, waveform)
+        track = MelodyTrack(notes, durations, self.tempo, style, volume, waveform, envelope)
         self.tracks.append(track)
         return self
     
-    def add_chords(self, chords, durations, style='normal', volume=0.15, waveform='sine'):
+    def add_chords(self, chords, durations, style='normal', volume=0.15, waveform='sine',
+                   envelope=None, voice_leading=False):
         """
         Add chord track to song.
         
@@ -613,82 +954,140 @@ class Song:
             style: Playing style
             volume: Volume level
             waveform: Waveform type
+            envelope: Optional envelope (see envelope.Envelope)
+            voice_leading: Smooth voicings across the progression (see ChordTrack)
         
         Returns:
             Self for method chaining
         """
-        track = ChordTrack(chords, durations, self.tempo, style, volume, waveform)
+        track = ChordTrack(chords, durations, self.tempo, style, volume, waveform, envelope,
+                           voice_leading)
         self.tracks.append(track)
         return self
     
-    def render(self, sample_rate=SAMPLE_RATE):
+    def length(self, sample_rate=SAMPLE_RATE):
+        """Length of the song in samples (the longest track)."""
+        total_duration = 0
+        for track in self.tracks:
+            track_duration = sum(d * (60.0 / track.tempo) for d in track.durations)
+            total_duration = max(total_duration, track_duration)
+        return int(sample_rate * total_duration)
+    
+    def render(self, sample_rate=SAMPLE_RATE, cache=True):
         """
         Render all tracks and mix into single waveform.
         
         Args:
             sample_rate: Audio sample rate
+            cache: Look the song up in the on-disk render cache first and
+                   store it there on a miss (see render_cache.py)
         
         Returns:
-            Mixed waveform array
+            Mixed float32 waveform array; treat it as read-only (a cache
+            hit is a read-only memory map)
         """
         if not self.tracks:
-            return np.array([])
+            return np.zeros(0, dtype=DTYPE)
+        
+        length = self.length(sample_rate)
+        store = render_cache.get_cache() if cache else None
+        key = store and render_cache.song_key(self, sample_rate, length)
+        if key:
+            wave = store.get(key)
+            if wave is not None:
+                return wave
+        
+        with profiler.stage("song.render", length):
+            # Initialize mixed waveform
+            wave_total = np.zeros(length, dtype=DTYPE)
+            profiler.alloc(wave_total.nbytes)
+            
+            # Render every track straight into the mix
+            for track in self.tracks:
+                track.mix_into(wave_total, sample_rate)
+            
+            # Normalize to prevent clipping
+            with profiler.stage("song.normalize", len(wave_total)):
+                max_amp = max(wave_total.max(), -wave_total.min()) if len(wave_total) else 0.0
+                if max_amp > 1.0:
+                    wave_total *= 0.9 / max_amp
+        
+        if key:
+            store.put(key, wave_total)
+        return wave_total
+    
+    def mixer(self, sample_rate=SAMPLE_RATE):
+        """
+        Stereo mixer with one channel strip per track (see mixer.Mixer).
         
-        # Calculate total duration (use longest track)
-        total_duration = 0
-        for track in self.tracks:
-            track_duration = sum(d * (60.0 / track.tempo) for d in track.durations)
-            total_duration = max(total_duration, track_duration)
+        Args:
+            sample_rate: Audio sample rate
         
-        # Initialize mixed waveform
-        t = np.linspace(0, total_duration, int(sample_rate * total_duration), False)
-        wave_total = np.zeros_like(t)
+        Returns:
+            Mixer, ready to play block by block
+        """
+        from mixer import Mixer
         
-        # Render and mix all tracks
+        mixer = Mixer(sample_rate)
         for track in self.tracks:
-            wave_track = track.render(total_duration, sample_rate)
-            wave_total += wave_track
-        
-        # Normalize to prevent clipping
-        max_amp = np.max(np.abs(wave_total))
-        if max_amp > 1.0:
-            wave_total = wave_total / max_amp * 0.9
-        
-        return wave_total
+            mixer.add_track(track)
+        return mixer
     
-    def play(self, sample_rate=SAMPLE_RATE):
+    def play(self, sample_rate=SAMPLE_RATE, effects=None, cache=True):
         """
         Play the rendered song through audio output.
         
         Args:
             sample_rate: Audio sample rate
+            effects: Optional effect or list of effects (see effects.py),
+                     streamed block by block during playback
+            cache: Use the render cache (see render())
         
         Returns:
             Self for method chaining
         """
-        wave = self.render(sample_rate)
+        wave = self.render(sample_rate, cache)
         
         with AudioPlayer(sample_rate) as player:
-            player.play_wave(wave, volume=1.0, envelope=(0, 0))
+            if effects is None:
+                player.play_wave(wave, volume=1.0, envelope=(0, 0))
+            else:
+                from effects import EffectsChain
+                
+                for block in EffectsChain.coerce(effects).stream(wave, sample_rate=sample_rate):
+                    np.clip(block, -1.0, 1.0, out=block)
+                    player.play_wave(block, volume=1.0, envelope=(0, 0))
         
         return self
     
-    def save(self, filename, sample_rate=SAMPLE_RATE):
+    def save(self, filename, sample_rate=SAMPLE_RATE, effects=None, cache=True):
         """
         Save rendered song to WAV file.
         
         Args:
             filename: Output filename
             sample_rate: Audio sample rate
+            effects: Optional effect or list of effects (see effects.py);
+                     the file includes their tail
+            cache: Use the render cache (see render())
         
         Returns:
             Self for method chaining
         """
         from scipy.io import wavfile
         
-        wave = self.render(sample_rate)
-        # Convert to 16-bit integer format for WAV
-        wave_int16 = (wave * 32767).astype(np.int16)
+        wave = self.render(sample_rate, cache)
+        if effects is not None:
+            from effects import EffectsChain
+            
+            wave = EffectsChain.coerce(effects).apply(wave, sample_rate=sample_rate)
+            max_amp = np.abs(wave).max() if len(wave) else 0.0
+            if max_amp > 1.0:
+                wave *= 0.9 / max_amp
+        # Convert to 16-bit integer format for WAV (the wave may be a
+        # read-only cache entry, so scale straight into the output)
+        wave_int16 = np.empty(wave.shape, dtype=np.int16)
+        np.multiply(wave, 32767, out=wave_int16, casting='unsafe')
         wavfile.write(filename, sample_rate, wave_int16)
         print(f"✅ Saved to {filename}")
         return self
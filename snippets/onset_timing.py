@@ -0,0 +1,402 @@
+"""
+Onset Timing
+------------
+Scores a recorded practice take against the click grid it was played to.
+
+The WAV file is read in blocks with the wave module. Each block is framed
+with sliding_window_view (the last partial frame is carried over into the
+next block), transformed with one rfft call, and reduced to a spectral-flux
+value per frame. Onsets are picked from the flux envelope with an adaptive
+(moving mean) threshold and refined to sub-frame precision.
+
+Each click in the grid is matched with the nearest onset, and the report
+lists early/late deviations, a histogram, the mean deviation on each beat
+of the bar (--beats, default 4) and the swing ratio of the off-beats
+(2.0 = triplet swing, the same as metronome_swing.sh 3).
+
+Grids:
+    --bpm 120                       metronome clicks
+    --pattern "1101 0001 1010"      play.sh pattern (one group per beat)
+    --pattern 10010010              euclidean_rhythm.py --raw output (16ths)
+
+Usage:
+    python onset_timing.py take.wav --bpm 100
+    python onset_timing.py take.wav --bpm 90 --pattern "$(python euclidean_rhythm.py 3 8 --raw)"
+"""
+
+import sys
+import time
+import wave
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ====================================================
+# Global Constants
+# ====================================================
+FRAME = 1024            # STFT frame length (samples)
+HOP = 256               # Frame hop (~5.8ms at 44.1kHz)
+BLOCK_FRAMES = 1 << 16  # Samples read per block
+COMPRESSION = 100.0     # log(1 + C*|X|) magnitude compression
+
+THRESHOLD_WINDOW = 0.1  # Moving-mean window for the threshold (seconds)
+THRESHOLD_DELTA = 0.1   # Offset above the moving mean (normalized flux)
+MIN_GAP = 0.03          # Minimum time between onsets (seconds)
+
+SUBDIVISION = 4         # Steps per beat for patterns without spaces
+HIST_BIN_MS = 5
+
+
+# ====================================================
+# WAV Input
+# ====================================================
+def read_blocks(filename, block_frames=BLOCK_FRAMES):
+    """
+    Read a WAV file in blocks.
+
+    Yields:
+        The sample rate first, then float32 mono blocks in [-1, 1]
+    """
+    with wave.open(filename, "rb") as wf:
+        channels = wf.getnchannels()
+        width = wf.getsampwidth()
+        yield wf.getframerate()
+        while True:
+            data = wf.readframes(block_frames)
+            if not data:
+                break
+            yield _to_float(data, width, channels)
+
+
+def _to_float(data, width, channels):
+    if width == 1:
+        samples = (np.frombuffer(data, dtype=np.uint8).astype(np.float32) - 128) / 128
+    elif width == 2:
+        samples = np.frombuffer(data, dtype="<i2").astype(np.float32) / 32768
+    elif width == 3:
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(-1, 3)
+        ints = (raw[:, 0].astype(np.int32) | raw[:, 1].astype(np.int32) << 8
+                | raw[:, 2].astype(np.int8).astype(np.int32) << 16)
+        samples = ints.astype(np.float32) / (1 << 23)
+    elif width == 4:
+        samples = np.frombuffer(data, dtype="<i4").astype(np.float32) / (1 << 31)
+    else:
+        raise ValueError(f"Unsupported sample width: {width}")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+# ====================================================
+# Onset Detection
+# ====================================================
+class OnsetDetector:
+    """Streaming spectral-flux onset detector."""
+
+    def __init__(self, sample_rate, frame=FRAME, hop=HOP):
+        """
+        Initialize detector.
+
+        Args:
+            sample_rate: Audio sample rate
+            frame: STFT frame length
+            hop: Frame hop in samples
+        """
+        self.sample_rate = sample_rate
+        self.frame = frame
+        self.hop = hop
+        self.window = np.hanning(frame).astype(np.float32)
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.prev = None
+        self.flux = []
+
+    def feed(self, block):
+        """Process one block of mono samples."""
+        buf = np.concatenate([self.carry, block])
+        if len(buf) < self.frame:
+            self.carry = buf
+            return
+        frames = sliding_window_view(buf, self.frame)[::self.hop]
+        mag = np.log1p(COMPRESSION * np.abs(np.fft.rfft(frames * self.window, axis=1)))
+        mag = mag.astype(np.float32)
+        # Positive magnitude change against the previous frame
+        prev = mag[:1] if self.prev is None else self.prev[None, :]
+        diff = np.diff(mag, axis=0, prepend=prev)
+        self.flux.append(np.maximum(diff, 0).sum(axis=1))
+        self.prev = mag[-1]
+        self.carry = buf[len(frames) * self.hop:]
+
+    def onsets(self):
+        """
+        Pick onsets from the flux envelope.
+
+        Returns:
+            Array of onset times in seconds
+        """
+        if not self.flux:
+            return np.empty(0)
+        flux = np.concatenate(self.flux)
+        flux = flux / (flux.max() or 1.0)
+        fps = self.sample_rate / self.hop
+
+        # Adaptive threshold: moving mean + delta
+        w = max(1, int(THRESHOLD_WINDOW * fps))
+        padded = np.pad(flux, w, mode="edge")
+        cumsum = np.concatenate([[0.0], np.cumsum(padded)])
+        mean = (cumsum[2 * w + 1:] - cumsum[:-2 * w - 1]) / (2 * w + 1)
+        threshold = mean + THRESHOLD_DELTA
+
+        # Local maxima within the minimum gap
+        g = max(1, int(MIN_GAP * fps))
+        local_max = sliding_window_view(np.pad(flux, g, mode="constant"), 2 * g + 1).max(axis=1)
+        peaks = np.flatnonzero((flux >= local_max) & (flux > threshold))
+        if not len(peaks):
+            return np.empty(0)
+        # Keep the first frame of flat-topped peaks
+        peaks = peaks[np.concatenate([[True], np.diff(peaks) > g])]
+
+        # Parabolic interpolation around each peak
+        left = flux[np.maximum(peaks - 1, 0)]
+        right = flux[np.minimum(peaks + 1, len(flux) - 1)]
+        center = flux[peaks]
+        denom = left - 2 * center + right
+        shift = np.where(denom < 0, 0.5 * (left - right) / np.where(denom < 0, denom, 1), 0)
+        # Frame times refer to the frame centers
+        return ((peaks + shift) * self.hop + self.frame / 2) / self.sample_rate
+
+
+def detect_onsets(filename):
+    """
+    Detect onsets in a WAV file.
+
+    Returns:
+        Tuple of (onset times in seconds, duration in seconds)
+    """
+    blocks = read_blocks(filename)
+    sample_rate = next(blocks)
+    detector = OnsetDetector(sample_rate)
+    samples = 0
+    for block in blocks:
+        detector.feed(block)
+        samples += len(block)
+    return detector.onsets(), samples / sample_rate
+
+
+# ====================================================
+# Click Grid
+# ====================================================
+def pattern_steps(pattern, subdivision=SUBDIVISION):
+    """
+    Step positions (in beats) of the hits in one pattern cycle.
+
+    Args:
+        pattern: '1101 0001 1010' (one group per beat, as in play.sh) or
+                 '10010010' (one step per 1/subdivision beat)
+        subdivision: Steps per beat for patterns without spaces
+
+    Returns:
+        Tuple of (hit positions in beats, cycle length in beats)
+
+    Raises:
+        ValueError: The pattern has no hits
+    """
+    groups = pattern.split()
+    if len(groups) == 1:
+        digits = groups[0]
+        step = 1 / subdivision
+        positions = [i * step for i, b in enumerate(digits) if b == "1"]
+        cycle = len(digits) * step
+    else:
+        positions = []
+        for beat, group in enumerate(groups):
+            positions += [beat + i / len(group) for i, b in enumerate(group) if b == "1"]
+        cycle = float(len(groups))
+    if not positions:
+        raise ValueError(f"no hits in pattern {pattern!r}")
+    return np.array(positions), cycle
+
+
+def click_grid(bpm, duration, offset=0.0, pattern=None):
+    """
+    Expected hit times.
+
+    Args:
+        bpm: Tempo
+        duration: Recording length in seconds
+        offset: Time of the first beat in seconds
+        pattern: Optional hit pattern (default: every beat)
+
+    Returns:
+        Tuple of (hit times, beat times)
+    """
+    beat = 60.0 / bpm
+    beat_times = np.arange(offset, duration, beat)
+    if pattern is None:
+        return beat_times, beat_times
+    positions, cycle = pattern_steps(pattern)
+    cycles = np.arange(int(np.ceil((duration - offset) / (cycle * beat))) + 1)
+    times = offset + (cycles[:, None] * cycle + positions[None, :]).ravel() * beat
+    return times[times < duration], beat_times
+
+
+# ====================================================
+# Scoring
+# ====================================================
+def match_onsets(expected, onsets, tolerance):
+    """
+    Pair each expected hit with its nearest onset.
+
+    Args:
+        expected: Sorted expected times
+        onsets: Sorted onset times
+        tolerance: Largest accepted deviation in seconds
+
+    Returns:
+        Tuple of (deviations in ms, NaN where missed; number of extra onsets)
+    """
+    if not len(onsets):
+        return np.full(len(expected), np.nan), 0
+    i = np.clip(np.searchsorted(onsets, expected), 1, len(onsets) - 1)
+    before, after = onsets[i - 1], onsets[i]
+    nearest = np.where(np.abs(expected - before) <= np.abs(after - expected), before, after)
+    deviation = nearest - expected
+    hit = np.abs(deviation) <= tolerance
+    used = np.unique(nearest[hit])
+    return np.where(hit, deviation * 1000, np.nan), len(onsets) - len(used)
+
+
+def swing_ratio(onsets, beat_times):
+    """
+    Median ratio of the first to the second half of each swung beat.
+
+    The off-beat is the onset nearest the middle of each beat (within the
+    middle third of the beat).
+
+    Returns:
+        Ratio (1.0 = straight, 2.0 = triplet swing) or None
+    """
+    if len(beat_times) < 2 or not len(onsets):
+        return None
+    start, end = beat_times[:-1], beat_times[1:]
+    length = end - start
+    i = np.clip(np.searchsorted(onsets, start + length / 2), 1, len(onsets) - 1)
+    before, after = onsets[i - 1], onsets[i]
+    middle = start + length / 2
+    off = np.where(np.abs(before - middle) <= np.abs(after - middle), before, after)
+    valid = (off > start + length / 4) & (off < end - length / 4)
+    if not valid.any():
+        return None
+    first = off[valid] - start[valid]
+    return float(np.median(first / (length[valid] - first)))
+
+
+def beat_in_bar(times, offset, bpm, beats):
+    """Beat of the bar (0 .. beats - 1) each time falls on, from the first beat at offset."""
+    return (np.floor((times - offset) * bpm / 60.0 + 1e-6) % beats).astype(int)
+
+
+def histogram(deviations, bin_ms=HIST_BIN_MS, width=40):
+    """Text histogram lines of deviations in ms."""
+    values = deviations[~np.isnan(deviations)]
+    if not len(values):
+        return []
+    lo = np.floor(values.min() / bin_ms) * bin_ms
+    hi = np.ceil(values.max() / bin_ms) * bin_ms + bin_ms
+    counts, edges = np.histogram(values, np.arange(lo, hi + bin_ms / 2, bin_ms))
+    scale = width / max(counts.max(), 1)
+    return [f"{edge:+6.0f}ms | {'#' * int(round(c * scale)):<{width}} {c}"
+            for edge, c in zip(edges[:-1], counts)]
+
+
+def print_report(expected, deviations, extra, ratio, show_notes=False, bar_beats=None):
+    """
+    Print per-note deviations and summary.
+
+    Args:
+        bar_beats: Optional beat of the bar of each expected hit (see
+                   beat_in_bar), for the mean deviation per beat
+    """
+    matched = deviations[~np.isnan(deviations)]
+    if show_notes:
+        for t, d in zip(expected, deviations):
+            if np.isnan(d):
+                print(f"  {t:8.3f}s  missed")
+            else:
+                label = "early" if d < 0 else "late"
+                print(f"  {t:8.3f}s  {abs(d):5.1f}ms {label}")
+
+    print("========================================")
+    print("TIMING")
+    print("========================================")
+    print(f"Notes: {len(expected)}  matched: {len(matched)}  "
+          f"missed: {len(expected) - len(matched)}  extra: {extra}")
+    if len(matched):
+        print(f"Mean: {matched.mean():+.1f}ms  median: {np.median(matched):+.1f}ms  "
+              f"std: {matched.std():.1f}ms")
+        print(f"Early: {(matched < 0).sum()}  late: {(matched > 0).sum()}")
+        print()
+        for line in histogram(deviations):
+            print(line)
+    if bar_beats is not None and len(matched):
+        print()
+        for b in range(bar_beats.max() + 1):
+            on_beat = deviations[(bar_beats == b) & ~np.isnan(deviations)]
+            if len(on_beat):
+                print(f"Beat {b + 1}: {on_beat.mean():+6.1f}ms  ({len(on_beat)} notes)")
+    if ratio is not None:
+        print()
+        print(f"Swing ratio: {ratio:.2f}")
+
+
+def _option(args, name, cast=str, default=None):
+    if name in args:
+        i = args.index(name)
+        value = cast(args[i + 1])
+        del args[i:i + 2]
+        return value
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    bpm = _option(args, "--bpm", float)
+    beats = _option(args, "--beats", int, 4)
+    pattern = _option(args, "--pattern")
+    offset = _option(args, "--offset", float)
+    show_notes = "--notes" in args
+    args = [a for a in args if a != "--notes"]
+    if not args or bpm is None or beats < 1:
+        print("Usage: python onset_timing.py FILE.wav --bpm BPM [--beats N] "
+              "[--pattern P] [--offset SECONDS] [--notes]")
+        exit(1)
+    if pattern is not None:
+        try:
+            pattern_steps(pattern)
+        except ValueError as e:
+            print(f"Invalid --pattern: {e}")
+            exit(1)
+
+    start = time.perf_counter()
+    onsets, duration = detect_onsets(args[0])
+    elapsed = time.perf_counter() - start
+    if not len(onsets):
+        print("No onsets detected")
+        exit(1)
+
+    # Without an explicit offset the first onset is taken as the first hit
+    if offset is None:
+        first = pattern_steps(pattern)[0][0] if pattern is not None else 0.0
+        offset = onsets[0] - first * 60.0 / bpm
+    expected, beat_times = click_grid(bpm, duration, offset, pattern)
+    step = np.min(np.diff(expected)) if len(expected) > 1 else 60.0 / bpm
+    deviations, extra = match_onsets(expected, onsets, step / 2)
+
+    print_report(expected, deviations, extra, swing_ratio(onsets, beat_times), show_notes,
+                 beat_in_bar(expected, offset, bpm, beats))
+    print()
+    print(f"Analyzed {duration:.1f}s of audio in {elapsed:.2f}s "
+          f"({duration / max(elapsed, 1e-9):.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
-import numpy as np
-import pyaudio
 import time
 
+import audio_device
+from envelope import fade_in_out
+from lazy_import import lazy_import
+
+# 初回使用時に読み込む（コード解析やMIDI変換だけならnumpy不要、PyAudioはaudio_deviceが管理）
+np = lazy_import("numpy")
+
 SAMPLE_RATE = 44100
 NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
 
@@ -159,7 +164,7 @@ def generate_waveform(notes, duration, waveform='sine', sample_rate=SAMPLE_RATE)
     Returns:
         wave: 生成された波形（正規化前）
     """
-    t = np.linspace(0, duration, int(sample_rate * duration), False)
+    t = np.linspace(0, duration, int(sample_rate * duration), False, dtype=np.float32)
     
     # 単一の音の場合
     if isinstance(notes, str):
@@ -194,40 +199,34 @@ def play_audio(wave, stream=None, volume=0.3, envelope=(0.003, 0.003)):
     
     Args:
         wave: 生波形
-        stream: PyAudioストリーム（Noneなら新規作成）
+        stream: 出力先（PyAudioストリームかMixerInput、Noneなら共有デバイス）
         volume: 音量
         envelope: (attack, release) 秒
     
     Returns:
         stream: 使用したストリーム（既存の場合はそのまま）
     """
-    # エンベロープ適用
+    # 音量調整（float32のコピー）の後、エンベロープとクリッピング防止をその場で適用
     attack, release = envelope
-    wave = apply_envelope(wave, attack, release)
-    
-    # 音量調整
-    wave = wave * volume
+    wave = np.multiply(wave, volume, dtype=np.float32)
+    fade_in_out(wave, attack, release, SAMPLE_RATE)
     
     # クリッピング防止
-    max_amp = np.max(np.abs(wave))
+    max_amp = max(wave.max(), -wave.min()) if len(wave) else 0.0
     if max_amp > 1.0:
-        wave = wave / max_amp * 0.9
+        wave *= 0.9 / max_amp
     
     # 再生
     need_cleanup = False
     if stream is None:
-        p = pyaudio.PyAudio()
-        stream = p.open(format=pyaudio.paFloat32,
-                       channels=1,
-                       rate=SAMPLE_RATE,
-                       output=True)
+        # 開きっぱなしの共有ストリームに入力を1つ追加（デバイスの再初期化なし）
+        stream = audio_device.open_input(SAMPLE_RATE)
         need_cleanup = True
     
-    stream.write(wave.astype(np.float32).tobytes())
+    stream.write(wave.tobytes())
     
     if need_cleanup:
         stream.close()
-        p.terminate()
         return None
     return stream
 
@@ -235,22 +234,11 @@ def play_silence(duration, stream):
     """無音を再生"""
     if duration > 0.0001:
         samples = int(SAMPLE_RATE * duration)
-        stream.write(np.zeros(samples).astype(np.float32).tobytes())
+        stream.write(np.zeros(samples, dtype=np.float32).tobytes())
 
 def apply_envelope(wave, attack=0.003, release=0.003):
     """Apply attack and release envelope"""
-    envelope = np.ones_like(wave)
-    samples = len(wave)
-    
-    attack_samples = int(attack * SAMPLE_RATE)
-    if attack_samples > 0:
-        envelope[:attack_samples] = np.linspace(0, 1, attack_samples)
-    
-    release_samples = int(release * SAMPLE_RATE)
-    if release_samples > 0:
-        envelope[-release_samples:] = np.linspace(1, 0, release_samples)
-    
-    return wave * envelope
+    return fade_in_out(np.array(wave, dtype=np.float32), attack, release, SAMPLE_RATE)
 
 
 def play_chord(chords, durations, tempo=120, style='normal', 
@@ -269,11 +257,7 @@ def play_chord(chords, durations, tempo=120, style='normal',
     note_lengths = {'legato': 0.98, 'normal': 0.95, 'staccato': 0.60}
     note_length = note_lengths.get(style, 0.95)
     
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paFloat32,
-                   channels=1,
-                   rate=SAMPLE_RATE,
-                   output=True)
+    stream = audio_device.open_input(SAMPLE_RATE)
     
     for chord, duration in zip(chords, durations):
         chord_duration = duration * beat_duration
@@ -293,7 +277,6 @@ def play_chord(chords, durations, tempo=120, style='normal',
         play_silence(silence_duration, stream)
     
     stream.close()
-    p.terminate()
 
 def play_melody(notes, durations, tempo=120, style='normal', 
                 waveform='sine', volume=0.3, envelope=(0.003, 0.003)):
@@ -311,11 +294,7 @@ def play_melody(notes, durations, tempo=120, style='normal',
     note_lengths = {'legato': 0.98, 'normal': 0.78, 'staccato': 0.40}
     note_length = note_lengths.get(style, 0.78)
     
-    p = pyaudio.PyAudio()
-    stream = p.open(format=pyaudio.paFloat32,
-                   channels=1,
-                   rate=SAMPLE_RATE,
-                   output=True)
+    stream = audio_device.open_input(SAMPLE_RATE)
     
     for note, duration in zip(notes, durations):
         note_duration = duration * beat_duration
@@ -336,7 +315,6 @@ def play_melody(notes, durations, tempo=120, style='normal',
             play_silence(silence_duration, stream)
     
     stream.close()
-    p.terminate()
 
 # 使用例
 if __name__ == "__main__":
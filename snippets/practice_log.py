@@ -0,0 +1,370 @@
+"""
+Practice Log
+------------
+Stores the rhythm self-assessment records described in notes.md:
+
+    {"date": "2024-01-15_14:30", "pattern": "1101 0001 1010",
+     "difficulty": "hard", "type": "single_stroke",
+     "metadata": {"bpm": 120, "bars": 3}}
+
+Records are appended to one binary file per column (date, pattern bits,
+pattern layout, difficulty, type, bpm, bars). Columns are loaded with
+np.fromfile and grown in memory with doubling capacity, so logging one
+session at a time stays linear overall. Queries are answered from indexes (posting lists per
+pattern and per type, binary search over the append-ordered dates)
+followed by vectorized filters, so they stay fast with hundreds of
+thousands of entries.
+
+The log feeds back into practice: suggest() favours patterns that were
+rated hard most often.
+
+Usage:
+    python practice_log.py add "1101 0001 1010" hard single_stroke --bpm 120 --bars 3
+    python practice_log.py query --difficulty hard --type single_stroke --min-bpm 120 --days 30
+    python practice_log.py import records.json
+    python practice_log.py suggest [--type accent] | bash play.sh
+"""
+
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+import numpy as np
+from quiz_store import DATA_DIR
+
+# ====================================================
+# Global Constants
+# ====================================================
+LOG_DIR = os.path.join(DATA_DIR, "practice_log")
+DATE_FORMAT = "%Y-%m-%d_%H:%M"
+
+MAX_STEPS = 56          # Pattern bits and length share one 64-bit index key
+
+DIFFICULTIES = ["easy", "normal", "hard"]
+TYPES = ["single_stroke", "double_stroke", "accent", "flam"]
+
+COLUMNS = {
+    "date": np.int64,       # Epoch seconds
+    "bits": np.uint64,      # Pattern bits, first step in the highest bit
+    "steps": np.uint8,      # Pattern length
+    "group": np.uint8,      # Steps per group when written ('1101 0001' -> 4)
+    "difficulty": np.uint8,
+    "type": np.uint8,
+    "bpm": np.uint16,
+    "bars": np.uint16,
+}
+
+
+def encode_pattern(pattern):
+    """
+    Encode '1101 0001 1010' as (bits, steps, group).
+
+    Raises:
+        ValueError: If the pattern has characters other than 0/1 or is too long
+    """
+    groups = pattern.split()
+    digits = "".join(groups)
+    if not digits or set(digits) - {"0", "1"} or len(digits) > MAX_STEPS:
+        raise ValueError(f"Invalid pattern: {pattern!r}")
+    return int(digits, 2), len(digits), len(groups[0])
+
+
+def decode_pattern(bits, steps, group):
+    """Inverse of encode_pattern."""
+    digits = format(int(bits), f"0{int(steps)}b")
+    group = int(group) or len(digits)
+    return " ".join(digits[i:i + group] for i in range(0, len(digits), group))
+
+
+# ====================================================
+# Column Store
+# ====================================================
+class PracticeLog:
+    """Append-only columnar practice log with query indexes."""
+
+    def __init__(self, path=LOG_DIR):
+        """
+        Open (or create) the log directory.
+
+        Args:
+            path: Directory holding one file per column
+        """
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self.columns = {}
+        for name, dtype in COLUMNS.items():
+            file = self._file(name)
+            self.columns[name] = (np.fromfile(file, dtype=dtype)
+                                  if os.path.exists(file) else np.empty(0, dtype=dtype))
+        # Keep columns consistent if a previous append was interrupted
+        n = min(len(c) for c in self.columns.values())
+        for name in COLUMNS:
+            self.columns[name] = self.columns[name][:n]
+        # Columns are views of the first rows of these buffers
+        self._buffers = dict(self.columns)
+        self._indexes = None
+
+    def _file(self, name):
+        return os.path.join(self.path, f"{name}.bin")
+
+    def __len__(self):
+        return len(self.columns["date"])
+
+    # ---- writing -----------------------------------------------------
+    def append(self, record):
+        """Append one record (notes.md JSON format)."""
+        self.extend([record])
+
+    def extend(self, records):
+        """Append many records with one write per column."""
+        rows = {name: [] for name in COLUMNS}
+        for record in records:
+            bits, steps, group = encode_pattern(record["pattern"])
+            metadata = record.get("metadata", {})
+            date = record.get("date")
+            rows["date"].append(
+                int(datetime.strptime(date, DATE_FORMAT).timestamp()) if date else int(time.time()))
+            rows["bits"].append(bits)
+            rows["steps"].append(steps)
+            rows["group"].append(group)
+            rows["difficulty"].append(DIFFICULTIES.index(record["difficulty"]))
+            rows["type"].append(TYPES.index(record["type"]))
+            rows["bpm"].append(metadata.get("bpm", 0))
+            rows["bars"].append(metadata.get("bars", 0))
+
+        for name, dtype in COLUMNS.items():
+            values = np.array(rows[name], dtype=dtype)
+            with open(self._file(name), "ab") as f:
+                f.write(values.tobytes())
+            self._grow(name, values)
+        self._indexes = None
+
+    def _grow(self, name, values):
+        """Append values to a column, doubling its buffer when full."""
+        n, m = len(self.columns[name]), len(values)
+        buf = self._buffers[name]
+        if n + m > len(buf):
+            buf = np.empty(max(n + m, 2 * len(buf), 1024), dtype=buf.dtype)
+            buf[:n] = self.columns[name]
+            self._buffers[name] = buf
+        buf[n:n + m] = values
+        self.columns[name] = buf[:n + m]
+
+    # ---- indexes -----------------------------------------------------
+    def _build_indexes(self):
+        c = self.columns
+        # Pattern key combines bits and length so '0011' != '011'
+        keys = c["bits"].astype(np.uint64) * np.uint64(128) + c["steps"].astype(np.uint64)
+        self._indexes = {
+            "pattern": _postings(keys),
+            "type": _postings(c["type"]),
+            # Dates are normally appended in order and searched directly
+            "in_order": bool(np.all(np.diff(c["date"]) >= 0)),
+        }
+
+    @property
+    def indexes(self):
+        if self._indexes is None:
+            self._build_indexes()
+        return self._indexes
+
+    # ---- queries -----------------------------------------------------
+    def query(self, pattern=None, difficulty=None, type=None, min_bpm=None,
+              max_bpm=None, since=None, until=None):
+        """
+        Find matching rows.
+
+        Args:
+            pattern: Pattern string ('1101 0001 1010')
+            difficulty: 'easy', 'normal' or 'hard'
+            type: Practice type (see TYPES)
+            min_bpm, max_bpm: Tempo range (inclusive)
+            since, until: Epoch seconds range (inclusive)
+
+        Returns:
+            Sorted array of row numbers
+        """
+        idx = self.indexes
+        c = self.columns
+
+        # Start from a posting list, then narrow it to the date range
+        if pattern is not None:
+            bits, steps, _ = encode_pattern(pattern)
+            candidates = idx["pattern"].get(bits * 128 + steps, np.empty(0, np.int64))
+        elif type is not None:
+            candidates = idx["type"].get(TYPES.index(type), np.empty(0, np.int64))
+        else:
+            candidates = np.arange(len(self))
+        if since is not None or until is not None:
+            if idx["in_order"]:
+                # Rows were logged chronologically: the range is a row slice
+                dates = c["date"]
+                lo = 0 if since is None else np.searchsorted(dates, since, "left")
+                hi = len(self) if until is None else np.searchsorted(dates, until, "right")
+                candidates = candidates[np.searchsorted(candidates, lo):
+                                        np.searchsorted(candidates, hi)]
+            else:
+                dates = c["date"][candidates]
+                in_range = np.ones(len(candidates), dtype=bool)
+                if since is not None:
+                    in_range &= dates >= since
+                if until is not None:
+                    in_range &= dates <= until
+                candidates = candidates[in_range]
+
+        # Remaining conditions as vectorized filters
+        keep = np.ones(len(candidates), dtype=bool)
+        if pattern is not None and type is not None:
+            keep &= c["type"][candidates] == TYPES.index(type)
+        if difficulty is not None:
+            keep &= c["difficulty"][candidates] == DIFFICULTIES.index(difficulty)
+        if min_bpm is not None:
+            keep &= c["bpm"][candidates] >= min_bpm
+        if max_bpm is not None:
+            keep &= c["bpm"][candidates] <= max_bpm
+        return candidates[keep]
+
+    def records(self, rows):
+        """Convert row numbers back to notes.md records."""
+        c = self.columns
+        return [{
+            "date": datetime.fromtimestamp(int(c["date"][i])).strftime(DATE_FORMAT),
+            "pattern": decode_pattern(c["bits"][i], c["steps"][i], c["group"][i]),
+            "difficulty": DIFFICULTIES[c["difficulty"][i]],
+            "type": TYPES[c["type"][i]],
+            "metadata": {"bpm": int(c["bpm"][i]), "bars": int(c["bars"][i])},
+        } for i in rows]
+
+    # ---- feedback ----------------------------------------------------
+    def pattern_weights(self, type=None, since=None):
+        """
+        Share of 'hard' ratings per pattern.
+
+        Returns:
+            Dict of pattern string -> smoothed hard ratio
+        """
+        rows = self.query(type=type, since=since)
+        if not len(rows):
+            return {}
+        c = self.columns
+        keys = c["bits"][rows].astype(np.uint64) * np.uint64(128) + c["steps"][rows]
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        total = np.bincount(inverse)
+        hard = np.bincount(inverse, weights=c["difficulty"][rows] == DIFFICULTIES.index("hard"))
+        ratio = (hard + 1) / (total + 2)
+        return {
+            decode_pattern(c["bits"][rows[f]], c["steps"][rows[f]], c["group"][rows[f]]): float(r)
+            for f, r in zip(first, ratio)
+        }
+
+    def suggest(self, n=1, type=None, days=30, rng=None):
+        """
+        Pick patterns to practice, weighted toward those rated hard.
+
+        Args:
+            n: Number of patterns
+            type: Restrict to one practice type
+            days: Only consider recent practice (None for all)
+            rng: numpy Generator
+
+        Returns:
+            List of pattern strings
+        """
+        since = None if days is None else int(time.time()) - days * 86400
+        weights = self.pattern_weights(type, since)
+        if not weights:
+            return []
+        rng = rng or np.random.default_rng()
+        patterns = list(weights)
+        p = np.array([weights[k] for k in patterns])
+        return [patterns[i] for i in rng.choice(len(patterns), size=n, p=p / p.sum())]
+
+
+def _postings(keys):
+    """Map each distinct key to the sorted row numbers holding it."""
+    if not len(keys):
+        return {}
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    bounds = np.flatnonzero(np.diff(sorted_keys)) + 1
+    starts = np.concatenate([[0], bounds])
+    ends = np.concatenate([bounds, [len(keys)]])
+    return {int(sorted_keys[s]): order[s:e] for s, e in zip(starts, ends)}
+
+
+# ====================================================
+# Command Line
+# ====================================================
+def _option(args, name, cast=str, default=None):
+    if name in args:
+        i = args.index(name)
+        value = cast(args[i + 1])
+        del args[i:i + 2]
+        return value
+    return default
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print(__doc__.split("Usage:")[1])
+        exit(1)
+    command = args.pop(0)
+    log = PracticeLog()
+
+    if command == "add":
+        bpm = _option(args, "--bpm", int, 0)
+        bars = _option(args, "--bars", int, 0)
+        pattern, difficulty, practice_type = args[0], args[1], args[2]
+        log.append({
+            "date": datetime.now().strftime(DATE_FORMAT),
+            "pattern": pattern,
+            "difficulty": difficulty,
+            "type": practice_type,
+            "metadata": {"bpm": bpm, "bars": bars},
+        })
+        print(f"記録: {pattern} ({difficulty}, {practice_type})")
+
+    elif command == "import":
+        with open(args[0], encoding="utf-8") as f:
+            text = f.read()
+        try:
+            # A single record or a list of records (notes.md example) ...
+            data = json.loads(text)
+            records = data if isinstance(data, list) else [data]
+        except json.JSONDecodeError:
+            # ... or one record per line
+            records = [json.loads(line) for line in text.splitlines() if line.strip()]
+        log.extend(records)
+        print(f"{len(log)} records")
+
+    elif command == "query":
+        days = _option(args, "--days", int)
+        start = time.perf_counter()
+        rows = log.query(
+            pattern=_option(args, "--pattern"),
+            difficulty=_option(args, "--difficulty"),
+            type=_option(args, "--type"),
+            min_bpm=_option(args, "--min-bpm", int),
+            max_bpm=_option(args, "--max-bpm", int),
+            since=None if days is None else int(time.time()) - days * 86400,
+        )
+        elapsed = (time.perf_counter() - start) * 1000
+        for record in log.records(rows[-20:]):
+            print(json.dumps(record, ensure_ascii=False))
+        print(f"{len(rows)}/{len(log)} records ({elapsed:.2f}ms)", file=sys.stderr)
+
+    elif command == "suggest":
+        patterns = log.suggest(_option(args, "--n", int, 1), _option(args, "--type"))
+        for pattern in patterns:
+            print(pattern)
+
+    else:
+        print(f"Unknown command: {command}")
+        exit(1)
+
+
+if __name__ == "__main__":
+    main()
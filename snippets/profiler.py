@@ -0,0 +1,321 @@
+"""
+Profiler
+--------
+Opt-in instrumentation for the audio pipeline.
+
+Stages are timed with a context manager and stored in a fixed-size ring
+(no allocation per event), together with the buffer size each stage
+handled. Allocations and stream underruns are counted per stage:
+
+    import profiler
+    profiler.enable()
+    with profiler.stage("song.render", size=len(wave)):
+        ...
+        profiler.alloc(wave.nbytes)
+    print(profiler.report())
+    profiler.write_trace("trace.json")      # chrome://tracing, ui.perfetto.dev
+
+While disabled, stage() returns a shared no-op context manager, so
+instrumented code pays one function call per stage.
+
+Setting METRONOME_PROFILE=1 enables profiling at import and prints the
+report on exit; METRONOME_PROFILE=trace.json also writes the trace.
+
+Usage:
+    python snippets/profiler.py [--trace trace.json]
+"""
+
+import array
+import atexit
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+# ====================================================
+# Global Constants
+# ====================================================
+CAPACITY = 65536        # Events kept in the ring
+UNDERRUN_SLACK = 0.005  # Seconds a stream may run dry before it counts
+
+_NULL = contextlib.nullcontext()
+
+enabled = False
+_names = []             # Stage id -> name
+_ids = {}               # Stage name -> id
+_ring = None
+_count = 0              # Events recorded since reset (ring index = _count % capacity)
+_allocs = {}            # Stage id -> [count, bytes]
+_counters = {}          # Counter name -> value
+_streams = {}           # Stream key -> time its buffered audio runs out
+_local = threading.local()
+
+
+class _Ring:
+    """Preallocated event columns."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.stage = array.array('i', bytes(4 * capacity))
+        self.thread = array.array('q', bytes(8 * capacity))
+        self.start = array.array('q', bytes(8 * capacity))
+        self.duration = array.array('q', bytes(8 * capacity))
+        self.size = array.array('q', bytes(8 * capacity))
+
+    def events(self):
+        """Recorded events, oldest first, as (stage, thread, start_ns, duration_ns, size)."""
+        n = min(_count, self.capacity)
+        first = _count - n
+        for k in range(first, _count):
+            i = k % self.capacity
+            yield self.stage[i], self.thread[i], self.start[i], self.duration[i], self.size[i]
+
+
+def _stage_id(name):
+    sid = _ids.get(name)
+    if sid is None:
+        sid = _ids[name] = len(_names)
+        _names.append(name)
+    return sid
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class _Stage:
+    """Timing context for one stage."""
+
+    __slots__ = ("sid", "size", "start")
+
+    def __init__(self, sid, size):
+        self.sid = sid
+        self.size = size
+
+    def __enter__(self):
+        _stack().append(self.sid)
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        global _count
+        end = time.perf_counter_ns()
+        _stack().pop()
+        ring = _ring
+        i = _count % ring.capacity
+        ring.stage[i] = self.sid
+        ring.thread[i] = threading.get_ident()
+        ring.start[i] = self.start
+        ring.duration[i] = end - self.start
+        ring.size[i] = self.size
+        _count += 1
+
+
+# ====================================================
+# Recording
+# ====================================================
+def enable(capacity=CAPACITY):
+    """Start recording into an empty ring."""
+    global enabled
+    reset(capacity)
+    enabled = True
+
+
+def disable():
+    """Stop recording (recorded events are kept)."""
+    global enabled
+    enabled = False
+
+
+def reset(capacity=None):
+    """Drop all recorded events and counters."""
+    global _ring, _count
+    _ring = _Ring(capacity or (_ring.capacity if _ring else CAPACITY))
+    _count = 0
+    _allocs.clear()
+    _counters.clear()
+    _streams.clear()
+
+
+def stage(name, size=0):
+    """
+    Context manager timing one stage.
+
+    Args:
+        name: Stage name (e.g. 'melody.generate')
+        size: Buffer size handled by the stage, in samples
+    """
+    if not enabled:
+        return _NULL
+    return _Stage(_stage_id(name), size)
+
+
+def alloc(nbytes):
+    """Count an array allocation against the innermost active stage."""
+    if not enabled:
+        return
+    stack = _stack()
+    sid = stack[-1] if stack else _stage_id("(none)")
+    entry = _allocs.setdefault(sid, [0, 0])
+    entry[0] += 1
+    entry[1] += nbytes
+
+
+def count(name, n=1):
+    """Increment a named counter."""
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def stream_write(key, frames, sample_rate):
+    """
+    Track the fill level of an output stream around a blocking write.
+
+    Call after each write. If the previously written audio ran out more
+    than UNDERRUN_SLACK before this write returned, the device played
+    silence in between and the write counts as an underrun.
+
+    Args:
+        key: Any hashable stream identifier
+        frames: Frames just written
+        sample_rate: Stream sample rate
+    """
+    if not enabled:
+        return
+    now = time.perf_counter()
+    end = _streams.get(key)
+    if end is not None and now > end + UNDERRUN_SLACK:
+        count("underruns")
+        end = None
+    _streams[key] = (end if end is not None else now) + frames / sample_rate
+
+
+# ====================================================
+# Output
+# ====================================================
+def stats():
+    """
+    Aggregate the ring per stage.
+
+    Returns:
+        Dict of stage name -> dict with calls, total_ms, mean_ms, p95_ms,
+        max_ms, mean_size, allocs and alloc_bytes
+    """
+    durations = {}
+    sizes = {}
+    if _ring is not None:
+        for sid, _, _, duration, size in _ring.events():
+            durations.setdefault(sid, []).append(duration)
+            sizes[sid] = sizes.get(sid, 0) + size
+    result = {}
+    for sid in sorted(set(durations) | set(_allocs)):
+        times = sorted(durations.get(sid, [0]))
+        calls = len(durations.get(sid, []))
+        allocs, alloc_bytes = _allocs.get(sid, (0, 0))
+        result[_names[sid]] = {
+            "calls": calls,
+            "total_ms": sum(times) / 1e6,
+            "mean_ms": sum(times) / max(calls, 1) / 1e6,
+            "p95_ms": times[min(len(times) - 1, int(len(times) * 0.95))] / 1e6,
+            "max_ms": times[-1] / 1e6,
+            "mean_size": sizes.get(sid, 0) / max(calls, 1),
+            "allocs": allocs,
+            "alloc_bytes": alloc_bytes,
+        }
+    return result
+
+
+def counters():
+    """Named counters (underruns, ...)."""
+    return dict(_counters)
+
+
+def report():
+    """Per-stage table, slowest total first, followed by the counters."""
+    lines = [f"{'stage':<22} {'calls':>6} {'total':>10} {'mean':>9} {'p95':>9} "
+             f"{'max':>9} {'size':>9} {'allocs':>7} {'alloc':>9}"]
+    rows = sorted(stats().items(), key=lambda kv: -kv[1]["total_ms"])
+    for name, s in rows:
+        lines.append(
+            f"{name:<22} {s['calls']:6d} {s['total_ms']:8.2f}ms {s['mean_ms']:7.3f}ms "
+            f"{s['p95_ms']:7.3f}ms {s['max_ms']:7.3f}ms {s['mean_size']:9.0f} "
+            f"{s['allocs']:7d} {s['alloc_bytes'] / 1024:7.0f}KB")
+    if _count > (_ring.capacity if _ring else 0):
+        lines.append(f"(ring wrapped: oldest {_count - _ring.capacity} events dropped)")
+    for name, value in sorted(_counters.items()):
+        lines.append(f"{name}: {value}")
+    return "\n".join(lines)
+
+
+def chrome_trace():
+    """Recorded events in Chrome trace-event format."""
+    events = []
+    pid = os.getpid()
+    if _ring is not None:
+        for sid, thread, start, duration, size in _ring.events():
+            events.append({
+                "name": _names[sid], "cat": _names[sid].split(".")[0], "ph": "X",
+                "ts": start / 1000, "dur": duration / 1000,
+                "pid": pid, "tid": thread, "args": {"size": size},
+            })
+    for name, value in _counters.items():
+        events.append({"name": name, "ph": "C", "ts": time.perf_counter_ns() / 1000,
+                       "pid": pid, "args": {name: value}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_trace(filename):
+    """Write chrome_trace() as JSON."""
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(), f)
+
+
+def _report_at_exit(trace):
+    print(report(), file=sys.stderr)
+    if trace:
+        write_trace(trace)
+        print(f"Trace written to {trace}", file=sys.stderr)
+
+
+_env = os.environ.get("METRONOME_PROFILE", "")
+if _env and _env != "0":
+    enable()
+    atexit.register(_report_at_exit, _env if _env.endswith(".json") else None)
+
+
+# ====================================================
+# Main
+# ====================================================
+def main():
+    import importlib
+
+    args = sys.argv[1:]
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    # The synthesizer records into the imported module, not __main__
+    prof = wave_sound.profiler
+
+    melody = ['E5', 'D5', 'C5', 'D5', 'E5', 'E5', 'E5', 'rest'] * 8
+    rhythm = [0.75, 0.25, 0.5, 0.5, 0.5, 0.5, 1, 0.5] * 8
+    chords = ['C', 'Am', 'F', 'G7'] * 4
+
+    prof.enable()
+    song = wave_sound.Song(tempo=120)\
+        .add_melody(melody, rhythm)\
+        .add_chords(chords, [4] * len(chords))
+    for _ in range(3):
+        song.render(cache=False)
+    print(prof.report())
+
+    if "--trace" in args:
+        filename = args[args.index("--trace") + 1]
+        prof.write_trace(filename)
+        print(f"Trace written to {filename}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+"""
+Quiz Result Store
+-----------------
+Keeps every fretboard quiz answer in an append-only SQLite log together with
+aggregates that are updated in the same transaction as each insert:
+
+    stats         attempts / correct / latency sum per position, string,
+                  fret and note
+    latency_hist  log-spaced response-time histogram per aggregate key
+
+Heat maps and percentiles are read from the aggregate tables, so their cost
+does not grow with the length of the practice history.
+
+Usage:
+    python quiz_store.py [tuning]      # accuracy heat map and latencies
+"""
+
+import math
+import os
+import sqlite3
+import sys
+import time
+
+# ====================================================
+# Global Constants
+# ====================================================
+DATA_DIR = os.path.join(
+    os.environ.get("XDG_DATA_HOME", os.path.expanduser("~/.local/share")), "metronome")
+DEFAULT_PATH = os.path.join(DATA_DIR, "quiz.db")
+
+BUCKETS_PER_OCTAVE = 8      # Latency histogram resolution (~9% per bucket)
+KINDS = ("position", "string", "fret", "note")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS answers (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    tuning TEXT NOT NULL,
+    string INTEGER NOT NULL,
+    fret INTEGER NOT NULL,
+    note TEXT NOT NULL,
+    correct INTEGER NOT NULL,
+    response_ms REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    tuning TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    attempts INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    latency_sum REAL NOT NULL,
+    PRIMARY KEY (tuning, kind, key)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS latency_hist (
+    tuning TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (tuning, kind, key, bucket)
+) WITHOUT ROWID;
+"""
+
+UPSERT_STATS = """
+INSERT INTO stats VALUES (?, ?, ?, 1, ?, ?)
+ON CONFLICT (tuning, kind, key) DO UPDATE SET
+    attempts = attempts + 1,
+    correct = correct + excluded.correct,
+    latency_sum = latency_sum + excluded.latency_sum
+"""
+
+UPSERT_HIST = """
+INSERT INTO latency_hist VALUES (?, ?, ?, ?, 1)
+ON CONFLICT (tuning, kind, key, bucket) DO UPDATE SET count = count + 1
+"""
+
+
+def latency_bucket(ms):
+    """Histogram bucket for a response time in milliseconds."""
+    return round(math.log2(max(ms, 1.0)) * BUCKETS_PER_OCTAVE)
+
+
+def bucket_latency(bucket):
+    """Representative response time of a histogram bucket."""
+    return 2.0 ** (bucket / BUCKETS_PER_OCTAVE)
+
+
+def aggregate_keys(string, fret, note):
+    """(kind, key) pairs an answer is counted under."""
+    return (
+        ("position", f"{string}:{fret}"),
+        ("string", str(string)),
+        ("fret", str(fret)),
+        ("note", note),
+    )
+
+
+# ====================================================
+# Store
+# ====================================================
+class QuizStore:
+    """Append-only answer log with incrementally maintained aggregates."""
+
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Open (or create) the store.
+
+        Args:
+            path: SQLite database path (':memory:' for a throwaway store)
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.db = sqlite3.connect(path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Close the database."""
+        self.db.close()
+
+    def record(self, tuning, string, fret, note, correct, response_ms, ts=None):
+        """
+        Append one answer and update its aggregates.
+
+        Args:
+            tuning: Tuning name
+            string: String number (1 = highest)
+            fret: Fret number
+            note: Correct note name at the position
+            correct: Whether the answer was correct
+            response_ms: Time from question to answer in milliseconds
+            ts: Answer time (default: now)
+        """
+        ts = time.time() if ts is None else ts
+        correct = int(bool(correct))
+        bucket = latency_bucket(response_ms)
+        keys = aggregate_keys(string, fret, note)
+        with self.db:
+            self.db.execute(
+                "INSERT INTO answers (ts, tuning, string, fret, note, correct, response_ms) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ts, tuning, string, fret, note, correct, response_ms))
+            self.db.executemany(
+                UPSERT_STATS,
+                [(tuning, kind, key, correct, response_ms) for kind, key in keys])
+            self.db.executemany(
+                UPSERT_HIST,
+                [(tuning, kind, key, bucket) for kind, key in keys])
+
+    def stats(self, tuning, kind):
+        """
+        Aggregates for one kind.
+
+        Args:
+            tuning: Tuning name
+            kind: 'position', 'string', 'fret' or 'note'
+
+        Returns:
+            Dict of key -> (attempts, correct, mean_latency_ms)
+        """
+        rows = self.db.execute(
+            "SELECT key, attempts, correct, latency_sum FROM stats "
+            "WHERE tuning = ? AND kind = ?", (tuning, kind))
+        return {key: (n, c, total / n) for key, n, c, total in rows}
+
+    def heatmap(self, tuning):
+        """
+        Per-position results for a tuning.
+
+        Returns:
+            Dict of (string, fret) -> (attempts, correct)
+        """
+        result = {}
+        for key, (n, c, _) in self.stats(tuning, "position").items():
+            string, fret = key.split(":")
+            result[(int(string), int(fret))] = (n, c)
+        return result
+
+    def percentiles(self, tuning, kind, key, ps=(50, 90)):
+        """
+        Response-time percentiles from the latency histogram.
+
+        Args:
+            tuning: Tuning name
+            kind: Aggregate kind
+            key: Aggregate key (e.g., '4' for string 4, '2:5' for a position)
+            ps: Percentiles to compute
+
+        Returns:
+            List of latencies in milliseconds (None if no data)
+        """
+        rows = self.db.execute(
+            "SELECT bucket, count FROM latency_hist "
+            "WHERE tuning = ? AND kind = ? AND key = ? ORDER BY bucket",
+            (tuning, kind, str(key))).fetchall()
+        total = sum(count for _, count in rows)
+        if not total:
+            return [None for _ in ps]
+
+        result = []
+        for p in ps:
+            target = p / 100 * total
+            seen = 0
+            for bucket, count in rows:
+                seen += count
+                if seen >= target:
+                    break
+            result.append(bucket_latency(bucket))
+        return result
+
+    def rebuild(self):
+        """Recompute all aggregates from the answer log."""
+        with self.db:
+            self.db.execute("DELETE FROM stats")
+            self.db.execute("DELETE FROM latency_hist")
+            for kind, key_expr in (
+                    ("position", "string || ':' || fret"),
+                    ("string", "CAST(string AS TEXT)"),
+                    ("fret", "CAST(fret AS TEXT)"),
+                    ("note", "note")):
+                self.db.execute(
+                    f"INSERT INTO stats SELECT tuning, '{kind}', {key_expr}, "
+                    f"COUNT(*), SUM(correct), SUM(response_ms) FROM answers "
+                    f"GROUP BY tuning, {key_expr}")
+                rows = self.db.execute(
+                    f"SELECT tuning, {key_expr}, response_ms FROM answers").fetchall()
+                self.db.executemany(
+                    UPSERT_HIST,
+                    [(tuning, kind, key, latency_bucket(ms)) for tuning, key, ms in rows])
+
+
+# ====================================================
+# Report
+# ====================================================
+def print_report(store, tuning, strings=4, frets=12):
+    """Print accuracy heat map and per-string latency percentiles."""
+    heatmap = store.heatmap(tuning)
+    if not heatmap:
+        print(f"No results for {tuning}")
+        return
+    strings = max(strings, max(s for s, _ in heatmap))
+
+    print("========================================")
+    print(f"ACCURACY BY POSITION ({tuning})")
+    print("========================================")
+    print("String | " + "".join(f"{f:<4}" for f in range(frets + 1)))
+    print("-------|" + "-" * (4 * (frets + 1)))
+    for s in range(1, strings + 1):
+        cells = []
+        for f in range(frets + 1):
+            n, c = heatmap.get((s, f), (0, 0))
+            cells.append(f"{c * 100 // n:<4}" if n else ".   ")
+        print(f"  {s}    | " + "".join(cells))
+
+    print()
+    print("String | answers  accuracy  p50      p90")
+    for key, (n, c, _) in sorted(store.stats(tuning, "string").items()):
+        p50, p90 = store.percentiles(tuning, "string", key)
+        print(f"  {key}    | {n:<8} {c * 100 / n:5.1f}%   {p50:6.0f}ms {p90:6.0f}ms")
+
+
+def main():
+    tuning = " ".join(sys.argv[1:]) or "bass"
+    if not os.path.exists(DEFAULT_PATH):
+        print(f"No results yet ({DEFAULT_PATH})")
+        exit(1)
+    with QuizStore() as store:
+        print_report(store, tuning)
+
+
+if __name__ == "__main__":
+    main()
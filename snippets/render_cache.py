@@ -0,0 +1,265 @@
+"""
+Render Cache
+------------
+Content-addressed on-disk cache of rendered songs.
+
+A song's key is the SHA-256 of what its rendering depends on: every
+track's compiled note schedule (Track.events: sample positions, notes,
+gains), waveform and envelope, the sample rate and length, and the
+source of the synthesis modules. A rendered song is stored as a float32
+.npy file named after its key; a later render of the same song maps the
+file read-only instead of synthesizing it again:
+
+    cache = render_cache.get_cache()
+    key = render_cache.song_key(song, 44100, length)
+    wave = cache.get(key)                   # read-only memmap, or None
+    if wave is None:
+        wave = cache.put(key, synthesize())
+
+Song.render() and Song.save() do this by default. Files are written to a
+temporary name and renamed, so concurrent processes never read a partial
+entry. When the directory grows past MAX_BYTES, the least recently used
+entries (by modification time, refreshed on every hit) are deleted.
+
+METRONOME_RENDER_CACHE=0 disables the cache; any other value is used as
+the cache directory.
+
+Usage:
+    python snippets/render_cache.py [--demo | --clear]
+"""
+
+import functools
+import hashlib
+import json
+import os
+import sys
+import time
+
+import profiler
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# ====================================================
+# Global Constants
+# ====================================================
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "metronome", "renders")
+MAX_BYTES = 512 * 1024 * 1024
+FORMAT_VERSION = 1
+SOURCES = ("multi-track_wave_sound.py", "envelope.py")     # Code a render depends on
+
+
+@functools.lru_cache(maxsize=1)
+def code_fingerprint():
+    """Hash of the synthesis sources, so code changes invalidate old entries."""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCES:
+        with open(os.path.join(here, name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def song_key(song, sample_rate, length):
+    """
+    Stable key of a song's rendering.
+
+    Args:
+        song: Song (see multi-track_wave_sound)
+        sample_rate: Audio sample rate
+        length: Rendered length in samples
+
+    Returns:
+        Hex digest, or None if a track has no note schedule (render()-only
+        tracks cannot be described, so they are not cached)
+    """
+    tracks = []
+    for track in song.tracks:
+        if not hasattr(track, "events"):
+            return None
+        try:
+            events = track.events(sample_rate)
+        except NotImplementedError:
+            return None
+        env = getattr(track, "envelope", None)
+        tracks.append({
+            "type": type(track).__name__,
+            "waveform": getattr(track, "waveform", None),
+            "envelope": None if env is None else
+            [env.attack, env.decay, env.sustain, env.release, env.curve],
+            "events": events,
+        })
+    description = {
+        "version": FORMAT_VERSION,
+        "code": code_fingerprint(),
+        "sample_rate": sample_rate,
+        "length": length,
+        "tracks": tracks,
+    }
+    text = json.dumps(description, sort_keys=True, default=repr)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+# ====================================================
+# Cache
+# ====================================================
+class RenderCache:
+    """Directory of rendered waves with size-based LRU eviction."""
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=MAX_BYTES):
+        """
+        Args:
+            directory: Cache directory (created on first write)
+            max_bytes: Total size kept after each write
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key):
+        return os.path.join(self.directory, f"{key}.npy")
+
+    def get(self, key):
+        """
+        Cached wave for a key.
+
+        Returns:
+            Read-only memory-mapped float32 array, or None on a miss
+        """
+        path = self.path(key)
+        with profiler.stage("cache.get"):
+            try:
+                wave = np.load(path, mmap_mode='r')
+                os.utime(path)                  # Most recently used
+            except FileNotFoundError:
+                wave = None
+            except (OSError, ValueError):
+                self._remove(path)              # Truncated or corrupt entry
+                wave = None
+        if wave is None:
+            self.misses += 1
+            profiler.count("cache.misses")
+        else:
+            self.hits += 1
+            profiler.count("cache.hits")
+        return wave
+
+    def put(self, key, wave):
+        """
+        Store a wave, then evict the oldest entries beyond max_bytes.
+
+        Returns:
+            wave
+        """
+        with profiler.stage("cache.put", len(wave)):
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                tmp = f"{self.path(key)}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, np.asarray(wave, dtype=np.float32))
+                os.replace(tmp, self.path(key))
+            except OSError as e:
+                print(f"Render cache: {e}", file=sys.stderr)
+                return wave
+            self.evict(keep=key)
+        return wave
+
+    def entries(self):
+        """(mtime, size, path) of every entry, oldest first."""
+        try:
+            names = os.listdir(self.directory)
+        except FileNotFoundError:
+            return []
+        entries = []
+        for name in names:
+            if name.endswith(".npy"):
+                path = os.path.join(self.directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue                    # Evicted by another process
+                entries.append((st.st_mtime, st.st_size, path))
+        return sorted(entries)
+
+    def evict(self, keep=None):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        keep = keep and self.path(keep)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                self._remove(path)
+                total -= size
+
+    def clear(self):
+        for _, _, path in self.entries():
+            self._remove(path)
+
+    def stats(self):
+        """Entries, total bytes, hits and misses."""
+        entries = self.entries()
+        return {"entries": len(entries), "bytes": sum(size for _, size, _ in entries),
+                "hits": self.hits, "misses": self.misses}
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+_cache = None
+
+
+def get_cache():
+    """The process-wide RenderCache, or None if disabled (see module docstring)."""
+    global _cache
+    setting = os.environ.get("METRONOME_RENDER_CACHE", "")
+    if setting == "0":
+        return None
+    if _cache is None:
+        _cache = RenderCache(setting or CACHE_DIR)
+    return _cache
+
+
+# ====================================================
+# Main
+# ====================================================
+def main():
+    import importlib
+
+    args = sys.argv[1:]
+    cache = get_cache()
+    if cache is None:
+        print("Render cache disabled (METRONOME_RENDER_CACHE=0)")
+        return
+    if "--clear" in args:
+        cache.clear()
+    elif "--demo" in args:
+        wave_sound = importlib.import_module("multi-track_wave_sound")
+        # Song.render uses the imported module's cache, not __main__'s
+        cache = wave_sound.render_cache.get_cache()
+        np.zeros(1)     # Import numpy before timing
+        song = wave_sound.Song(tempo=120)\
+            .add_melody(['E5', 'D5', 'C5', 'D5', 'E5', 'E5', 'E5', 'rest'] * 16,
+                        [0.75, 0.25, 0.5, 0.5, 0.5, 0.5, 1, 0.5] * 16)\
+            .add_chords(['C', 'Am', 'F', 'G7'] * 8, [4] * 32)
+        for _ in range(2):
+            hits = cache.hits
+            start = time.perf_counter()
+            song.render()
+            label = "hit" if cache.hits > hits else "miss"
+            print(f"render ({label}): {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    stats = cache.stats()
+    print(f"{cache.directory}: {stats['entries']} entries, "
+          f"{stats['bytes'] / 2**20:.1f}MB of {cache.max_bytes / 2**20:.0f}MB")
+
+
+if __name__ == "__main__":
+    main()
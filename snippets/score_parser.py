@@ -0,0 +1,544 @@
+"""
+Score Parser
+------------
+Compiles the text score formats sketched in vim_piano_roll.md and
+vim_edit_melody.md into note events:
+
+    ASCII piano roll    pitch rows of 'o===' bars between '|' bar lines,
+                        optional 'beat' ruler and 'velocity' row
+    Markdown table      '| bar | beat | E4 -- -- D4 |' rows
+    Text                'melody:' / 'duration:' line pairs
+
+Files are read line by line in a single pass. Piano-roll rows are split at
+the bar lines and each bar segment is parsed with one regex scan; segment
+results are cached by their text. --watch re-parses incrementally: the
+file is split at Markdown headings (the parser starts over at each one),
+sections are cached by their text and the front matter, and only edited
+sections are parsed again before the parts are put back together. It
+reports the bars whose notes differ.
+
+Each notation section is a separate part: a Markdown heading or a switch
+to another format starts a new one, so a file that writes the same melody
+as a table and as text yields two parts instead of one score with every
+note twice. The first part is used unless --part selects another.
+
+Events are kept in parallel arrays (start, duration, midi, velocity) and
+convert to MelodyTrack note/duration lists, a Song, or a MIDI file.
+
+Usage:
+    python score_parser.py FILE [--part N] [--midi OUT.mid] [--play] [--watch]
+"""
+
+import functools
+import importlib
+import os
+import re
+import sys
+import time
+from array import array
+
+from fretboard import NOTE_NAMES, note_to_midi
+
+# ====================================================
+# Global Constants
+# ====================================================
+DEFAULT_META = {"title": "", "bpm": 120, "bars": 0, "beat": 4, "key": "C"}
+DEFAULT_COLS_PER_BEAT = 4
+DEFAULT_VELOCITY = 8        # Velocity digits are 0-9 in the piano roll
+
+PITCH_ROW = re.compile(r"^\s*([A-Ga-g][#b]?-?\d)\s*\|")
+TABLE_ROW = re.compile(r"^\|\s*(\d+)\s*\|\s*(\d+)\s*\|([^|]*)\|")
+NOTE_BAR = re.compile(r"o=*|=+")
+DIGIT = re.compile(r"\d")
+
+
+# ====================================================
+# Note Events
+# ====================================================
+class NoteEvents:
+    """Note events stored as parallel arrays (times in beats)."""
+
+    def __init__(self):
+        self.start = array('d')
+        self.duration = array('d')
+        self.midi = array('B')
+        self.velocity = array('B')
+
+    def __len__(self):
+        return len(self.start)
+
+    def append(self, start, duration, midi, velocity=DEFAULT_VELOCITY):
+        """Add one note."""
+        self.start.append(start)
+        self.duration.append(duration)
+        self.midi.append(midi)
+        self.velocity.append(velocity)
+
+    def sorted(self):
+        """Return a copy ordered by start time, then pitch."""
+        order = sorted(range(len(self)), key=lambda i: (self.start[i], self.midi[i]))
+        result = NoteEvents()
+        for i in order:
+            result.append(self.start[i], self.duration[i], self.midi[i], self.velocity[i])
+        return result
+
+    def voices(self):
+        """
+        Split into monophonic voices.
+
+        Returns:
+            List of lists of event indices; overlapping notes go to
+            separate voices
+        """
+        voices, ends = [], []
+        for i in sorted(range(len(self)), key=lambda i: (self.start[i], -self.midi[i])):
+            for v, end in enumerate(ends):
+                if end <= self.start[i] + 1e-9:
+                    break
+            else:
+                v = len(voices)
+                voices.append([])
+                ends.append(0.0)
+            voices[v].append(i)
+            ends[v] = self.start[i] + self.duration[i]
+        return voices
+
+
+def midi_to_note(midi):
+    """MIDI number to note name (60 -> 'C4')."""
+    return f"{NOTE_NAMES[midi % 12]}{midi // 12 - 1}"
+
+
+# ====================================================
+# Score
+# ====================================================
+class Score:
+    """Parsed score: front-matter metadata plus note events."""
+
+    def __init__(self, meta=None):
+        self.meta = dict(DEFAULT_META, **(meta or {}))
+        self.events = NoteEvents()
+
+    @property
+    def bpm(self):
+        return self.meta["bpm"]
+
+    def bar_of(self, beat):
+        """Bar number (1-based) containing a beat position."""
+        return int(beat // self.meta["beat"]) + 1
+
+    def to_melodies(self):
+        """
+        Convert to MelodyTrack arguments.
+
+        Returns:
+            List of (notes, durations) per voice, with 'rest' filling gaps
+        """
+        melodies = []
+        for voice in self.events.voices():
+            notes, durations, time_pos = [], [], 0.0
+            for i in voice:
+                start = self.events.start[i]
+                if start > time_pos + 1e-9:
+                    notes.append('rest')
+                    durations.append(start - time_pos)
+                notes.append(midi_to_note(self.events.midi[i]))
+                durations.append(self.events.duration[i])
+                time_pos = start + self.events.duration[i]
+            melodies.append((notes, durations))
+        return melodies
+
+    def to_song(self, waveform='sine', style='legato'):
+        """Build a Song with one melody track per voice."""
+        wave_sound = importlib.import_module("multi-track_wave_sound")
+        song = wave_sound.Song(tempo=self.bpm)
+        for notes, durations in self.to_melodies():
+            song.add_melody(notes, durations, style=style, waveform=waveform)
+        return song
+
+    def save_midi(self, filename, ticks_per_beat=480):
+        """Save events as a single-track MIDI file."""
+        from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo
+
+        mid = MidiFile(ticks_per_beat=ticks_per_beat)
+        track = MidiTrack()
+        mid.tracks.append(track)
+        track.append(MetaMessage('set_tempo', tempo=bpm2tempo(self.bpm), time=0))
+
+        # (tick, order, message type, note, velocity); note-offs sort first
+        messages = []
+        for i in range(len(self.events)):
+            on = round(self.events.start[i] * ticks_per_beat)
+            off = round((self.events.start[i] + self.events.duration[i]) * ticks_per_beat)
+            velocity = min(127, self.events.velocity[i] * 127 // 9)
+            messages.append((on, 1, 'note_on', self.events.midi[i], velocity))
+            messages.append((off, 0, 'note_off', self.events.midi[i], 0))
+
+        now = 0
+        for tick, _, kind, note, velocity in sorted(messages):
+            track.append(Message(kind, note=note, velocity=velocity, time=tick - now))
+            now = tick
+        mid.save(filename)
+
+
+# ====================================================
+# Parsing
+# ====================================================
+@functools.lru_cache(maxsize=65536)
+def parse_segment(text):
+    """
+    Scan one bar segment of a piano-roll row.
+
+    Args:
+        text: Row text between two bar lines
+
+    Returns:
+        Tuple of (column, length, continues_previous) per note bar
+    """
+    return tuple(
+        (m.start(), m.end() - m.start(), m.group()[0] == '=')
+        for m in NOTE_BAR.finditer(text)
+    )
+
+
+@functools.lru_cache(maxsize=65536)
+def parse_table_cell(text):
+    """
+    Split the notes cell of a table row ('E4 -- -- D4').
+
+    Returns:
+        Tuple of tokens: note names, '--' (hold) or '.'/'..' (rest)
+    """
+    return tuple(text.split())
+
+
+class ScoreParser:
+    """Single-pass line parser; feed lines, then call finish()."""
+
+    def __init__(self, meta=None):
+        """
+        Initialize parser.
+
+        Args:
+            meta: Metadata of an already-read front matter (see
+                  parse_section); None to read it from the lines
+        """
+        self.score = Score(meta)    # Part being parsed
+        self.parts = []             # Finished parts
+        # None: not seen, True: inside, False: done
+        self.front_matter = None if meta is None else False
+        self._start_part()
+
+    def _start_part(self):
+        self.notation = None        # 'roll', 'table' or 'text' once a note row is seen
+        self.cols_per_beat = None
+        self.melody = []            # Pending 'melody:' tokens
+        # Piano-roll notes by absolute start column, for the velocity row
+        self.by_column = {}
+        # Table format: note currently held over from previous cells
+        self.held = None
+
+    def _end_part(self):
+        """Close the current part if it has notes and start a new one."""
+        self._release_held()
+        if len(self.score.events):
+            self.score.events = self.score.events.sorted()
+            self.parts.append(self.score)
+            self.score = Score(self.score.meta)
+        self._start_part()
+
+    def _enter(self, notation):
+        """Start a new part when the notation format changes."""
+        if self.notation not in (None, notation):
+            self._end_part()
+        self.notation = notation
+
+    def feed(self, line):
+        """Parse one line."""
+        line = line.rstrip("\n")
+        stripped = line.strip()
+
+        # Front matter
+        if self.front_matter is None and stripped == "---":
+            self.front_matter = True
+            return
+        if self.front_matter:
+            if stripped == "---":
+                self.front_matter = False
+            elif ":" in stripped:
+                key, value = stripped.split(":", 1)
+                value = value.strip()
+                self.score.meta[key.strip()] = int(value) if value.isdigit() else value
+            return
+        self.front_matter = False
+
+        if stripped.startswith("#"):
+            self._end_part()                # Markdown heading: a new section
+        elif stripped.startswith("beat") and "|" in stripped:
+            self._enter('roll')
+            self._beat_ruler(line)
+        elif stripped.startswith("velocity"):
+            self._velocity_row(line)
+        elif m := PITCH_ROW.match(line):
+            self._enter('roll')
+            self._pitch_row(m.group(1), line, m.end())
+        elif m := TABLE_ROW.match(stripped):
+            self._enter('table')
+            self._table_row(int(m.group(1)), int(m.group(2)), m.group(3))
+        elif stripped.startswith("melody:"):
+            self._enter('text')
+            self.melody = stripped[7:].replace("|", " ").split()
+        elif stripped.startswith("duration:"):
+            self._text_durations(stripped[9:].replace("|", " ").split())
+
+    def finish(self):
+        """
+        Flush pending state.
+
+        Returns:
+            List of Scores, one per notation section (a single empty
+            Score if there are no notes)
+        """
+        self._end_part()
+        return self.parts or [self.score]
+
+    # ---- piano roll -------------------------------------------------
+    def _beat_ruler(self, line):
+        body = line[line.index("|") + 1:]
+        labels = [m.start() for m in DIGIT.finditer(body.replace("|", " "))]
+        if len(labels) > 1:
+            self.cols_per_beat = labels[1] - labels[0]
+
+    def _pitch_row(self, name, line, body_start):
+        midi = note_to_midi(name)
+        cols_per_beat = self.cols_per_beat or DEFAULT_COLS_PER_BEAT
+        events = self.score.events
+
+        col = body_start           # Absolute column of the segment start
+        time_col = 0               # Column count excluding bar lines
+        last = None                # Index of the last note on this row
+        for segment in line[body_start:].split("|"):
+            for offset, length, continues in parse_segment(segment):
+                if continues:
+                    # '=' right after a bar line extends the previous note
+                    if last is not None and offset == 0:
+                        events.duration[last] += length / cols_per_beat
+                    continue
+                start = (time_col + offset) / cols_per_beat
+                events.append(start, length / cols_per_beat, midi)
+                last = len(events) - 1
+                self.by_column.setdefault(col + offset, []).append(last)
+            col += len(segment) + 1
+            time_col += len(segment)
+
+    def _velocity_row(self, line):
+        for m in DIGIT.finditer(line):
+            for i in self.by_column.get(m.start(), ()):
+                self.score.events.velocity[i] = int(m.group())
+
+    # ---- markdown table ---------------------------------------------
+    def _table_row(self, bar, beat, cell):
+        tokens = parse_table_cell(cell)
+        if not tokens:
+            return
+        beats_per_bar = self.score.meta["beat"]
+        step = 1.0 / len(tokens)
+        base = (bar - 1) * beats_per_bar + (beat - 1)
+        for i, token in enumerate(tokens):
+            if token.startswith("-"):
+                if self.held:
+                    self.held[1] += step
+            elif token.startswith("."):
+                self._release_held()
+            else:
+                self._release_held()
+                self.held = [base + i * step, step, note_to_midi(token)]
+
+    def _release_held(self):
+        if self.held:
+            self.score.events.append(*self.held)
+            self.held = None
+
+    # ---- text --------------------------------------------------------
+    def _text_durations(self, durations):
+        time_pos = 0.0
+        for note, duration in zip(self.melody, durations):
+            duration = float(duration)
+            if note != 'rest':
+                self.score.events.append(time_pos, duration, note_to_midi(note))
+            time_pos += duration
+        self.melody = []
+
+
+def parse_parts(lines):
+    """Parse an iterable of lines into one Score per notation section."""
+    parser = ScoreParser()
+    for line in lines:
+        parser.feed(line)
+    return parser.finish()
+
+
+def parse(lines, part=0):
+    """
+    Parse an iterable of lines into a Score.
+
+    Args:
+        part: Index of the notation section to return
+
+    Raises:
+        IndexError: The file has fewer parts
+    """
+    parts = parse_parts(lines)
+    if not -len(parts) <= part < len(parts):
+        raise IndexError(f"part {part + 1} of {len(parts)}")
+    return parts[part]
+
+
+def parse_file(path, part=0):
+    """Parse a score file (see parse())."""
+    with open(path, encoding="utf-8") as f:
+        return parse(f, part)
+
+
+# ====================================================
+# Incremental Parsing
+# ====================================================
+def split_sections(lines):
+    """
+    Split score lines at Markdown headings.
+
+    Returns:
+        Tuple of (front matter lines, list of sections as line lists)
+    """
+    front = []
+    if lines and lines[0].strip() == "---":
+        end = next((i for i in range(1, len(lines)) if lines[i].strip() == "---"), len(lines) - 1)
+        front, lines = lines[:end + 1], lines[end + 1:]
+    sections = []
+    for line in lines:
+        if not sections or line.strip().startswith("#"):
+            sections.append([])
+        sections[-1].append(line)
+    return front, sections
+
+
+@functools.lru_cache(maxsize=1024)
+def parse_section(text, meta):
+    """
+    Parse one section (text after a heading) on its own.
+
+    Args:
+        text: Section lines joined with newlines
+        meta: Front-matter metadata as a tuple of (key, value) items
+
+    Returns:
+        Tuple of Scores with notes (shared between calls: do not modify)
+    """
+    parser = ScoreParser(dict(meta))
+    for line in text.split("\n"):
+        parser.feed(line)
+    return tuple(score for score in parser.finish() if len(score.events))
+
+
+def parse_text(text):
+    """
+    Parse a whole score like parse_parts(), re-using unchanged sections.
+
+    Returns:
+        List of Scores, one per notation section
+    """
+    front, sections = split_sections(text.splitlines())
+    header = ScoreParser()
+    for line in front:
+        header.feed(line)
+    meta = tuple(header.score.meta.items())
+    parts = [score for section in sections for score in parse_section("\n".join(section), meta)]
+    return parts or [header.score]
+
+
+# ====================================================
+# Watch Mode
+# ====================================================
+def changed_bars(old, new):
+    """Bar numbers whose notes differ between two scores."""
+    def by_bar(score):
+        bars = {}
+        e = score.events
+        for i in range(len(e)):
+            bars.setdefault(score.bar_of(e.start[i]), set()).add(
+                (e.start[i], e.duration[i], e.midi[i], e.velocity[i]))
+        return bars
+
+    a, b = by_bar(old), by_bar(new)
+    return sorted(bar for bar in a.keys() | b.keys() if a.get(bar) != b.get(bar))
+
+
+def watch(path, on_change, interval=0.5, part=0):
+    """
+    Re-parse a file whenever it changes.
+
+    Only sections whose text changed are parsed again (parse_text); the
+    callback gets the bars whose notes differ from the previous version.
+
+    Args:
+        path: Score file
+        on_change: Callback(score, changed_bar_numbers)
+        interval: Polling interval in seconds
+        part: Notation section to follow (see parse())
+    """
+    mtime = None
+    score = Score()
+    while True:
+        current = os.stat(path).st_mtime_ns
+        if current != mtime:
+            mtime = current
+            with open(path, encoding="utf-8") as f:
+                parts = parse_text(f.read())
+            if not -len(parts) <= part < len(parts):
+                raise IndexError(f"part {part + 1} of {len(parts)}")
+            new_score = parts[part]
+            on_change(new_score, changed_bars(score, new_score))
+            score = new_score
+        time.sleep(interval)
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        print("Usage: python score_parser.py FILE [--part N] [--midi OUT.mid] [--play] [--watch]")
+        exit(1)
+    path = args[0]
+    part = int(args[args.index("--part") + 1]) - 1 if "--part" in args else 0
+
+    def report(score, bars):
+        print(f"{score.meta['title'] or path}: {len(score.events)} notes, "
+              f"BPM {score.bpm}, changed bars: {bars}")
+        if "--midi" in args:
+            midi_path = args[args.index("--midi") + 1]
+            score.save_midi(midi_path)
+            print(f"MIDI保存: {midi_path}")
+        if "--play" in args:
+            score.to_song().play()
+
+    if "--watch" in args:
+        try:
+            watch(path, report, part=part)
+        except KeyboardInterrupt:
+            print()
+    else:
+        start = time.perf_counter()
+        with open(path, encoding="utf-8") as f:
+            parts = parse_parts(f)
+        elapsed = (time.perf_counter() - start) * 1000
+        if not 0 <= part < len(parts):
+            print(f"{path} has {len(parts)} part(s)")
+            exit(1)
+        score = parts[part]
+        if len(parts) > 1:
+            print(f"Part {part + 1} of {len(parts)}")
+        report(score, sorted({score.bar_of(s) for s in score.events.start}))
+        print(f"Parsed in {elapsed:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,304 @@
+"""
+Synth Voices
+------------
+Fixed-size polyphonic voice pool for real-time synthesis.
+
+Voice state is kept as parallel arrays (note, frequency, phase, velocity,
+envelope position, released flag, release level, start order). All active
+voices are rendered in one vectorized pass per audio block:
+
+    oscillator  NoteUtils._generate_single_note on a (voices, frames) time grid
+    envelope    lookups into the cached ADSR curves of envelope.py
+
+When the pool is full a voice is stolen ('oldest', 'quietest' or
+'released' first). If rendering a block takes more than CPU_BUDGET of the
+block's duration, the quietest voices are released early until it fits.
+
+Usage:
+    python synth_voices.py                  # play a sustained progression
+    python synth_voices.py --bench [VOICES]  # time per block
+"""
+
+import functools
+import importlib
+import sys
+import time
+
+import numpy as np
+from envelope import Envelope
+
+# ====================================================
+# Global Constants
+# ====================================================
+SAMPLE_RATE = 44100
+BLOCK = 256             # Frames per block (~5.8ms)
+VOICES = 32
+GAIN = 0.15             # Per-voice gain at full velocity
+CPU_BUDGET = 0.5        # Max share of a block's duration spent rendering
+MIN_VOICES = 4          # The CPU cap never goes below this many voices
+STEAL_POLICIES = ('released', 'oldest', 'quietest')
+
+
+def midi_to_freq(note):
+    """12-TET frequency of a MIDI note number (A4 = 69 = 440Hz)."""
+    return 440.0 * 2.0 ** ((np.asarray(note) - 69) / 12.0)
+
+
+@functools.lru_cache(maxsize=64)
+def envelope_tables(attack, decay, sustain, release, curve, sample_rate):
+    """
+    Envelope lookup tables for vectorized voices.
+
+    Returns:
+        Tuple of (note-on table: attack + decay + one sustain sample,
+        release table + one trailing zero)
+    """
+    env = Envelope(attack, decay, sustain, release, curve)
+    a, d, r = env.curves(sample_rate)
+    on = np.concatenate([a, d, [sustain]]).astype(np.float32)
+    off = np.concatenate([r, [0.0]]).astype(np.float32)
+    return on, off
+
+
+# ====================================================
+# Voice Pool
+# ====================================================
+class VoicePool:
+    """Polyphonic voices rendered as one array operation per block."""
+
+    def __init__(self, size=VOICES, sample_rate=SAMPLE_RATE, waveform='sine',
+                 envelope=(0.005, 0.2, 0.6, 0.3), steal='released', gain=GAIN):
+        """
+        Initialize voice pool.
+
+        Args:
+            size: Number of voices
+            sample_rate: Audio sample rate
+            waveform: 'sine', 'square', 'sawtooth', 'triangle' or a band-limited
+                      'square_bl', 'sawtooth_bl', 'triangle_bl'
+            envelope: Envelope or (attack, decay, sustain, release)
+            steal: Voice stealing policy (see STEAL_POLICIES)
+            gain: Per-voice gain at full velocity
+        """
+        if steal not in STEAL_POLICIES:
+            raise ValueError(f"Unknown steal policy: {steal}")
+        self.size = size
+        self.sample_rate = sample_rate
+        self.waveform = waveform
+        self.steal = steal
+        self.gain = gain
+        env = Envelope.coerce(envelope)
+        self.on_table, self.off_table = envelope_tables(
+            env.attack, env.decay, env.sustain, env.release, env.curve, sample_rate)
+        self._generate = importlib.import_module("multi-track_wave_sound").NoteUtils._generate_single_note
+
+        # Struct of arrays, one slot per voice
+        self.note = np.full(size, -1, dtype=np.int16)       # -1 = free
+        self.freq = np.zeros(size)
+        self.phase = np.zeros(size)                         # Cycles, 0-1
+        self.velocity = np.zeros(size, dtype=np.float32)
+        self.pos = np.zeros(size, dtype=np.int64)           # Samples in stage
+        self.released = np.zeros(size, dtype=bool)
+        self.release_level = np.zeros(size, dtype=np.float32)
+        self.order = np.zeros(size, dtype=np.int64)         # Note-on sequence
+        self.held = np.zeros(size, dtype=bool)              # Held by sustain pedal
+        self._counter = 0
+        self.pedal = False
+
+        self.limit = size           # Voice cap set by the CPU budget
+        self.stolen = 0
+        self.over_budget = 0
+        self.blocks = 0
+
+    # ---- control -----------------------------------------------------
+    @property
+    def active(self):
+        """Mask of sounding voices."""
+        return self.note >= 0
+
+    def level(self):
+        """Current envelope level of every voice."""
+        on = self.on_table[np.minimum(self.pos, len(self.on_table) - 1)]
+        off = self.release_level * self.off_table[np.minimum(self.pos, len(self.off_table) - 1)]
+        return np.where(self.active, np.where(self.released, off, on), 0.0)
+
+    def note_on(self, note, velocity=100):
+        """
+        Start a note.
+
+        Args:
+            note: MIDI note number
+            velocity: MIDI velocity (1-127); 0 means note off
+        """
+        if velocity <= 0:
+            self.note_off(note)
+            return
+        playing = np.flatnonzero((self.note == note) & ~self.released)
+        if len(playing):
+            voice = playing[0]          # Retrigger the same key
+        else:
+            voice = self._allocate()
+            if voice is None:
+                return
+            self.phase[voice] = 0.0
+        self.note[voice] = note
+        self.freq[voice] = midi_to_freq(note)
+        self.velocity[voice] = velocity / 127
+        self.pos[voice] = 0
+        self.released[voice] = False
+        self.held[voice] = False
+        self._counter += 1
+        self.order[voice] = self._counter
+
+    def note_off(self, note):
+        """Release a note (deferred while the sustain pedal is down)."""
+        voices = np.flatnonzero((self.note == note) & ~self.released)
+        if self.pedal:
+            self.held[voices] = True
+        else:
+            self._release(voices)
+
+    def sustain(self, down):
+        """Sustain pedal (CC 64)."""
+        self.pedal = down
+        if not down:
+            self._release(np.flatnonzero(self.held))
+            self.held[:] = False
+
+    def all_notes_off(self):
+        """Release every voice."""
+        self._release(np.flatnonzero(self.active & ~self.released))
+
+    def _release(self, voices):
+        if not len(voices):
+            return
+        self.release_level[voices] = self.level()[voices]
+        self.released[voices] = True
+        self.pos[voices] = 0
+
+    def _allocate(self):
+        free = np.flatnonzero(~self.active)
+        if len(free) and self.active.sum() < self.limit:
+            return free[0]
+        candidates = np.flatnonzero(self.active)
+        if self.steal == 'released' and self.released[candidates].any():
+            candidates = candidates[self.released[candidates]]
+        if self.steal == 'quietest':
+            voice = candidates[np.argmin(self.level()[candidates])]
+        else:
+            voice = candidates[np.argmin(self.order[candidates])]
+        self.stolen += 1
+        return voice
+
+    # ---- rendering ---------------------------------------------------
+    def process(self, frames=BLOCK):
+        """
+        Render one block.
+
+        Returns:
+            float32 mono block
+        """
+        start = time.perf_counter()
+        out = np.zeros(frames, dtype=np.float32)
+        voices = np.flatnonzero(self.active)
+        if len(voices):
+            out += self._render(voices, frames)
+        self._enforce_budget(time.perf_counter() - start, frames)
+        self.blocks += 1
+        return out
+
+    def _render(self, voices, frames):
+        ramp = np.arange(frames)
+        freq = self.freq[voices, None]
+
+        # Oscillators: phase carried over between blocks
+        t = (self.phase[voices, None] + ramp * (freq / self.sample_rate)) / freq
+        wave = self._generate(t, freq, self.waveform, sample_rate=self.sample_rate)
+        self.phase[voices] = (self.phase[voices] + frames * self.freq[voices] / self.sample_rate) % 1.0
+
+        # Envelopes: table lookups past the end hold the last value
+        idx = self.pos[voices, None] + ramp
+        released = self.released[voices]
+        env = np.where(
+            released[:, None],
+            self.release_level[voices, None] * self.off_table[np.minimum(idx, len(self.off_table) - 1)],
+            self.on_table[np.minimum(idx, len(self.on_table) - 1)])
+        self.pos[voices] += frames
+
+        # Free voices whose release has finished
+        done = voices[released & (self.pos[voices] >= len(self.off_table))]
+        self.note[done] = -1
+        self.released[done] = False
+
+        gain = self.velocity[voices] * self.gain
+        return (gain @ (wave * env)).astype(np.float32)
+
+    def _enforce_budget(self, elapsed, frames):
+        budget = CPU_BUDGET * frames / self.sample_rate
+        sounding = int(self.active.sum())
+        if elapsed > budget and sounding > MIN_VOICES:
+            self.over_budget += 1
+            self.limit = max(MIN_VOICES, sounding - max(1, sounding // 4))
+            # Fast-release the quietest voices above the new limit
+            excess = sounding - self.limit
+            levels = np.where(self.active & ~self.released, self.level(), np.inf)
+            self._release(np.argsort(levels)[:excess])
+        elif elapsed < budget / 2 and self.limit < self.size:
+            self.limit += 1
+
+
+# ====================================================
+# Demo
+# ====================================================
+def play_progression(pool, chords, beats=4, bpm=80):
+    """Play overlapping sustained chords through the voice pool."""
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    block_time = BLOCK / pool.sample_rate
+    blocks_per_beat = int(60 / bpm / block_time)
+    with wave_sound.AudioPlayer(pool.sample_rate) as player:
+        for chord in chords:
+            notes = [60 + n - 12 * (n >= 12) for n in _chord_pcs(wave_sound, chord)]
+            pool.sustain(True)
+            for note in notes:
+                pool.note_on(note, 90)
+                pool.note_off(note)
+            for _ in range(beats * blocks_per_beat):
+                player.stream.write(pool.process(BLOCK).tobytes())
+            pool.sustain(False)
+        pool.all_notes_off()
+        for _ in range(blocks_per_beat * 2):
+            player.stream.write(pool.process(BLOCK).tobytes())
+
+
+def _chord_pcs(wave_sound, chord):
+    root, intervals = wave_sound.NoteUtils.parse_chord_symbol(chord)
+    root_pc = wave_sound.NOTE_NAMES.index(root)
+    return [root_pc + i for i in intervals]
+
+
+def bench(voices=VOICES, blocks=2000):
+    """Time per block with every voice sounding."""
+    pool = VoicePool(voices, waveform='sawtooth')
+    for i in range(voices):
+        pool.note_on(36 + i, 100)
+    start = time.perf_counter()
+    for _ in range(blocks):
+        pool.process(BLOCK)
+    elapsed = (time.perf_counter() - start) / blocks
+    block_ms = BLOCK / SAMPLE_RATE * 1000
+    print(f"{voices} voices: {elapsed * 1000:.3f}ms per {block_ms:.1f}ms block "
+          f"({elapsed * 1000 / block_ms * 100:.1f}% CPU), cap {pool.limit}")
+
+
+def main():
+    args = sys.argv[1:]
+    if args and args[0] == "--bench":
+        bench(int(args[1]) if len(args) > 1 else VOICES)
+        return
+    pool = VoicePool(waveform='triangle', envelope=(0.02, 0.4, 0.5, 1.2))
+    play_progression(pool, ['C', 'Am', 'F', 'G7', 'C'])
+    print(f"Blocks: {pool.blocks}  stolen: {pool.stolen}  over budget: {pool.over_budget}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Tuner
+-----
+Pitch tracker for live input and WAV files.
+
+Pitch is estimated with YIN. Frames are taken with sliding_window_view at a
+10ms hop, and the difference function of all frames in a block is computed
+from one batched FFT autocorrelation plus cumulative energy sums, with no
+Python loop over frames.
+
+Detected frequencies are mapped back to note names and cents with the
+12-TET table built from NoteUtils.note_to_freq (multi-track_wave_sound.py),
+the same table the synthesizer plays from.
+
+Usage:
+    python tuner.py                 # live input (PyAudio)
+    python tuner.py take.wav        # note segments of a recording
+"""
+
+import functools
+import importlib
+import sys
+import time
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from onset_timing import read_blocks
+
+# ====================================================
+# Global Constants
+# ====================================================
+SAMPLE_RATE = 44100
+HOP_SECONDS = 0.01
+FMIN = 40.0             # Lowest tracked pitch (bass E1 = 41.2Hz)
+FMAX = 2000.0
+THRESHOLD = 0.15        # YIN absolute threshold
+MAX_APERIODICITY = 0.35 # Frames above this are reported as unvoiced
+MIN_RMS = 0.005         # Frames below this are reported as silent
+OCTAVES = range(0, 9)
+
+
+# ====================================================
+# Note Table
+# ====================================================
+@functools.lru_cache(maxsize=None)
+def note_table():
+    """
+    12-TET note table from NoteUtils.note_to_freq.
+
+    Returns:
+        Tuple of (note names such as 'A4', frequencies in Hz)
+    """
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+    names = [f"{name}{octave}" for octave in OCTAVES for name in wave_sound.NOTE_NAMES]
+    freqs = np.array([wave_sound.NoteUtils.note_to_freq(n) for n in names])
+    return names, freqs
+
+
+def freq_to_note(freqs):
+    """
+    Nearest notes and deviations in cents.
+
+    Args:
+        freqs: Array of frequencies in Hz (NaN for unvoiced)
+
+    Returns:
+        Tuple of (table indices, cents); index -1 for NaN input
+    """
+    _, table = note_table()
+    freqs = np.asarray(freqs, dtype=float)
+    voiced = freqs > 0
+    # The table is evenly spaced in log2, so the nearest note is a rounding
+    steps = np.zeros_like(freqs)
+    steps[voiced] = 12 * np.log2(freqs[voiced] / table[0])
+    idx = np.clip(np.round(steps), 0, len(table) - 1).astype(int)
+    cents = np.full_like(freqs, np.nan)
+    cents[voiced] = 1200 * np.log2(freqs[voiced] / table[idx[voiced]])
+    idx[~voiced] = -1
+    return idx, cents
+
+
+# ====================================================
+# Pitch Tracking
+# ====================================================
+class PitchTracker:
+    """Streaming YIN pitch tracker."""
+
+    def __init__(self, sample_rate=SAMPLE_RATE, fmin=FMIN, fmax=FMAX,
+                 hop=HOP_SECONDS):
+        """
+        Initialize tracker.
+
+        Args:
+            sample_rate: Audio sample rate
+            fmin, fmax: Pitch range in Hz
+            hop: Frame hop in seconds
+        """
+        self.sample_rate = sample_rate
+        self.hop = int(round(hop * sample_rate))
+        self.min_lag = max(2, int(sample_rate / fmax))
+        self.max_lag = int(np.ceil(sample_rate / fmin))
+        # Integration window covers the longest period
+        self.window = self.max_lag
+        self.frame = self.window + self.max_lag + 1
+        self.n_fft = 1 << int(np.ceil(np.log2(self.frame + self.window)))
+        self.carry = np.zeros(0, dtype=np.float32)
+        self.frames_done = 0
+
+    def feed(self, block):
+        """
+        Process one block of mono samples.
+
+        Returns:
+            Tuple of (frame times in seconds, frequencies with NaN for
+            unvoiced frames, aperiodicity)
+        """
+        buf = np.concatenate([self.carry, np.asarray(block, dtype=np.float32)])
+        if len(buf) < self.frame:
+            self.carry = buf
+            return np.empty(0), np.empty(0), np.empty(0)
+        frames = sliding_window_view(buf, self.frame)[::self.hop].astype(np.float64)
+        self.carry = buf[len(frames) * self.hop:]
+        freqs, aperiodicity = self._yin(frames)
+
+        start = self.frames_done
+        self.frames_done += len(frames)
+        times = (np.arange(start, self.frames_done) * self.hop + self.window / 2) / self.sample_rate
+        return times, freqs, aperiodicity
+
+    def _yin(self, frames):
+        w, max_lag = self.window, self.max_lag
+        frames = frames - frames.mean(axis=1, keepdims=True)
+
+        # Cross-correlation of the first window with the frame at every lag
+        spectrum = np.fft.rfft(frames, self.n_fft, axis=1)
+        head = np.fft.rfft(frames[:, :w], self.n_fft, axis=1)
+        acf = np.fft.irfft(np.conj(head) * spectrum, self.n_fft, axis=1)[:, :max_lag + 1]
+
+        # Window energies at every lag from cumulative sums
+        energy = np.concatenate(
+            [np.zeros((len(frames), 1)), np.cumsum(frames ** 2, axis=1)], axis=1)
+        shifted = energy[:, w:w + max_lag + 1] - energy[:, :max_lag + 1]
+        diff = energy[:, w:w + 1] + shifted - 2 * acf
+        diff[:, 0] = 0
+
+        # Cumulative mean normalized difference
+        lags = np.arange(1, max_lag + 1)
+        cmnd = np.ones_like(diff)
+        total = np.cumsum(diff[:, 1:], axis=1)
+        cmnd[:, 1:] = diff[:, 1:] * lags / np.where(total > 0, total, 1)
+
+        # First dip below the threshold, followed down to its local minimum
+        search = cmnd[:, self.min_lag:max_lag]
+        falling = np.diff(search, axis=1, append=search[:, -1:] + 1) < 0
+        candidate = (search < THRESHOLD) & ~falling
+        has_dip = candidate.any(axis=1)
+        lag = np.where(has_dip, candidate.argmax(axis=1), search.argmin(axis=1))
+        rows = np.arange(len(frames))
+        aperiodicity = search[rows, lag]
+
+        # Parabolic interpolation
+        lag = lag + self.min_lag
+        left = cmnd[rows, lag - 1]
+        center = cmnd[rows, lag]
+        right = cmnd[rows, np.minimum(lag + 1, max_lag)]
+        denom = left - 2 * center + right
+        shift = np.where(denom > 0, 0.5 * (left - right) / np.where(denom > 0, denom, 1), 0)
+        freqs = self.sample_rate / (lag + shift)
+
+        rms = np.sqrt(energy[:, w] / w)
+        freqs[(aperiodicity > MAX_APERIODICITY) | (rms < MIN_RMS)] = np.nan
+        return freqs, aperiodicity
+
+
+def track_file(filename, fmin=FMIN, fmax=FMAX):
+    """
+    Track the pitch of a WAV file.
+
+    Returns:
+        Tuple of (frame times, frequencies, aperiodicity)
+    """
+    blocks = read_blocks(filename)
+    tracker = PitchTracker(next(blocks), fmin, fmax)
+    results = [tracker.feed(block) for block in blocks]
+    return tuple(np.concatenate([r[i] for r in results]) for i in range(3))
+
+
+def note_segments(times, freqs, min_frames=5):
+    """
+    Merge consecutive frames with the same note.
+
+    Returns:
+        List of (start, end, note name, median cents)
+    """
+    names, _ = note_table()
+    idx, cents = freq_to_note(freqs)
+    if not len(idx):
+        return []
+    bounds = np.flatnonzero(np.diff(idx)) + 1
+    starts = np.concatenate([[0], bounds])
+    ends = np.concatenate([bounds, [len(idx)]])
+    segments = []
+    for s, e in zip(starts, ends):
+        if idx[s] >= 0 and e - s >= min_frames:
+            segments.append((float(times[s]), float(times[e - 1]), names[idx[s]],
+                             float(np.median(cents[s:e]))))
+    return segments
+
+
+# ====================================================
+# Display
+# ====================================================
+def meter(cents, width=41):
+    """Needle display for a deviation in cents (±50)."""
+    pos = int(round((np.clip(cents, -50, 50) + 50) / 100 * (width - 1)))
+    cells = ["-"] * width
+    cells[width // 2] = "|"
+    cells[pos] = "●"
+    return "".join(cells)
+
+
+def live(sample_rate=SAMPLE_RATE):
+    """Show the pitch of the default input device until Ctrl+C."""
+    import pyaudio
+
+    tracker = PitchTracker(sample_rate)
+    names, _ = note_table()
+    p = pyaudio.PyAudio()
+    stream = p.open(format=pyaudio.paFloat32, channels=1, rate=sample_rate,
+                    input=True, frames_per_buffer=tracker.hop)
+    print("Tuner (Ctrl+C to stop)")
+    try:
+        while True:
+            data = stream.read(tracker.hop, exception_on_overflow=False)
+            _, freqs, _ = tracker.feed(np.frombuffer(data, dtype=np.float32))
+            if not len(freqs):
+                continue
+            idx, cents = freq_to_note(freqs[-1:])
+            if idx[0] < 0:
+                print(f"\r{'-':<4} {'':>9} {meter(0)} {'':>6} ", end="", flush=True)
+            else:
+                print(f"\r{names[idx[0]]:<4} {freqs[-1]:7.2f}Hz {meter(cents[0])} {cents[0]:+5.1f}c ",
+                      end="", flush=True)
+    except KeyboardInterrupt:
+        print()
+    finally:
+        stream.stop_stream()
+        stream.close()
+        p.terminate()
+
+
+def main():
+    args = sys.argv[1:]
+    if not args:
+        live()
+        return
+
+    start = time.perf_counter()
+    times, freqs, _ = track_file(args[0])
+    elapsed = time.perf_counter() - start
+    for t0, t1, name, cents in note_segments(times, freqs):
+        print(f"  {t0:7.2f}s - {t1:7.2f}s  {name:<4} {cents:+5.1f}c")
+    duration = times[-1] if len(times) else 0
+    print(f"{len(times)} frames in {elapsed:.2f}s ({duration / max(elapsed, 1e-9):.0f}x real time)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Voice Leading
+-------------
+Chord voicings for a whole progression with minimal voice movement.
+
+build_chord() stacks every chord from the same octave, so the upper
+voices jump whenever the root moves. Here each chord symbol gets a
+table of candidate voicings (every close-position inversion at every
+octave inside the register), and a dynamic program picks one voicing
+per chord so that the total movement of the upper voices, plus a small
+pull towards the middle of the register, is minimal:
+
+    voice_progression(['C', 'Am', 'F', 'G7'])
+    # [['C2', 'E4', 'G4', 'C5'], ['A2', 'E4', 'A4', 'C5'], ...]
+
+Candidate tables are cached per chord and movement matrices per pair of
+chords, so a progression costs one (k x k) min/argmin per chord: linear
+in its length, a few milliseconds for a thousand bars. The bass keeps
+the root in bass_octave, as in build_chord().
+
+Usage:
+    python snippets/voice_leading.py C Am F G7 [--play]
+    python snippets/voice_leading.py --bench 1000
+"""
+
+import functools
+import importlib
+import itertools
+import random
+import sys
+import time
+
+from lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# ====================================================
+# Global Constants
+# ====================================================
+LOW = 55                # Lowest upper voice (G3, MIDI note number)
+HIGH = 79               # Highest upper voice (G5)
+REGISTER_WEIGHT = 0.25  # Cost per semitone between a voicing's mean and the center
+NOTE_NAMES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+
+def note_name(number):
+    """Note name of a MIDI note number (60 -> 'C4')."""
+    return f"{NOTE_NAMES[number % 12]}{number // 12 - 1}"
+
+
+def note_number(note):
+    """MIDI note number of a note name ('C4' -> 60)."""
+    name = note[:2] if len(note) > 2 and note[1] == '#' else note[:1]
+    return NOTE_NAMES.index(name) + 12 * (int(note[len(name):]) + 1)
+
+
+# ====================================================
+# Candidate Voicings
+# ====================================================
+@functools.lru_cache(maxsize=1024)
+def candidates(chord, low=LOW, high=HIGH):
+    """
+    Close-position voicings of a chord's upper voices within low .. high.
+
+    Args:
+        chord: Chord symbol, or a tuple of note names (kept as given)
+
+    Returns:
+        Read-only (voicings, notes) int array of MIDI note numbers, each
+        row ascending
+    """
+    if not isinstance(chord, str):
+        table = np.array([sorted(note_number(n) for n in chord)])
+    else:
+        wave_sound = importlib.import_module("multi-track_wave_sound")
+        root, intervals = wave_sound.NoteUtils.parse_chord_symbol(chord)
+        root_index = NOTE_NAMES.index(root)
+        classes = list(dict.fromkeys((root_index + i) % 12 for i in intervals))
+        rows = []
+        for inversion in range(len(classes)):
+            order = classes[inversion:] + classes[:inversion]
+            for first in range(low, low + 12):
+                if first % 12 != order[0]:
+                    continue
+                for bottom in range(first, high + 1, 12):
+                    row = [bottom]
+                    for pc in order[1:]:
+                        row.append(row[-1] + (pc - row[-1]) % 12)
+                    if row[-1] <= high:
+                        rows.append(row)
+        if not rows:
+            raise ValueError(f"No voicing of {chord} fits between {low} and {high}")
+        table = np.array(sorted(rows))
+    table.flags.writeable = False
+    return table
+
+
+@functools.lru_cache(maxsize=8192)
+def movement(a, b, low=LOW, high=HIGH):
+    """
+    Voice movement in semitones from each voicing of chord a to each of b.
+
+    Voicings with the same number of notes move voice by voice (the
+    sorted rows pair up optimally); otherwise every note moves to the
+    nearest note of the other chord, counted from both sides and halved.
+
+    Returns:
+        Read-only (len(candidates(a)), len(candidates(b))) float array
+    """
+    x, y = candidates(a, low, high), candidates(b, low, high)
+    if x.shape[1] == y.shape[1]:
+        cost = np.abs(x[:, None, :] - y[None, :, :]).sum(axis=2).astype(float)
+    else:
+        dist = np.abs(x[:, None, :, None] - y[None, :, None, :])
+        cost = (dist.min(axis=3).sum(axis=2) + dist.min(axis=2).sum(axis=2)) / 2
+    cost.flags.writeable = False
+    return cost
+
+
+@functools.lru_cache(maxsize=1024)
+def register_cost(chord, low=LOW, high=HIGH):
+    """Pull of each candidate towards the middle of the register."""
+    table = candidates(chord, low, high)
+    cost = REGISTER_WEIGHT * np.abs(table.mean(axis=1) - (low + high) / 2)
+    cost.flags.writeable = False
+    return cost
+
+
+# ====================================================
+# Dynamic Programming
+# ====================================================
+def choose_voicings(chords, low=LOW, high=HIGH):
+    """
+    Candidate index per chord minimizing total movement (Viterbi).
+
+    Args:
+        chords: Chord symbols or note lists
+
+    Returns:
+        (list of row indices into candidates(chord), total cost)
+    """
+    keys = [c if isinstance(c, str) else tuple(c) for c in chords]
+    if not keys:
+        return [], 0.0
+    total = register_cost(keys[0], low, high).copy()
+    back = []
+    for prev, key in itertools.pairwise(keys):
+        step = total[:, None] + movement(prev, key, low, high)
+        best = step.argmin(axis=0)
+        back.append(best)
+        total = step[best, np.arange(len(best))] + register_cost(key, low, high)
+
+    # Walk back from the cheapest final voicing
+    index = int(total.argmin())
+    cost = float(total[index])
+    path = [index]
+    for best in reversed(back):
+        index = int(best[index])
+        path.append(index)
+    return path[::-1], cost
+
+
+def voice_progression(chords, bass_octave=2, low=LOW, high=HIGH):
+    """
+    Voice a progression with smooth voice leading.
+
+    Args:
+        chords: Chord symbols (or note lists, which are kept as given)
+        bass_octave: Octave of the root in the bass
+        low, high: Register of the upper voices (MIDI note numbers)
+
+    Returns:
+        List of note-name lists in build_chord() format: the bass root,
+        then the upper voices from low to high
+    """
+    path, _ = choose_voicings(chords, low, high)
+    voiced = []
+    for chord, index in zip(chords, path):
+        if not isinstance(chord, str):
+            voiced.append(list(chord))
+            continue
+        root = chord[:2] if len(chord) > 1 and chord[1] == '#' else chord[0]
+        upper = candidates(chord, low, high)[index]
+        voiced.append([f"{root}{bass_octave}"] + [note_name(int(n)) for n in upper])
+    return voiced
+
+
+def total_movement(voicings):
+    """Semitones moved by the upper voices over a list of voiced chords."""
+    rows = [sorted(note_number(n) for n in notes[1:]) for notes in voicings]
+    moved = 0
+    for a, b in itertools.pairwise(rows):
+        if len(a) == len(b):
+            moved += sum(abs(x - y) for x, y in zip(a, b))
+        else:
+            moved += (sum(min(abs(x - y) for y in b) for x in a)
+                      + sum(min(abs(x - y) for x in a) for y in b)) / 2
+    return moved
+
+
+# ====================================================
+# Main
+# ====================================================
+def main():
+    args = sys.argv[1:]
+    wave_sound = importlib.import_module("multi-track_wave_sound")
+
+    if "--bench" in args:
+        bars = int(args[args.index("--bench") + 1])
+        pool = ['C', 'Am', 'F', 'G7', 'Dm7', 'Em', 'CM7', 'FM7', 'Bm7b5', 'E7', 'A7', 'D9']
+        chords = random.Random(0).choices(pool, k=bars)
+        voice_progression(chords[:len(pool)])       # Warm up imports
+        start = time.perf_counter()
+        voice_progression(chords)
+        cold = time.perf_counter() - start
+        start = time.perf_counter()
+        voiced = voice_progression(chords)
+        warm = time.perf_counter() - start
+        fixed = [wave_sound.NoteUtils.build_chord(c) for c in chords]
+        print(f"{bars} chords: {cold * 1000:.1f}ms (tables cached: {warm * 1000:.1f}ms); "
+              f"movement {total_movement(voiced):.0f} vs {total_movement(fixed):.0f} "
+              f"semitones with build_chord")
+        return
+
+    chords = [a for a in args if not a.startswith("--")] or ['C', 'Am', 'Dm7', 'G7', 'CM7']
+    voiced = voice_progression(chords)
+    for chord, notes in zip(chords, voiced):
+        fixed = wave_sound.NoteUtils.build_chord(chord) if isinstance(chord, str) else chord
+        print(f"{chord:<6} {' '.join(notes):<24} (build_chord: {' '.join(fixed)})")
+    fixed = [wave_sound.NoteUtils.build_chord(c) for c in chords]
+    print(f"Movement: {total_movement(voiced):.0f} semitones "
+          f"(build_chord: {total_movement(fixed):.0f})")
+    if "--play" in args:
+        wave_sound.Song(tempo=90).add_chords(chords, [4] * len(chords), style='legato',
+                                             voice_leading=True).play()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+chord_recognition.pyのテスト（Songで描画したコード進行を認識して元に戻るか）
+
+    python -m unittest discover test
+"""
+
+import importlib
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "snippets"))
+
+import chord_recognition  # noqa: E402
+
+wave_sound = importlib.import_module("multi-track_wave_sound")
+
+SAMPLE_RATE = 44100
+BLOCK = 65536
+PROGRESSION = ['C', 'Am', 'F', 'G7', 'Dm7', 'E']
+
+
+def recognize(progression, waveform, voice_leading=False):
+    """Chord names recognized from a rendered progression, 4 beats per chord."""
+    song = wave_sound.Song(tempo=90).add_chords(progression, [4] * len(progression),
+                                                waveform=waveform, voice_leading=voice_leading)
+    wave = song.render(SAMPLE_RATE, cache=False).astype(np.float32)
+    recognizer = chord_recognition.ChordRecognizer(SAMPLE_RATE)
+    for start in range(0, len(wave), BLOCK):
+        recognizer.feed(wave[start:start + BLOCK])
+    times, labels = recognizer.labels()
+    chords = chord_recognition.segments(times, labels, recognizer.hop / SAMPLE_RATE)
+    return [label for _, _, label in chords if label != chord_recognition.NO_CHORD]
+
+
+class TestRoundTrip(unittest.TestCase):
+    """Overtones of bright waveforms must not turn triads into seventh chords."""
+
+    def test_waveforms(self):
+        for waveform in ('sine', 'triangle', 'sawtooth', 'square'):
+            self.assertEqual(recognize(PROGRESSION, waveform), PROGRESSION, waveform)
+
+    def test_voice_leading(self):
+        progression = ['FM7', 'A#', 'D#m', 'C#m7', 'G#7', 'F#', 'E7sus4', 'Bdim']
+        self.assertEqual(recognize(progression, 'square', voice_leading=True), progression)
+
+
+if __name__ == "__main__":
+    unittest.main()
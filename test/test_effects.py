@@ -0,0 +1,101 @@
+"""
+effects.pyのテスト（畳み込み・ディレイ・フィルタをサンプル単位の素朴な実装と比較）
+
+    python -m unittest discover test
+"""
+
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "snippets"))
+
+import effects  # noqa: E402
+
+SAMPLE_RATE = 8000
+
+
+def process_in_blocks(effect, wave, sizes=(100, 37, 512, 1, 700)):
+    """Run a wave through an effect in uneven blocks, as a stream would."""
+    out = wave.astype(np.float32)
+    pos = 0
+    i = 0
+    while pos < len(out):
+        n = sizes[i % len(sizes)]
+        effect.process(out[pos:pos + n])
+        pos += n
+        i += 1
+    return out
+
+
+class TestConvolutionReverb(unittest.TestCase):
+    def test_matches_np_convolve(self):
+        rng = np.random.default_rng(0)
+        x = rng.standard_normal(5000)
+        ir = rng.standard_normal(1500) * np.exp(-np.arange(1500) / 300)
+        p = 256
+        reverb = effects.ConvolutionReverb(ir, mix=1.0, partition=p, sample_rate=SAMPLE_RATE)
+        out = process_in_blocks(reverb, x)
+
+        # Wet only, IR scaled to unit energy, one partition late
+        expected = np.convolve(x, ir / np.sqrt(np.sum(ir ** 2)))[:len(x) - p]
+        np.testing.assert_allclose(out[p:], expected, atol=1e-3)
+        np.testing.assert_array_equal(out[:p], 0)
+
+    def test_dry_mix(self):
+        x = np.random.default_rng(1).standard_normal(1000)
+        reverb = effects.ConvolutionReverb(effects.room_ir(0.1, sample_rate=SAMPLE_RATE),
+                                           mix=0.0, sample_rate=SAMPLE_RATE)
+        np.testing.assert_allclose(process_in_blocks(reverb, x), x, atol=1e-6)
+
+
+class TestDelay(unittest.TestCase):
+    def test_matches_sample_loop(self):
+        x = np.random.default_rng(2).standard_normal(3000)
+        delay = effects.Delay(time=0.03, feedback=0.5, mix=0.4, sample_rate=SAMPLE_RATE)
+        out = process_in_blocks(delay, x)
+
+        d = delay.samples
+        line = np.zeros(len(x) + d)     # What the ring holds at each sample
+        expected = np.empty(len(x))
+        for n in range(len(x)):
+            line[n + d] = x[n] + 0.5 * line[n]
+            expected[n] = 0.6 * x[n] + 0.4 * line[n]
+        np.testing.assert_allclose(out, expected, atol=1e-5)
+
+
+class TestBiquad(unittest.TestCase):
+    def check(self, effect):
+        x = np.random.default_rng(3).standard_normal(3000)
+        out = process_in_blocks(effect, x)
+
+        # Transposed direct form II, one sample at a time
+        b0, b1, b2, a1, a2 = effect.coefficients
+        s1 = s2 = 0.0
+        expected = np.empty(len(x))
+        for n, v in enumerate(x):
+            y = b0 * v + s1
+            s1 = b1 * v - a1 * y + s2
+            s2 = b2 * v - a2 * y
+            expected[n] = y
+        np.testing.assert_allclose(out, expected, atol=1e-4)
+
+    def test_lowpass(self):
+        self.check(effects.LowPass(500, sample_rate=SAMPLE_RATE))
+
+    def test_highpass(self):
+        self.check(effects.HighPass(200, q=2.0, sample_rate=SAMPLE_RATE))
+
+    def test_stereo_channels_independent(self):
+        x = np.random.default_rng(4).standard_normal((2000, 2))
+        stereo = process_in_blocks(effects.LowPass(800, sample_rate=SAMPLE_RATE), x)
+        for ch in range(2):
+            mono = process_in_blocks(effects.LowPass(800, sample_rate=SAMPLE_RATE), x[:, ch])
+            np.testing.assert_allclose(stereo[:, ch], mono, atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
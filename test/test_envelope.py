@@ -0,0 +1,49 @@
+"""
+envelope.pyのテスト（リリースより短い音も鳴ること）
+
+    python -m unittest discover test
+"""
+
+import importlib
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "snippets"))
+
+from envelope import Envelope  # noqa: E402
+
+wave_sound = importlib.import_module("multi-track_wave_sound")
+
+SAMPLE_RATE = 8000
+ADSR = (0.01, 0.05, 0.7, 0.3)
+
+
+class TestShortNotes(unittest.TestCase):
+    def test_shorter_than_release(self):
+        env = Envelope(*ADSR)
+        for seconds in (0.005, 0.1, 0.25):
+            wave = env.apply(np.ones(int(seconds * SAMPLE_RATE)), SAMPLE_RATE)
+            self.assertGreater(wave.max(), 0.2, seconds)
+            self.assertAlmostEqual(wave[-1], 0.0, msg=seconds)
+
+    def test_window_matches_apply(self):
+        env = Envelope(*ADSR, curve='exp')
+        length = int(0.2 * SAMPLE_RATE)
+        whole = env.apply(np.ones(length), SAMPLE_RATE)
+        blocks = np.ones(length)
+        for start in range(0, length, 300):
+            env.apply_window(blocks[start:start + 300], start, length, SAMPLE_RATE)
+        np.testing.assert_allclose(blocks, whole)
+
+    def test_song_with_short_notes(self):
+        song = wave_sound.Song(120).add_melody(['C4', 'E4', 'G4', 'C5'], [0.25] * 4,
+                                               envelope=ADSR)
+        self.assertGreater(np.max(np.abs(song.render(SAMPLE_RATE, cache=False))), 0.05)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+fretboard.pyのテスト（出題スケジューラ）
+
+    python -m unittest discover test
+"""
+
+import itertools
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "snippets"))
+
+import fretboard  # noqa: E402
+from fretboard_search import FretboardSearch  # noqa: E402
+
+
+def gaps(questions):
+    return [b - a for a, b in itertools.pairwise(questions)]
+
+
+class TestQuizScheduler(unittest.TestCase):
+    def run_quiz(self, missed, questions=300, seed=1):
+        """Ask questions, missing only the positions in missed; return when each came up."""
+        scheduler = fretboard.QuizScheduler(fretboard.Fretboard('guitar'), seed=seed)
+        asked = {}
+        for i in range(questions):
+            pos = scheduler.next()
+            asked.setdefault(pos, []).append(i)
+            scheduler.record(pos, pos not in missed)
+        return asked
+
+    def test_miss_returns_sooner_than_correct(self):
+        first = fretboard.QuizScheduler(fretboard.Fretboard('guitar'), seed=1).next()
+        asked = self.run_quiz({first})
+        self.assertLessEqual(max(gaps(asked[first])), 2)
+        correct = [g for pos, times in asked.items() if pos != first for g in gaps(times)]
+        self.assertGreater(min(correct), max(gaps(asked[first])))
+
+    def test_next_without_record(self):
+        scheduler = fretboard.QuizScheduler(fretboard.Fretboard('bass', 5), strings=[1], seed=0)
+        for _ in range(20):
+            scheduler.next()
+        seen = set()
+        for _ in range(30):
+            pos = scheduler.next()
+            seen.add(pos)
+            scheduler.record(pos, True)
+        self.assertEqual(seen, {(1, f) for f in range(6)})
+
+
+class TestFretboardSearch(unittest.TestCase):
+    def test_root_is_lowest_pitch(self):
+        # Re-entrant ukulele: the open C string is lower than the high G
+        voicings = FretboardSearch('ukulele').chord('C')
+        self.assertIn((0, 0, 0, 3), voicings)
+        self.assertNotIn((5, 4, 3, 3), voicings)    # Lowest note E4
+
+    def test_short_neck(self):
+        self.assertIn((None, 3, 2, 0, 1, 0), FretboardSearch('guitar', 3).chord('C'))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+metronome_server.pyのテスト（リクエスト/リプライのプロトコルとソケットの扱い）
+
+    python -m unittest discover test
+"""
+
+import asyncio
+import contextlib
+import errno
+import json
+import os
+import socket
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "snippets"))
+
+from metronome_server import Metronome, MetronomeServer  # noqa: E402
+
+
+class TestProtocol(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "metronome.sock")
+        self.metronome = Metronome(120, 4, click=False)
+        self.task = asyncio.create_task(MetronomeServer(self.metronome, self.path).serve())
+        while not os.path.exists(self.path):
+            await asyncio.sleep(0.01)
+        self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+
+    async def asyncTearDown(self):
+        self.writer.close()
+        self.metronome.stop()
+        self.task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self.task
+        self.tmp.cleanup()
+
+    async def request(self, line):
+        self.writer.write(line.encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await asyncio.wait_for(self.reader.readline(), 2))
+
+    async def test_commands(self):
+        self.assertEqual((await self.request("status"))["bpm"], 120)
+        self.assertEqual((await self.request("set-bpm 140"))["bpm"], 140)
+        reply = await self.request('{"cmd": "set-meter", "beats": 3}')
+        self.assertEqual((reply["ok"], reply["beats"]), (True, 3))
+        self.assertEqual((await self.request("set-bpm 9999"))["bpm"], 400)
+        self.assertFalse((await self.request("set-bpm fast"))["ok"])
+        self.assertFalse((await self.request("rewind"))["ok"])
+        self.assertTrue((await self.request("start"))["running"])
+        self.assertFalse((await self.request("toggle"))["running"])
+
+    async def test_subscribe(self):
+        await self.request("set-bpm 400")
+        self.assertTrue((await self.request("subscribe"))["ok"])
+        await self.request("start")
+        lines = [json.loads(await asyncio.wait_for(self.reader.readline(), 2)) for _ in range(3)]
+        beats = [line for line in lines if line.get("event") == "beat"]
+        self.assertTrue(beats)
+        self.assertEqual((beats[0]["bar"], beats[0]["beat"]), (1, 1))
+
+    async def test_long_line(self):
+        reply = await self.request("x" * 70000)
+        self.assertFalse(reply["ok"])
+        self.assertEqual(await asyncio.wait_for(self.reader.read(), 2), b"")   # Closed
+
+    async def test_running_server_is_kept(self):
+        second = MetronomeServer(Metronome(click=False), self.path).serve()
+        with self.assertRaises(OSError) as raised:
+            await asyncio.wait_for(second, 1)      # Must not start serving
+        self.assertEqual(raised.exception.errno, errno.EADDRINUSE)
+        self.assertTrue((await self.request("status"))["ok"])
+
+
+class TestStaleSocket(unittest.IsolatedAsyncioTestCase):
+    async def test_stale_socket_is_replaced(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "metronome.sock")
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+                sock.bind(path)     # Closed without unlinking, like a crashed server
+            task = asyncio.create_task(MetronomeServer(Metronome(click=False), path).serve())
+            await asyncio.sleep(0.1)
+            reader, writer = await asyncio.open_unix_connection(path)
+            writer.write(b"status\n")
+            self.assertTrue(json.loads(await asyncio.wait_for(reader.readline(), 2))["ok"])
+            writer.close()
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+            self.assertFalse(os.path.exists(path))
+
+    async def test_other_file_is_kept(self):
+        with tempfile.NamedTemporaryFile() as f:
+            with self.assertRaises(FileExistsError):
+                await asyncio.wait_for(MetronomeServer(Metronome(click=False), f.name).serve(), 1)
+            self.assertTrue(os.path.exists(f.name))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+practice_log.pyのテスト（空のログ・追記と検索）
+
+    python -m unittest discover test
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "snippets"))
+
+from practice_log import PracticeLog  # noqa: E402
+
+
+def record(pattern, difficulty, bpm, date="2024-01-15_14:30"):
+    return {"date": date, "pattern": pattern, "difficulty": difficulty,
+            "type": "single_stroke", "metadata": {"bpm": bpm, "bars": 2}}
+
+
+class TestPracticeLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_empty_log(self):
+        log = PracticeLog(self.path)
+        self.assertEqual(len(log.query()), 0)
+        self.assertEqual(len(log.query(pattern="1101", type="accent", since=0)), 0)
+        self.assertEqual(log.suggest(), [])
+
+    def test_append_and_reopen(self):
+        log = PracticeLog(self.path)
+        for i in range(50):
+            log.append(record("1101 0001", "hard" if i % 2 else "easy", 100 + i,
+                              f"2024-01-{1 + i % 28:02}_10:00"))
+        log.extend([record("0011", "normal", 90), record("011", "hard", 140)])
+        for reopened in (log, PracticeLog(self.path)):
+            self.assertEqual(len(reopened), 52)
+            self.assertEqual(len(reopened.query(pattern="1101 0001", difficulty="hard")), 25)
+            self.assertEqual(len(reopened.query(pattern="0011")), 1)
+            self.assertEqual(len(reopened.query(min_bpm=140)), 11)
+            self.assertEqual(reopened.records([51])[0], record("011", "hard", 140))
+
+
+if __name__ == "__main__":
+    unittest.main()
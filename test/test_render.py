@@ -0,0 +1,101 @@
+"""
+multi-track_wave_sound.pyのテスト（トラックの描画）
+
+    python -m unittest discover test
+"""
+
+import importlib
+import os
+import sys
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                "snippets"))
+
+wave_sound = importlib.import_module("multi-track_wave_sound")
+
+SAMPLE_RATE = 8000
+
+
+def peak(wave):
+    return float(np.max(np.abs(wave)))
+
+
+class TestSchedule(unittest.TestCase):
+    """Edits to a track after a render must show up in the next render."""
+
+    def test_volume_change(self):
+        track = wave_sound.MelodyTrack(['A4', 'C5'], [1, 1], volume=0.05)
+        quiet = track.render(sample_rate=SAMPLE_RATE)
+        track.volume = 0.2
+        loud = track.render(sample_rate=SAMPLE_RATE)
+        fresh = wave_sound.MelodyTrack(['A4', 'C5'], [1, 1], volume=0.2)
+        self.assertAlmostEqual(peak(loud) / peak(quiet), 4.0, places=3)
+        np.testing.assert_array_equal(loud, fresh.render(sample_rate=SAMPLE_RATE))
+
+    def test_notes_and_style_change(self):
+        track = wave_sound.MelodyTrack(['A4', 'C5'], [1, 1])
+        track.render(sample_rate=SAMPLE_RATE)
+        track.notes = ['rest', 'C5']
+        track.style = 'staccato'
+        fresh = wave_sound.MelodyTrack(['rest', 'C5'], [1, 1], style='staccato')
+        np.testing.assert_array_equal(track.render(sample_rate=SAMPLE_RATE),
+                                      fresh.render(sample_rate=SAMPLE_RATE))
+
+    def test_chords_change_in_place(self):
+        track = wave_sound.ChordTrack(['C', 'F'], [2, 2])
+        track.render(sample_rate=SAMPLE_RATE)
+        track.chords[1] = 'G7'
+        fresh = wave_sound.ChordTrack(['C', 'G7'], [2, 2])
+        np.testing.assert_array_equal(track.render(sample_rate=SAMPLE_RATE),
+                                      fresh.render(sample_rate=SAMPLE_RATE))
+
+    def test_block_edits(self):
+        track = wave_sound.ChordTrack(['C', 'F'], [2, 2])
+        track.render_block(0, 100, SAMPLE_RATE)
+        fresh = wave_sound.ChordTrack(['C', 'F', 'G7'], [2, 2, 2])
+        track.chords.append('G7')       # Length changes are seen on the next block
+        track.durations = [2, 2, 2]
+        np.testing.assert_array_equal(track.render_block(0, 20000, SAMPLE_RATE),
+                                      fresh.render_block(0, 20000, SAMPLE_RATE))
+        track.chords[2] = 'Am'          # Same length: needs invalidate()
+        track.invalidate()
+        fresh.chords[2] = 'Am'
+        fresh.invalidate()
+        np.testing.assert_array_equal(track.render_block(0, 20000, SAMPLE_RATE),
+                                      fresh.render_block(0, 20000, SAMPLE_RATE))
+
+
+class TestPhase(unittest.TestCase):
+    """float32 samples, but the phase must not drift on long notes."""
+
+    def reference(self, waveform, freq, samples):
+        phase = (np.arange(samples) * freq / SAMPLE_RATE) % 1
+        if waveform == 'sine':
+            return np.sin(2 * np.pi * phase), phase
+        return 2 * phase - 1, phase
+
+    def test_long_note(self):
+        seconds = 60
+        freq = wave_sound.NoteUtils.note_to_freq('A6')
+        for waveform in ('sine', 'sawtooth'):
+            wave = wave_sound.NoteUtils.generate_waveform('A6', seconds, waveform, SAMPLE_RATE)
+            expected, phase = self.reference(waveform, freq, len(wave))
+            away = np.minimum(phase, 1 - phase) > 1e-4      # Both sides of the sawtooth jump
+            self.assertLess(np.max(np.abs(wave - expected)[away]), 1e-5, waveform)
+
+    def test_blocks_match_whole(self):
+        track = wave_sound.MelodyTrack(['A5', 'rest', 'C#6'], [20, 1, 3], tempo=60,
+                                       waveform='sawtooth_bl')
+        whole = track.render(sample_rate=SAMPLE_RATE)
+        blocks = np.zeros_like(whole)
+        for start in range(0, len(whole), 1000):
+            n = min(1000, len(whole) - start)
+            track.render_block(start, n, SAMPLE_RATE, out=blocks[start:start + n])
+        np.testing.assert_allclose(blocks, whole, atol=1e-5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,51 @@
+"""
+score_parser.pyのテスト（差分だけ再解析した結果が全体の解析と一致するか）
+
+    python -m unittest discover test
+"""
+
+import os
+import sys
+import unittest
+
+SNIPPETS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snippets")
+sys.path.insert(0, SNIPPETS)
+
+import score_parser  # noqa: E402
+
+
+def summary(parts):
+    return [(p.meta, list(p.events.start), list(p.events.duration), list(p.events.midi),
+             list(p.events.velocity)) for p in parts]
+
+
+class TestIncremental(unittest.TestCase):
+    def check(self, text):
+        self.assertEqual(summary(score_parser.parse_text(text)),
+                         summary(score_parser.parse_parts(text.splitlines(True))))
+
+    def test_matches_full_parse(self):
+        for name in ("vim_piano_roll.md", "vim_edit_melody.md"):
+            with open(os.path.join(SNIPPETS, name), encoding="utf-8") as f:
+                text = f.read()
+            self.check(text)
+            self.check(text.replace("---", "", 1))
+        self.check("")
+        self.check("---\nbpm: 90\n")
+
+    def test_only_edited_section_is_parsed(self):
+        sections = [f"## part {i}\nmelody: C4 E4 G{i % 5 + 3}\nduration: 1 1 2\n" for i in range(20)]
+        text = "---\nbpm: 100\n---\n" + "".join(sections)
+        score_parser.parse_section.cache_clear()
+        score_parser.parse_text(text)
+        edited = text.replace("## part 7\nmelody: C4", "## part 7\nmelody: D4")
+        parts = score_parser.parse_text(edited)
+        self.assertEqual(score_parser.parse_section.cache_info().misses, 21)
+        self.assertEqual(parts[7].events.midi[0], 62)
+        self.check(edited)
+        # A front-matter change reaches every section
+        self.assertEqual(score_parser.parse_text(edited.replace("bpm: 100", "bpm: 80"))[3].bpm, 80)
+
+
+if __name__ == "__main__":
+    unittest.main()